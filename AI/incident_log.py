@@ -0,0 +1,382 @@
+"""
+SurakshaMesh Incident Log - durable, append-only storage for the Brain
+
+The Brain keeps everything in RAM (incident_store.py); this log makes
+it survive restarts without putting a database back in the hot path.
+
+- remember() only appends the record's fields to an in-memory batch.
+  A background writer thread encodes and writes whole batches and
+  fsyncs once per batch (group commit, every `commit_interval_s` at most).
+- Records go to numbered segment files (incidents-<seq>.log) that are
+  rolled at `segment_bytes`.
+- On startup the latest checkpoint and every newer segment are replayed
+  into the IncidentStore. A torn record at the tail (crash mid-write) is
+  detected by its CRC and cut off.
+- Once more than `max_segments` sealed segments exist, they are folded
+  with the previous checkpoint into a new checkpoint. It holds per-worker
+  totals plus the records the ring buffers would still retain. The
+  folded segments are then deleted. A checkpoint is written to a .tmp
+  file and renamed into place. A crash can leave a .tmp, or folded
+  segments the new checkpoint already covers; both are deleted on the
+  next startup or compaction, never counted twice.
+
+Self-check (crash mid-compaction, then compaction): python3 incident_log.py
+
+Record layout (little-endian):
+    u32 crc32(body) | u16 len(body) | body
+    body = u8 kind | f64 timestamp | i64 risk_or_sum | u32 count
+           | u16 len(worker_id) | u16 len(zone) | worker_id | zone
+kind 1 = incident (count unused); kind 2 = totals carried over from
+compacted records that are no longer retained.
+"""
+import os
+import re
+import zlib
+import struct
+import threading
+from collections import defaultdict, deque
+from typing import List, Optional, Tuple
+
+from incident_store import IncidentStore
+
+KIND_INCIDENT = 1
+KIND_BASE = 2
+
+FRAME = struct.Struct("<IH")
+BODY = struct.Struct("<Bdq I HH")
+
+SEGMENT_RE = re.compile(r"^incidents-(\d{8})\.log$")
+CHECKPOINT_RE = re.compile(r"^checkpoint-(\d{8})\.log$")
+CHECKPOINT_TMP_RE = re.compile(r"^checkpoint-(\d{8})\.log\.tmp$")
+
+
+def encode_record(kind: int, worker_id: str, timestamp: float, value: int,
+                  zone: Optional[str] = None, count: int = 0) -> bytes:
+    wid = worker_id.encode("utf-8")
+    zb = (zone or "").encode("utf-8")
+    body = BODY.pack(kind, timestamp, value, count, len(wid), len(zb)) + wid + zb
+    return FRAME.pack(zlib.crc32(body), len(body)) + body
+
+
+def read_records(path: str) -> Tuple[List[tuple], int]:
+    """
+    Decodes every intact record in a file. Returns the records as
+    (kind, worker_id, timestamp, value, zone, count) and the byte
+    offset just past the last good one.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    records, offset = [], 0
+    while offset + FRAME.size <= len(data):
+        crc, length = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        body = data[start:start + length]
+        if len(body) != length or length < BODY.size or zlib.crc32(body) != crc:
+            break
+        kind, timestamp, value, count, wid_len, zone_len = BODY.unpack_from(body)
+        worker_id = body[BODY.size:BODY.size + wid_len].decode("utf-8")
+        zone = body[BODY.size + wid_len:BODY.size + wid_len + zone_len].decode("utf-8") or None
+        records.append((kind, worker_id, timestamp, value, zone, count))
+        offset = start + length
+    return records, offset
+
+
+class IncidentLog:
+    """
+    Segmented write-ahead log of incidents with group-commit fsync.
+    """
+
+    def __init__(self, directory: str, capacity: int, segment_bytes: int = 16 * 1024 * 1024,
+                 commit_interval_s: float = 0.01, max_segments: int = 8):
+        self.directory = directory
+        self.capacity = capacity  # records per worker a checkpoint keeps
+        self.segment_bytes = segment_bytes
+        self.commit_interval_s = commit_interval_s
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        self._batch: List[tuple] = []
+        self._cond = threading.Condition()
+        self._appended = 0      # records handed to append()
+        self._committed = 0     # records written and fsynced
+        self._closed = False
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._file = None
+        self._compacting = threading.Lock()
+
+        self.commits = 0
+        self.compactions = 0
+        self.truncated_bytes = 0
+
+    @classmethod
+    def from_env(cls, default_dir: str, capacity: int) -> Optional["IncidentLog"]:
+        """SURAKSHA_BRAIN_LOG_DIR='' turns persistence off."""
+        directory = os.environ.get("SURAKSHA_BRAIN_LOG_DIR", default_dir)
+        if not directory:
+            return None
+        return cls(
+            directory,
+            capacity,
+            segment_bytes=int(os.environ.get("SURAKSHA_BRAIN_SEGMENT_MB", "16")) * 1024 * 1024,
+            commit_interval_s=float(os.environ.get("SURAKSHA_BRAIN_COMMIT_MS", "10")) / 1000,
+            max_segments=int(os.environ.get("SURAKSHA_BRAIN_MAX_SEGMENTS", "8"))
+        )
+
+    # --- 1. Files ---
+    def _listing(self, pattern) -> List[Tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"incidents-{seq:08d}.log")
+
+    def _checkpoint_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"checkpoint-{seq:08d}.log")
+
+    def _open_segment(self, seq: int):
+        self._seq = seq
+        self._file = open(self._segment_path(seq), "ab")
+        self._fsync_dir()
+
+    def _remove_stale_tmp(self):
+        """Deletes checkpoints a crash left half-written (never renamed into place)."""
+        for _, path in self._listing(CHECKPOINT_TMP_RE):
+            os.remove(path)
+
+    def _remove_covered(self) -> Tuple[int, Optional[str]]:
+        """
+        Deletes what the newest checkpoint already covers: older
+        checkpoints and segments up to its seq (left behind by a crash
+        after compaction renamed it into place). Returns its (seq, path),
+        or (0, None) if there is no checkpoint.
+        """
+        checkpoints = self._listing(CHECKPOINT_RE)
+        if not checkpoints:
+            return 0, None
+        base_seq, base_path = checkpoints[-1]
+        covered = [path for _, path in checkpoints[:-1]]
+        covered += [path for seq, path in self._listing(SEGMENT_RE) if seq <= base_seq]
+        for path in covered:
+            os.remove(path)
+        if covered:
+            self._fsync_dir()
+        return base_seq, base_path
+
+    def _fsync_dir(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # --- 2. Startup Replay ---
+    def replay(self, store: IncidentStore) -> int:
+        """
+        Loads the newest checkpoint and every later segment into the
+        store, then starts the writer on a fresh segment. Returns the
+        number of records replayed.
+        """
+        self._remove_stale_tmp()
+        base_seq, base_path = self._remove_covered()
+        files = [base_path] if base_path else []
+        segments = [(seq, path) for seq, path in self._listing(SEGMENT_RE) if seq > base_seq]
+        files += [path for _, path in segments]
+
+        replayed = 0
+        for path in files:
+            records, good = read_records(path)
+            size = os.path.getsize(path)
+            if good < size:
+                # Torn tail from a crash mid-write: keep only whole records
+                self.truncated_bytes += size - good
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+                    os.fsync(f.fileno())
+            for kind, worker_id, timestamp, value, zone, count in records:
+                if kind == KIND_BASE:
+                    store.add_base(worker_id, count, value)
+                else:
+                    store.append(worker_id, timestamp, value, zone)
+            replayed += len(records)
+
+        # Never append to a replayed file; always start a new segment
+        last_seq = max([base_seq] + [seq for seq, _ in segments])
+        self._open_segment(last_seq + 1)
+        self._writer = threading.Thread(target=self._write_loop, name="incident-log", daemon=True)
+        self._writer.start()
+        return replayed
+
+    # --- 3. Append + Group Commit ---
+    def append(self, worker_id: str, timestamp: float, risk: int, zone: Optional[str]):
+        """Queues one incident; returns without touching the disk."""
+        with self._cond:
+            self._batch.append((worker_id, timestamp, risk, zone))
+            self._appended += 1
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything appended so far is fsynced."""
+        with self._cond:
+            target = self._appended
+            return self._cond.wait_for(lambda: self._committed >= target or self._closed, timeout)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._batch or self._closed)
+                if not self._batch and self._closed:
+                    return
+                batch, self._batch = self._batch, []
+
+            self._file.write(b"".join([encode_record(KIND_INCIDENT, *fields) for fields in batch]))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.commits += 1
+
+            with self._cond:
+                self._committed += len(batch)
+                self._cond.notify_all()
+
+            if self._file.tell() >= self.segment_bytes:
+                self._roll()
+
+            # Let the next batch accumulate instead of fsyncing per record
+            if self.commit_interval_s > 0:
+                self._stop.wait(self.commit_interval_s)
+
+    def _roll(self):
+        self._file.close()
+        self._open_segment(self._seq + 1)
+        sealed = [s for s in self._listing(SEGMENT_RE) if s[0] < self._seq]
+        if len(sealed) > self.max_segments:
+            threading.Thread(target=self.compact, args=(sealed[-1][0],), daemon=True).start()
+
+    # --- 4. Compaction ---
+    def compact(self, through_seq: int):
+        """
+        Folds the current checkpoint and the sealed segments after it, up
+        to through_seq, into checkpoint-<through_seq>.log: per-worker totals for dropped
+        records plus the newest `capacity` records per worker.
+        """
+        with self._compacting:
+            self._remove_stale_tmp()
+            base_seq, base_path = self._remove_covered()
+            if base_seq >= through_seq:
+                return
+            capacity = self.capacity
+            # Only segments newer than the checkpoint; older ones are already in it
+            old = [base_path] if base_path else []
+            segments = [path for seq, path in self._listing(SEGMENT_RE) if base_seq < seq <= through_seq]
+
+            base = defaultdict(lambda: [0, 0])
+            retained = defaultdict(lambda: deque(maxlen=capacity))
+            for path in old + segments:
+                for kind, worker_id, timestamp, value, zone, count in read_records(path)[0]:
+                    if kind == KIND_BASE:
+                        base[worker_id][0] += count
+                        base[worker_id][1] += value
+                        continue
+                    ring = retained[worker_id]
+                    if len(ring) == capacity:
+                        dropped = ring[0]
+                        base[worker_id][0] += 1
+                        base[worker_id][1] += dropped[1]
+                    ring.append((timestamp, value, zone))
+
+            tmp = self._checkpoint_path(through_seq) + ".tmp"
+            with open(tmp, "wb") as f:
+                for worker_id, (count, risk_sum) in base.items():
+                    f.write(encode_record(KIND_BASE, worker_id, 0.0, risk_sum, count=count))
+                for worker_id, ring in retained.items():
+                    for timestamp, risk, zone in ring:
+                        f.write(encode_record(KIND_INCIDENT, worker_id, timestamp, risk, zone))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._checkpoint_path(through_seq))
+            self._fsync_dir()
+
+            # The checkpoint now covers these; a crash before this point
+            # leaves files that the next replay or compaction deletes
+            for path in old + segments:
+                os.remove(path)
+            self._fsync_dir()
+            self.compactions += 1
+
+    def close(self):
+        """Commits whatever is still batched and stops the writer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+        if self._file is not None:
+            self._file.close()
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "segment": self._seq if self._file else None,
+            "appended": self._appended,
+            "committed": self._committed,
+            "commits": self.commits,
+            "compactions": self.compactions,
+            "truncated_bytes": self.truncated_bytes,
+        }
+
+
+# --- Self-check: python3 incident_log.py ---
+def _self_check():
+    """A crash mid-compaction, then another compaction: nothing counted twice."""
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    try:
+        def open_log(expected: int) -> Tuple[IncidentLog, IncidentStore]:
+            log = IncidentLog(directory, capacity=4, segment_bytes=1, commit_interval_s=0, max_segments=1000)
+            store = IncidentStore(4)
+            log.replay(store)
+            count = store.summary("W-1")[0]
+            assert count == expected, f"replayed {count} incidents, expected {expected}"
+            return log, store
+
+        def add(log: IncidentLog, n: int) -> int:
+            for i in range(n):
+                log.append("W-1", 1000.0 + i, 50, "Furnace-A")
+                log.flush()
+            return max(seq for seq, _ in log._listing(SEGMENT_RE) if seq < log._seq)
+
+        # 1. Compaction "crashes" after the checkpoint is renamed into place
+        #    but before the folded segments are deleted
+        log, _ = open_log(0)
+        through = add(log, 40)
+        kept = {path: open(path, "rb").read() for seq, path in log._listing(SEGMENT_RE) if seq <= through}
+        log.compact(through)
+        for path, data in kept.items():
+            with open(path, "wb") as f:
+                f.write(data)
+        log.close()
+
+        # 2. Restart and compact again; 3. restart: 48 incidents, not more
+        log, _ = open_log(40)
+        log.compact(add(log, 8))
+        log.close()
+        log, _ = open_log(48)
+        log.close()
+
+        newest = log._listing(CHECKPOINT_RE)[-1][0]
+        assert all(seq > newest for seq, _ in log._listing(SEGMENT_RE)), "covered segments left on disk"
+        print("✅ crash mid-compaction, then compaction: no double counting")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    _self_check()
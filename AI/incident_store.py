@@ -0,0 +1,144 @@
+"""
+SurakshaMesh Incident Store - per-worker ring buffers for the Brain
+
+Each worker gets a fixed-capacity ring of (timestamp, risk, zone code)
+held in compact typed arrays, plus running aggregates (count, sum,
+last record) that cover the worker's whole history. Lookups are by
+worker ID, so insights never scan other workers' records, and memory
+stays capped at `capacity` records per worker however long the shift.
+"""
+import os
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CAPACITY = int(os.environ.get("SURAKSHA_BRAIN_RING_SIZE", "1024"))
+RISK_MIN, RISK_MAX = -32768, 32767  # what the int16 risk column holds
+
+
+class WorkerRing:
+    """One worker's last `capacity` incidents plus all-time aggregates."""
+
+    __slots__ = ("timestamps", "risks", "zones", "capacity", "head", "size",
+                 "count", "risk_sum", "last_timestamp", "last_risk", "last_zone")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))  # epoch seconds
+        self.risks = array("h", bytes(2 * capacity))
+        self.zones = array("h", bytes(2 * capacity))        # IncidentStore zone codes
+        self.head = 0   # next slot to write
+        self.size = 0   # records currently held (<= capacity)
+
+        self.count = 0          # all-time
+        self.risk_sum = 0       # all-time
+        self.last_timestamp = 0.0
+        self.last_risk = 0
+        self.last_zone = -1
+
+    def append(self, timestamp: float, risk: int, zone_code: int):
+        i = self.head
+        self.timestamps[i] = timestamp
+        self.risks[i] = risk
+        self.zones[i] = zone_code
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+        self.count += 1
+        self.risk_sum += risk
+        self.last_timestamp = timestamp
+        self.last_risk = risk
+        self.last_zone = zone_code
+
+    def slots(self, n: Optional[int] = None) -> List[int]:
+        """Ring indices of the newest n held records (all if None), oldest first."""
+        n = self.size if n is None else min(n, self.size)
+        start = self.head - n
+        return [(start + k) % self.capacity for k in range(n)]
+
+
+class IncidentStore:
+    """
+    Thread-safe map of worker ID -> WorkerRing. Zone names are interned
+    to small integer codes shared by all workers.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._workers: Dict[str, WorkerRing] = {}
+        self._zone_codes: Dict[str, int] = {}
+        self.zone_names: List[str] = []
+        self.total_recorded = 0
+        self._lock = threading.Lock()
+
+    def zone_code(self, zone: Optional[str]) -> int:
+        zone = zone or "UNKNOWN"
+        code = self._zone_codes.get(zone)
+        if code is None:
+            code = len(self.zone_names)
+            self._zone_codes[zone] = code
+            self.zone_names.append(zone)
+        return code
+
+    def append(self, worker_id: str, timestamp: float, risk: int, zone: Optional[str]):
+        # Checked before any column is written, so a bad risk can't leave a half-written slot
+        if not RISK_MIN <= risk <= RISK_MAX:
+            raise ValueError(f"risk {risk} outside {RISK_MIN}..{RISK_MAX}")
+        with self._lock:
+            ring = self._workers.get(worker_id)
+            if ring is None:
+                ring = self._workers[worker_id] = WorkerRing(self.capacity)
+            ring.append(timestamp, risk, self.zone_code(zone))
+            self.total_recorded += 1
+
+    def add_base(self, worker_id: str, count: int, risk_sum: int):
+        """
+        Adds totals for records no longer held anywhere (used when
+        replaying a compacted log): they count toward the all-time
+        aggregates but not the ring.
+        """
+        with self._lock:
+            ring = self._workers.get(worker_id)
+            if ring is None:
+                ring = self._workers[worker_id] = WorkerRing(self.capacity)
+            ring.count += count
+            ring.risk_sum += risk_sum
+            self.total_recorded += count
+
+    def summary(self, worker_id: str) -> Tuple[int, int, Optional[dict]]:
+        """(all-time count, all-time risk sum, last record or None) in O(1)."""
+        with self._lock:
+            ring = self._workers.get(worker_id)
+            if ring is None or ring.count == 0:
+                return 0, 0, None
+            return ring.count, ring.risk_sum, {
+                "timestamp": ring.last_timestamp,
+                "risk_score": ring.last_risk,
+                # -1: only add_base totals, no record to take a zone from
+                "zone": self.zone_names[ring.last_zone] if ring.last_zone >= 0 else None,
+            }
+
+    def recent(self, worker_id: str, n: Optional[int] = None) -> List[dict]:
+        """The worker's newest n retained records (all if None), oldest first."""
+        with self._lock:
+            ring = self._workers.get(worker_id)
+            if ring is None:
+                return []
+            return [{
+                "worker_id": worker_id,
+                "timestamp": ring.timestamps[i],
+                "risk_score": ring.risks[i],
+                "zone": self.zone_names[ring.zones[i]],
+            } for i in ring.slots(n)]
+
+    def worker_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._workers)
+
+    def __len__(self) -> int:
+        """Records currently retained across all workers."""
+        with self._lock:
+            return sum(ring.size for ring in self._workers.values())
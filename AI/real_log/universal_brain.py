@@ -1,3 +1,5 @@
+import os
+import time
 import asyncio
 import json
 import uvicorn
@@ -36,62 +38,223 @@ X = train_data[['hr', 'spo2', 'co', 'vib', 'acc']]
 y = train_data['risk']
 
 model = RandomForestClassifier(n_estimators=50)
-model.fit(X, y)
+model.fit(X.values, y)  # plain arrays in, so batches skip the DataFrame round trip
 print("✅ AI MODEL TRAINED & READY.")
 
-# --- 2. WEBSOCKET SERVER ---
+# --- 2. MICRO-BATCHED INFERENCE ---
+# Telemetry from every connected simulator goes into one bounded queue. The
+# batcher takes whatever has arrived within BATCH_WINDOW_MS (up to
+# BATCH_MAX rows), scores it with a single predict_proba call off the
+# event loop and hands each ai_prediction to its own socket's outbox.
+FEATURES = ['hr', 'spo2', 'co', 'vib', 'acc']
+BATCH_WINDOW_MS = float(os.environ.get("SURAKSHA_BATCH_WINDOW_MS", "5"))
+BATCH_MAX = int(os.environ.get("SURAKSHA_BATCH_MAX", "256"))
+REPORT_INTERVAL_S = float(os.environ.get("SURAKSHA_BATCH_REPORT_S", "5"))
+# Predictions queued per socket; a slow socket loses its oldest ones, never memory
+OUTBOX_MAX = int(os.environ.get("SURAKSHA_OUTBOX_MAX", "64"))
+# Telemetry waiting to be scored; past this the oldest is dropped
+BATCH_QUEUE_MAX = int(os.environ.get("SURAKSHA_BATCH_QUEUE_MAX", "4096"))
+
+
+def explain(hr, co, vib, acc, risk_score: int) -> str:
+    """Determine Reason"""
+    if risk_score > 50:
+        if vib > 0.2: return "Seismic Activity"
+        elif co > 30: return "Toxic Gas"
+        elif acc > 2.0: return "Man Down / Impact"
+        elif hr > 120: return "High Stress"
+    return "Normal Operations"
+
+
+class Client:
+    """
+    One simulator socket; its own sender task and a bounded, drop-oldest
+    outbox so a slow socket never holds up a batch or grows without limit.
+    """
+
+    def __init__(self, websocket: WebSocket, max_outbox: int = OUTBOX_MAX):
+        self.websocket = websocket
+        self.outbox = asyncio.Queue(maxsize=max(1, max_outbox))
+        self.task = asyncio.get_running_loop().create_task(self._send_loop())
+        self.received = 0
+        self.dropped = 0
+
+    def send(self, text: str) -> bool:
+        """Queues text; False if the oldest queued reply was dropped to make room."""
+        dropped = self.outbox.full()
+        if dropped:
+            self.outbox.get_nowait()
+            self.dropped += 1
+        self.outbox.put_nowait(text)
+        return not dropped
+
+    async def _send_loop(self):
+        try:
+            while True:
+                await self.websocket.send_text(await self.outbox.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # Socket gone; the receive loop cleans up
+
+    def close(self):
+        self.task.cancel()
+
+
+class InferenceBatcher:
+    def __init__(self, model, window_ms: float, max_batch: int, max_queue: int = BATCH_QUEUE_MAX):
+        self.model = model
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.queue = asyncio.Queue(maxsize=max(1, max_queue))  # (client, feature row, enqueued at)
+        self.dropped_inputs = 0    # telemetry dropped unscored (queue full)
+        self.dropped_replies = 0   # predictions dropped by slow sockets, closed ones included
+        self.batches = 0
+        self.rows = 0
+        self.max_size = 0
+        self.wait_ms = 0.0      # summed over rows
+        self.predict_ms = 0.0   # summed over batches
+        self.max_predict_ms = 0.0
+
+    def submit(self, client: Client, row):
+        """Queues a row for scoring; when full, the oldest queued row is dropped."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped_inputs += 1
+        self.queue.put_nowait((client, row, time.perf_counter()))
+
+    async def _collect(self) -> list:
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.window_s
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            X = np.array([row for _, row, _ in batch], dtype=float)
+            try:
+                # B. PREDICT RISK (the whole batch in one call, off the event loop)
+                probs = await asyncio.to_thread(self.model.predict_proba, X)
+            except Exception as e:
+                print(f"❌ ERROR: batch of {len(batch)} failed: {e}")
+                continue
+            done = time.perf_counter()
+            predict_ms = (done - started) * 1000
+            scores = (probs[:, 1] * 100).astype(int)
+            timestamp = pd.Timestamp.now().isoformat()
+
+            # C. SEND RESPONSE (each row back to the socket it came from)
+            for (client, (hr, spo2, co, vib, acc), enqueued), risk_score in zip(batch, scores.tolist()):
+                if not client.send(json.dumps({
+                    "type": "ai_prediction",
+                    "risk": risk_score,
+                    "message": explain(hr, co, vib, acc, risk_score),
+                    "timestamp": timestamp,
+                    "latency_ms": round((done - enqueued) * 1000, 2),
+                })):
+                    self.dropped_replies += 1
+                self.wait_ms += (started - enqueued) * 1000
+
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_size = max(self.max_size, len(batch))
+            self.predict_ms += predict_ms
+            self.max_predict_ms = max(self.max_predict_ms, predict_ms)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_batch,
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "dropped_inputs": self.dropped_inputs,
+            "dropped_replies": self.dropped_replies,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 1) if self.batches else 0.0,
+            "max_batch_size": self.max_size,
+            "mean_queue_wait_ms": round(self.wait_ms / self.rows, 3) if self.rows else 0.0,
+            "mean_predict_ms": round(self.predict_ms / self.batches, 3) if self.batches else 0.0,
+            "max_predict_ms": round(self.max_predict_ms, 3),
+        }
+
+
+async def report_loop(batcher: InferenceBatcher, interval_s: float):
+    """One log line per interval instead of one per message."""
+    last_batches, last_rows, last_ms = 0, 0, 0.0
+    while True:
+        await asyncio.sleep(interval_s)
+        batches = batcher.batches - last_batches
+        if batches:
+            rows = batcher.rows - last_rows
+            print(f"🔍 {rows / interval_s:.0f} predictions/s from {len(clients)} streams | "
+                  f"{batches} batches, avg {rows / batches:.1f} rows, "
+                  f"{(batcher.predict_ms - last_ms) / batches:.2f} ms/batch")
+        last_batches, last_rows, last_ms = batcher.batches, batcher.rows, batcher.predict_ms
+
+
+# --- 3. WEBSOCKET SERVER ---
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
+batcher = InferenceBatcher(model, BATCH_WINDOW_MS, BATCH_MAX)
+clients = set()
+background = set()
+
+def ensure_batcher():
+    """Starts the batcher and reporter on the server's loop with the first connection."""
+    if not background:
+        for coro in (batcher.run(), report_loop(batcher, REPORT_INTERVAL_S)):
+            background.add(asyncio.get_running_loop().create_task(coro))
+
+@app.get("/stats")
+def read_stats():
+    return {"clients": len(clients), **batcher.stats()}
+
 @app.websocket("/ws/brain")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    print("🔵 SIMULATOR CONNECTED")
-    
+    ensure_batcher()
+    client = Client(websocket)
+    clients.add(client)
+    print(f"🔵 SIMULATOR CONNECTED ({len(clients)} online)")
+
     try:
         while True:
             # A. RECEIVE DATA
-            data_text = await websocket.receive_text()
-            data = json.loads(data_text)
-            
-            if data.get('type') == 'telemetry':
-                # B. PREDICT RISK
+            data = json.loads(await websocket.receive_text())
+            if data.get('type') != 'telemetry':
+                continue
+            try:
                 # Extract features in exact order
-                input_vector = [[
-                    data['hr'], 
-                    data['spo2'], 
-                    data['co'], 
-                    data['vib'], 
-                    data['acc']
-                ]]
-                
-                # Run Inference
-                risk_prob = model.predict_proba(input_vector)[0][1] * 100
-                risk_score = int(risk_prob)
-                
-                # Determine Reason
-                reason = "Normal Operations"
-                if risk_score > 50:
-                    if data['vib'] > 0.2: reason = "Seismic Activity"
-                    elif data['co'] > 30: reason = "Toxic Gas"
-                    elif data['acc'] > 2.0: reason = "Man Down / Impact"
-                    elif data['hr'] > 120: reason = "High Stress"
-
-                print(f"🔍 Analyzing: {input_vector} -> Risk: {risk_score}% ({reason})")
-
-                # C. SEND RESPONSE
-                response = {
-                    "type": "ai_prediction",
-                    "risk": risk_score,
-                    "message": reason,
-                    "timestamp": pd.Timestamp.now().isoformat()
-                }
-                await websocket.send_json(response)
-                
+                row = [float(data[name]) for name in FEATURES]
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"❌ ERROR: bad telemetry ({e!r})")
+                continue
+            client.received += 1
+            batcher.submit(client, row)
+
     except WebSocketDisconnect:
-        print("🔴 SIMULATOR DISCONNECTED")
+        pass
     except Exception as e:
         print(f"❌ ERROR: {e}")
+    finally:
+        clients.discard(client)
+        client.close()
+        print(f"🔴 SIMULATOR DISCONNECTED after {client.received} messages, {client.dropped} replies dropped "
+              f"({len(clients)} online)")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8002)
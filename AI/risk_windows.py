@@ -0,0 +1,180 @@
+"""
+SurakshaMesh Risk Windows - streaming, windowed risk statistics
+
+Every remember() folds one (timestamp, risk) sample into the stats of
+its worker and of its zone, in O(1) and without keeping the samples:
+
+- EWMA risk: each sample moves it by at least EWMA_ALPHA, more the
+  longer it has been since the last one (half-life EWMA_HALF_LIFE_S)
+- rolling mean / max / count / high-risk count over 5 min, 1 h and one
+  shift. Each window is a ring of fixed-width buckets; expired buckets
+  are cleared as time moves on, so the oldest bucket is dropped whole
+  (window edges are accurate to one bucket width)
+- trend slope in risk points per minute, from an exponentially
+  weighted least-squares fit (time constant TREND_TAU_S)
+"""
+import os
+import math
+import threading
+from typing import Dict, Optional
+
+HIGH_RISK = 80  # same threshold as autonomous_actions' alarm
+EWMA_ALPHA = 0.2
+EWMA_HALF_LIFE_S = 120.0
+TREND_TAU_S = 900.0
+SHIFT_HOURS = float(os.environ.get("SURAKSHA_SHIFT_HOURS", "8"))
+
+# name -> (span seconds, number of buckets)
+WINDOWS = {
+    "5m": (300.0, 30),
+    "1h": (3600.0, 60),
+    "shift": (SHIFT_HOURS * 3600.0, 48),
+}
+
+
+class BucketWindow:
+    """Sliding time window of count / sum / max / high-risk count."""
+
+    __slots__ = ("width", "n", "counts", "sums", "maxes", "highs", "epoch")
+
+    def __init__(self, span_s: float, buckets: int):
+        self.width = span_s / buckets
+        self.n = buckets
+        self.counts = [0] * buckets
+        self.sums = [0.0] * buckets
+        self.maxes = [0] * buckets
+        self.highs = [0] * buckets
+        self.epoch = None   # bucket number (timestamp // width) of the newest bucket
+
+    def _advance(self, epoch: int):
+        """Clears buckets that fell out of the window (at most n of them)."""
+        if self.epoch is None:
+            self.epoch = epoch
+            return
+        if epoch <= self.epoch:
+            return
+        for e in range(self.epoch + 1, min(epoch, self.epoch + self.n) + 1):
+            k = e % self.n
+            self.counts[k] = 0
+            self.sums[k] = 0.0
+            self.maxes[k] = 0
+            self.highs[k] = 0
+        self.epoch = epoch
+
+    def add(self, timestamp: float, risk: int):
+        epoch = int(timestamp // self.width)
+        if epoch != self.epoch:
+            self._advance(epoch)
+        if epoch <= self.epoch - self.n:
+            return  # older than the whole window
+        k = epoch % self.n
+        self.counts[k] += 1
+        self.sums[k] += risk
+        if risk > self.maxes[k]:
+            self.maxes[k] = risk
+        if risk >= HIGH_RISK:
+            self.highs[k] += 1
+
+    def snapshot(self, now: float) -> dict:
+        self._advance(int(now // self.width))
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean": round(sum(self.sums) / count, 1) if count else 0.0,
+            "max": max(self.maxes) if count else 0,
+            "high_risk": sum(self.highs),
+        }
+
+
+class RiskStats:
+    """All streaming statistics for one worker or zone."""
+
+    __slots__ = ("windows", "ewma", "last_ts", "last_risk", "count",
+                 "w", "wt", "wr", "wtt", "wtr", "t0")
+
+    def __init__(self):
+        self.windows = {name: BucketWindow(span, n) for name, (span, n) in WINDOWS.items()}
+        self.ewma = None
+        self.last_ts = None
+        self.last_risk = None
+        self.count = 0
+        # Exponentially weighted sums for the trend fit, time relative to t0
+        self.w = self.wt = self.wr = self.wtt = self.wtr = 0.0
+        self.t0 = None
+
+    def update(self, timestamp: float, risk: int):
+        dt = 0.0 if self.last_ts is None else max(0.0, timestamp - self.last_ts)
+
+        if self.ewma is None:
+            self.ewma = float(risk)
+        else:
+            alpha = 1.0 - (1.0 - EWMA_ALPHA) * 0.5 ** (dt / EWMA_HALF_LIFE_S)
+            self.ewma += alpha * (risk - self.ewma)
+
+        if self.t0 is None:
+            self.t0 = timestamp
+        decay = math.exp(-dt / TREND_TAU_S)
+        t = (timestamp - self.t0) / 60.0  # minutes
+        self.w = self.w * decay + 1.0
+        self.wt = self.wt * decay + t
+        self.wr = self.wr * decay + risk
+        self.wtt = self.wtt * decay + t * t
+        self.wtr = self.wtr * decay + t * risk
+
+        for window in self.windows.values():
+            window.add(timestamp, risk)
+
+        if self.last_ts is None or timestamp >= self.last_ts:
+            self.last_ts = timestamp
+            self.last_risk = risk
+        self.count += 1
+
+    @property
+    def slope(self) -> float:
+        """Weighted least-squares risk slope, points per minute (0 if undefined)."""
+        denom = self.w * self.wtt - self.wt * self.wt
+        if self.w < 2 or denom <= 1e-9:
+            return 0.0
+        return (self.w * self.wtr - self.wt * self.wr) / denom
+
+    def snapshot(self, now: float) -> dict:
+        windows = {name: window.snapshot(now) for name, window in self.windows.items()}
+        return {
+            "ewma_risk": round(self.ewma, 1) if self.ewma is not None else 0.0,
+            "last_risk": self.last_risk,
+            "trend_per_min": round(self.slope, 3) or 0.0,  # no -0.0
+            "high_risk_per_hour": windows["1h"]["high_risk"],
+            "windows": windows,
+        }
+
+
+class RiskAnalytics:
+    """Thread-safe RiskStats per worker and per zone."""
+
+    def __init__(self):
+        self.workers: Dict[str, RiskStats] = {}
+        self.zones: Dict[str, RiskStats] = {}
+        self._lock = threading.Lock()
+
+    def update(self, worker_id: str, zone: Optional[str], timestamp: float, risk: int):
+        with self._lock:
+            stats = self.workers.get(worker_id)
+            if stats is None:
+                stats = self.workers[worker_id] = RiskStats()
+            stats.update(timestamp, risk)
+
+            zone = zone or "UNKNOWN"
+            stats = self.zones.get(zone)
+            if stats is None:
+                stats = self.zones[zone] = RiskStats()
+            stats.update(timestamp, risk)
+
+    def worker(self, worker_id: str, now: float) -> Optional[dict]:
+        with self._lock:
+            stats = self.workers.get(worker_id)
+            return stats.snapshot(now) if stats is not None else None
+
+    def zone(self, zone: Optional[str], now: float) -> Optional[dict]:
+        with self._lock:
+            stats = self.zones.get(zone or "UNKNOWN")
+            return stats.snapshot(now) if stats is not None else None
@@ -0,0 +1,140 @@
+#
+# File: check_risk_parity.py
+#
+# Parity check for risk_kernel.py. Replays every row of
+# 'training_data.csv' through the original scalar progressive risk
+# rules (kept verbatim below as the reference) and through the
+# vectorized kernel, for a sweep of ML base risks, and asserts the
+# scores and topRiskFactors come out identical.
+#
+# Usage: python3 check_risk_parity.py
+#
+
+import numpy as np
+import pandas as pd
+
+from features import MODEL_FEATURES, INT_FEATURES
+from risk_kernel import compute_progressive_risk
+
+
+# --- 1. Reference: the original scalar path from main.py v3.1 ---
+def reference_progressive_risk(input_data: dict, missing_items: list, base_ml_risk: int):
+    progressive_bonus = 0
+    risk_factors_detailed = []
+
+    if not input_data['ppeCompliant']:
+        ppe_penalty = 45
+        progressive_bonus += ppe_penalty
+        risk_factors_detailed.append(f"PPE Violation (+{ppe_penalty}%)")
+        if missing_items:
+            missing_str = ", ".join(missing_items)
+            risk_factors_detailed.append(f"Missing: {missing_str}")
+
+    if input_data['hr'] > 100:
+        hr_excess = input_data['hr'] - 100
+        hr_penalty = min((hr_excess // 5) * 5, 25)
+        progressive_bonus += hr_penalty
+        risk_factors_detailed.append(f"Elevated HR: {input_data['hr']} bpm (+{hr_penalty}%)")
+
+    if input_data['skinTemp'] > 37.5:
+        temp_excess = input_data['skinTemp'] - 37.5
+        temp_penalty = int(temp_excess * 15)
+        temp_penalty = min(temp_penalty, 30)
+        progressive_bonus += temp_penalty
+        risk_factors_detailed.append(f"Heat Stress: {input_data['skinTemp']}°C (+{temp_penalty}%)")
+
+    if input_data['shiftDurationHours'] > 7:
+        shift_excess = input_data['shiftDurationHours'] - 7
+        fatigue_penalty = int(shift_excess * 6)
+        fatigue_penalty = min(fatigue_penalty, 20)
+        progressive_bonus += fatigue_penalty
+        risk_factors_detailed.append(f"Fatigue: {input_data['shiftDurationHours']}h shift (+{fatigue_penalty}%)")
+
+    if input_data['ambientGasPpm'] > 45:
+        gas_excess = input_data['ambientGasPpm'] - 45
+        gas_penalty = min((gas_excess // 3) * 2, 20)
+        progressive_bonus += gas_penalty
+        risk_factors_detailed.append(f"High Gas: {input_data['ambientGasPpm']} ppm (+{gas_penalty}%)")
+
+    if input_data['zoneTemp'] > 40:
+        zone_temp_excess = input_data['zoneTemp'] - 40
+        zone_penalty = min(zone_temp_excess // 5 * 3, 15)
+        progressive_bonus += zone_penalty
+        risk_factors_detailed.append(f"Hot Zone: {input_data['zoneTemp']}°C (+{zone_penalty}%)")
+
+    if input_data['spo2'] < 95:
+        o2_deficit = 95 - input_data['spo2']
+        o2_penalty = o2_deficit * 3
+        progressive_bonus += o2_penalty
+        risk_factors_detailed.append(f"Low O2: {input_data['spo2']}% SpO2 (+{o2_penalty}%)")
+
+    if input_data['pastIncidentCount'] > 0:
+        history_penalty = input_data['pastIncidentCount'] * 8
+        history_penalty = min(history_penalty, 25)
+        progressive_bonus += history_penalty
+        risk_factors_detailed.append(f"History: {input_data['pastIncidentCount']} past incidents (+{history_penalty}%)")
+
+    weighted_ml = int(base_ml_risk * 0.3)
+    weighted_progressive = int(progressive_bonus * 0.7)
+    final_risk_score = weighted_ml + weighted_progressive
+
+    if final_risk_score < 12 and input_data['ppeCompliant']:
+        final_risk_score = 12
+
+    final_risk_score = min(final_risk_score, 95)
+
+    if risk_factors_detailed:
+        factors = risk_factors_detailed[:3]
+    else:
+        factors = []
+        if input_data['hr'] > 110:
+            factors.append(f"Elevated HR ({input_data['hr']} bpm)")
+        if input_data['ambientGasPpm'] > 50:
+            factors.append(f"High Gas ({input_data['ambientGasPpm']} ppm)")
+        if not input_data['ppeCompliant']:
+            factors.append("PPE Violation (Missing Item)")
+        if input_data['shiftDurationHours'] > 8:
+            factors.append("Long Shift (Fatigue)")
+        if not factors:
+            factors.append("Baseline industrial risk")
+
+    return final_risk_score, factors[:3]
+
+
+# --- 2. Run the comparison ---
+if __name__ == "__main__":
+    try:
+        df = pd.read_csv('training_data.csv')
+    except FileNotFoundError:
+        print("ERROR: 'training_data.csv' not found.")
+        print("Please run 'python3 generate_dataset.py' first.")
+        exit(1)
+
+    # Match the types the API hands to the scorer (schemas.py int/float fields)
+    rows = [
+        {f: (int(r[f]) if f in INT_FEATURES else float(r[f])) for f in MODEL_FEATURES}
+        for r in df[MODEL_FEATURES].to_dict('records')
+    ]
+    features = np.array([[r[f] for f in MODEL_FEATURES] for r in rows], dtype=np.float64)
+    missing = [["helmet", "vest"] if i % 3 == 0 else [] for i in range(len(rows))]
+
+    print(f"Checking {len(rows)} rows against the scalar reference...")
+
+    mismatches = 0
+    for ml_risk in range(0, 101, 5):
+        ml = np.full(len(rows), ml_risk, dtype=np.int64)
+        batch = compute_progressive_risk(features, ml)
+
+        for i, row in enumerate(rows):
+            expected_score, expected_factors = reference_progressive_risk(row, missing[i], ml_risk)
+            got_score = batch.risk(i)
+            got_factors = batch.top_risk_factors(i, missing[i])
+
+            if expected_score != got_score or expected_factors != got_factors:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"❌ Row {i} @ ML {ml_risk}: expected {expected_score} {expected_factors}, "
+                          f"got {got_score} {got_factors}")
+
+    assert mismatches == 0, f"{mismatches} mismatching rows"
+    print("✅ Vectorized kernel matches the scalar path on every row.")
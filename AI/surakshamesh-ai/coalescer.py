@@ -0,0 +1,156 @@
+#
+# File: coalescer.py
+#
+# Micro-batching for single /predict calls. The backend's
+# inferenceClient.js sends one worker per request; the coalescer
+# holds concurrent requests for a few milliseconds (or until
+# max_batch arrive), scores them with one vectorized model call and
+# hands every caller back its own row of the result.
+#
+# Configuration (environment variables):
+#   SURAKSHA_COALESCE_WINDOW_MS   2    longest a request waits for company
+#   SURAKSHA_COALESCE_MAX_BATCH   64   flush as soon as this many are queued
+# A window of 0 or a max batch of 1 turns coalescing off.
+#
+
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from schemas import UnifiedWorkerContext
+from risk_kernel import ProgressiveRiskBatch
+
+# Bucket upper bounds
+WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 25, 50, 100]
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style: le -> count)."""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for k, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[k] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + ["+Inf"], self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "buckets": cumulative,
+        }
+
+
+class RequestCoalescer:
+    """
+    Collects single contexts into batches for `score_batch`, an async
+    callable taking a list of contexts and returning a ProgressiveRiskBatch.
+    """
+
+    def __init__(self, score_batch: Callable[[List[UnifiedWorkerContext]], Awaitable[ProgressiveRiskBatch]],
+                 window_ms: float = 2.0, max_batch: int = 64):
+        self.score_batch = score_batch
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.enabled = self.window_s > 0 and self.max_batch > 1
+
+        self._pending: List[Tuple[UnifiedWorkerContext, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.queue_wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+
+    @classmethod
+    def from_env(cls, score_batch) -> "RequestCoalescer":
+        return cls(
+            score_batch,
+            window_ms=float(os.environ.get("SURAKSHA_COALESCE_WINDOW_MS", "2")),
+            max_batch=int(os.environ.get("SURAKSHA_COALESCE_MAX_BATCH", "64"))
+        )
+
+    async def submit(self, context: UnifiedWorkerContext) -> Tuple[ProgressiveRiskBatch, int]:
+        """
+        Queues one context and waits for its batch. Returns the batch
+        result and this context's row in it. Scoring errors are raised
+        to every caller of the failed batch.
+        """
+        if not self.enabled:
+            self.queue_wait_ms.observe(0.0)
+            self.batch_size.observe(1)
+            return await self.score_batch([context]), 0
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((context, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        items, self._pending = self._pending, []
+        # Callers that went away (client disconnect) don't need scoring
+        items = [item for item in items if not item[1].done()]
+        if not items:
+            return
+
+        now = time.perf_counter()
+        for _, _, enqueued in items:
+            self.queue_wait_ms.observe((now - enqueued) * 1000)
+        self.batch_size.observe(len(items))
+
+        # Keep a reference so the task isn't garbage-collected mid-flight
+        task = asyncio.get_running_loop().create_task(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items):
+        try:
+            risk_batch = await self.score_batch([context for context, _, _ in items])
+        except asyncio.CancelledError:
+            for _, future, _ in items:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(items):
+            if not future.done():
+                future.set_result((risk_batch, i))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_batch,
+            "queued": len(self._pending),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
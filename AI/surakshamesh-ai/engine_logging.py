@@ -0,0 +1,174 @@
+#
+# File: engine_logging.py
+#
+# Structured logging for the AI engine.
+# - Request handlers only drop a record on an in-memory queue; a
+#   background listener thread does the formatting and stdout I/O,
+#   so a slow terminal or pipe never stalls the event loop.
+# - Risk records are sampled per advisory level (e.g. 1 in 20 SAFE
+#   scores, every CRITICAL one) before they ever reach the queue.
+# - Output is JSON lines.
+#
+# Configuration (environment variables):
+#   SURAKSHA_LOG_LEVEL       INFO            minimum level to emit
+#   SURAKSHA_LOG_SAMPLE      SAFE=20,CAUTION=5   keep 1 in N per risk level
+#   SURAKSHA_LOG_QUEUE_SIZE  10000           records buffered before dropping
+#   SURAKSHA_DEBUG_FACTORS   0               log the full factor breakdown
+#                                            for every request
+#
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import datetime
+import itertools
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+LOGGER_NAME = "surakshamesh.ai"
+DEFAULT_SAMPLE_RATES = "SAFE=20,CAUTION=5"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, int]:
+    """'SAFE=20,CAUTION=5' -> {'SAFE': 20, 'CAUTION': 5}"""
+    rates = {}
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        level, n = part.split("=", 1)
+        rates[level.strip().upper()] = max(1, int(n))
+    return rates
+
+
+def debug_factors_enabled() -> bool:
+    return os.environ.get("SURAKSHA_DEBUG_FACTORS", "0").lower() in ("1", "true", "yes")
+
+
+# --- 1. JSON Lines Output ---
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record; structured fields come from `extra={"fields": {...}}`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# --- 2. Per-Risk-Level Sampling ---
+class RiskLevelSampler(logging.Filter):
+    """
+    Keeps 1 in N records per `risk_level`. Records without a risk level,
+    records at WARNING or above and records flagged `force` always pass.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {level: itertools.count() for level in self.rates}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None) or {}
+        level = fields.get("risk_level")
+        if level is None or getattr(record, "force", False) or record.levelno >= logging.WARNING:
+            return True
+        counter = self._counters.get(level)
+        if counter is None:
+            return True
+        with self._lock:
+            return next(counter) % self.rates[level] == 0
+
+
+# --- 3. Non-Blocking Queue Handler ---
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler over a bounded queue that drops (and counts) instead of blocking."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here (the listener thread can't
+        # see exc_info), but leave the JSON formatting to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(stream=None) -> logging.Logger:
+    """
+    Wires LOGGER_NAME to a background JSON-lines writer. Safe to call
+    more than once; only the first call installs the handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return logger
+
+    level = os.environ.get("SURAKSHA_LOG_LEVEL", "INFO").upper()
+    rates = parse_sample_rates(os.environ.get("SURAKSHA_LOG_SAMPLE", DEFAULT_SAMPLE_RATES))
+    queue_size = int(os.environ.get("SURAKSHA_LOG_QUEUE_SIZE", "10000"))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonLinesFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RiskLevelSampler(rates))
+
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
+
+
+# --- 4. Risk Event Helper ---
+def log_risk(worker_id: str, risk: int, risk_level: str, model_used: str,
+             top_factors: List[str], breakdown: Optional[dict] = None,
+             rule_id: Optional[str] = None):
+    """
+    Emits one 'risk_scored' record. A `breakdown` (only built when the
+    debug flag or header asked for it) bypasses sampling.
+    """
+    fields = {
+        "worker_id": worker_id,
+        "risk": risk,
+        "risk_level": risk_level,
+        "model": model_used,
+        "top_factors": top_factors,
+    }
+    if rule_id is not None:
+        fields["rule_id"] = rule_id
+    if breakdown is not None:
+        fields["breakdown"] = breakdown
+        logger.info("risk_scored", extra={"fields": fields, "force": True})
+    else:
+        logger.info("risk_scored", extra={"fields": fields})
@@ -0,0 +1,126 @@
+#
+# File: feature_cache.py
+#
+# Per-worker result cache for the ML path. The fusion engine re-sends
+# every worker's full UWC each merge tick even when nothing changed;
+# if a worker's quantized MODEL_FEATURES (and missing PPE items) match
+# what we scored last time, the previous RiskResponse is reused with a
+# fresh timestamp instead of running the model again.
+#
+# Rules always run before the cache, so SOS / fall / gas-leak
+# overrides are never served from here.
+#
+# Configuration (environment variables):
+#   SURAKSHA_CACHE_SIZE    5000   max workers kept (LRU); 0 disables
+#   SURAKSHA_CACHE_TTL_S   30     max age of a cached score
+#
+
+import os
+import time
+import datetime
+from collections import OrderedDict
+from typing import Optional
+
+from schemas import UnifiedWorkerContext, RiskResponse
+from features import MODEL_FEATURES, INT_FEATURES, feature_values
+
+# Quantization step per feature; int features compare exactly
+QUANT_STEPS = {
+    'skinTemp': 0.1,            # °C
+    'shiftDurationHours': 0.1,  # 6 minutes
+}
+
+
+def quantize_values(values, missing_items=()) -> tuple:
+    """Cache key: quantized MODEL_FEATURES values plus the missing PPE items."""
+    key = []
+    for name, value in zip(MODEL_FEATURES, values):
+        if name in INT_FEATURES:
+            key.append(int(value))
+        else:
+            key.append(round(value / QUANT_STEPS.get(name, 0.01)))
+    key.append(tuple(missing_items or ()))
+    return tuple(key)
+
+
+def quantize(context: UnifiedWorkerContext) -> tuple:
+    return quantize_values(feature_values(context), context.visionTelemetry.missingItems)
+
+
+class FeatureCache:
+    """
+    Bounded LRU of workerId -> (feature key, RiskResponse, stored_at).
+    Only touched from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_s: float = 30.0):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.enabled = max_size > 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls) -> "FeatureCache":
+        return cls(
+            max_size=int(os.environ.get("SURAKSHA_CACHE_SIZE", "5000")),
+            ttl_s=float(os.environ.get("SURAKSHA_CACHE_TTL_S", "30"))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, worker_id: str, key: tuple) -> Optional[RiskResponse]:
+        """The cached response (re-stamped) if this worker's key still matches."""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(worker_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        cached_key, response, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[worker_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+        if cached_key != key:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(worker_id)
+        self.hits += 1
+        return response.model_copy(update={"timestamp": datetime.datetime.now().isoformat()})
+
+    def put(self, worker_id: str, key: tuple, response: RiskResponse):
+        if not self.enabled:
+            return
+
+        self._entries[worker_id] = (key, response, time.monotonic())
+        self._entries.move_to_end(worker_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def invalidate(self, worker_id: str):
+        self._entries.pop(worker_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
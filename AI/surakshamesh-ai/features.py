@@ -0,0 +1,55 @@
+#
+# File: features.py
+#
+# The model's feature contract, shared by the API, the risk kernel
+# and the offline scripts so they can never drift apart.
+#
+
+from schemas import UnifiedWorkerContext
+
+# These are the *exact* features our model was trained on
+MODEL_FEATURES = [
+    'hr',
+    'spo2',
+    'skinTemp',
+    'ambientGasPpm',
+    'zoneTemp',
+    'ppeCompliant',
+    'shiftDurationHours',
+    'pastIncidentCount',
+    'age'
+]
+
+# Column position of every feature inside a MODEL_FEATURES-ordered row
+FEATURE_INDEX = {name: i for i, name in enumerate(MODEL_FEATURES)}
+
+# Features the schemas declare as int (used to format them back exactly)
+INT_FEATURES = {'hr', 'spo2', 'ambientGasPpm', 'zoneTemp', 'ppeCompliant', 'pastIncidentCount', 'age'}
+
+
+def feature_values(context: UnifiedWorkerContext) -> tuple:
+    """
+    Reads the MODEL_FEATURES values straight off a UWC, in column order,
+    applying the same defaults the model was trained around.
+    """
+    badge = context.badgeTelemetry
+    scada = context.scadaContext
+    profile = context.workerProfile
+    return (
+        badge.hr or 72,
+        badge.spo2 or 99,
+        badge.skinTemp or 36.5,
+        scada.ambientGasPpm or 30,
+        scada.zoneTemp or 35,
+        int(context.visionTelemetry.isCompliant or False),  # null = non-compliant, as in rules_engine
+        profile.shiftDurationHours or 6.5,
+        profile.pastIncidentCount or 0,
+        profile.age or 28
+    )
+
+
+def build_input_data(context: UnifiedWorkerContext) -> dict:
+    """
+    Flattens a UWC into the MODEL_FEATURES dict.
+    """
+    return dict(zip(MODEL_FEATURES, feature_values(context)))
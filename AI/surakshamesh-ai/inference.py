@@ -0,0 +1,134 @@
+#
+# File: inference.py
+#
+# The ML hot path without pandas. Features are written straight from
+# the pydantic models into reusable, MODEL_FEATURES-ordered buffers
+# and scored either by the compiled NumPy trees (tree_model.py) or,
+# as a fallback, the XGBoost booster's inplace_predict, skipping the
+# per-request DataFrame construction and validation.
+#
+
+import threading
+import numpy as np
+from typing import List
+
+from schemas import UnifiedWorkerContext
+from features import MODEL_FEATURES, feature_values
+from risk_kernel import compute_progressive_risk, ProgressiveRiskBatch
+from tree_model import TreeEnsemble, TREES_FILENAME
+
+NUM_FEATURES = len(MODEL_FEATURES)
+MODEL_FILENAME = "xgboost_model.pkl"
+
+
+def load_model():
+    """
+    Prefers the compiled NumPy trees (no xgboost runtime needed) and
+    falls back to the pickled XGBoost booster if they are missing.
+    Returns None when neither can be loaded.
+    """
+    try:
+        model = TreeEnsemble.load(TREES_FILENAME)
+        print(f"✅ Compiled tree model '{TREES_FILENAME}' loaded ({model.num_trees} trees, NumPy evaluator).")
+        return model
+    except FileNotFoundError:
+        print(f"ℹ️  '{TREES_FILENAME}' not found, falling back to the XGBoost booster.")
+    except Exception as e:
+        print(f"❌ Error loading compiled trees: {e}")
+
+    try:
+        import joblib
+        model = joblib.load(MODEL_FILENAME)
+        print(f"✅ XGBoost model '{MODEL_FILENAME}' loaded successfully.")
+        return model
+    except FileNotFoundError:
+        print(f"❌ ERROR: Model file '{MODEL_FILENAME}' not found.")
+        print("Please run 'python3 train.py' first.")
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+    return None
+
+
+class InferenceEngine:
+    """
+    Wraps either a TreeEnsemble or the trained XGBClassifier.
+
+    Each thread gets its own pair of buffers:
+    - a float64 one holding the exact feature values (the progressive
+      risk kernel needs these to stay bit-identical to the scalar path)
+    - a float32 one the booster reads, which is what XGBoost converts
+      every input to anyway
+
+    Buffers grow (doubling) when a batch doesn't fit and are never shrunk.
+    """
+
+    def __init__(self, model, initial_capacity: int = 64):
+        if hasattr(model, "get_booster"):
+            self.backend = "xgboost"
+            self._predict = model.get_booster().inplace_predict
+        else:
+            self.backend = "numpy-trees"
+            self._predict = model.predict_proba
+        self.initial_capacity = initial_capacity
+        self._local = threading.local()
+
+    def _buffers(self, n: int):
+        local = self._local
+        capacity = getattr(local, "capacity", 0)
+        if capacity < n:
+            capacity = max(self.initial_capacity, capacity * 2, n)
+            local.exact = np.empty((capacity, NUM_FEATURES), dtype=np.float64)
+            local.model_input = np.empty((capacity, NUM_FEATURES), dtype=np.float32)
+            local.capacity = capacity
+        return local.exact, local.model_input
+
+    def fill(self, contexts: List[UnifiedWorkerContext]) -> np.ndarray:
+        """
+        Writes the contexts' features into this thread's buffer and
+        returns the (N, 9) float64 view. The view is only valid until the
+        next fill() on the same thread.
+        """
+        n = len(contexts)
+        exact, _ = self._buffers(n)
+        for i, context in enumerate(contexts):
+            exact[i] = feature_values(context)
+        return exact[:n]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Positive-class probability for each row of an (N, 9) matrix
+        ordered by MODEL_FEATURES. Same values as model.predict_proba()[:, 1].
+        """
+        n = features.shape[0]
+        _, model_input = self._buffers(n)
+        np.copyto(model_input[:n], features, casting="same_kind")
+        return self._predict(model_input[:n])
+
+    def score(self, contexts: List[UnifiedWorkerContext]):
+        """
+        Fills and scores a batch of contexts in one booster call.
+        Returns (features, ml_risk_scores) with ml_risk = int(prob * 100).
+        """
+        features = self.fill(contexts)
+        prediction_probs = self.predict_proba(features)
+        ml_risk_scores = (prediction_probs * 100).astype(np.int64)
+        return features, ml_risk_scores
+
+    def score_batch(self, contexts: List[UnifiedWorkerContext]) -> ProgressiveRiskBatch:
+        """
+        The whole numeric ML path for a batch: one model call plus the
+        vectorized progressive adjustment. The features are copied out of
+        the thread's buffer, so the result can safely be handed to
+        another thread.
+        """
+        features, ml_risk_scores = self.score(contexts)
+        return compute_progressive_risk(features.copy(), ml_risk_scores)
+
+    def score_features(self, features: np.ndarray) -> ProgressiveRiskBatch:
+        """
+        score_batch() for an (N, 9) float64 feature matrix the caller
+        already built (the compact wire format decodes straight into one).
+        """
+        prediction_probs = self.predict_proba(features)
+        ml_risk_scores = (prediction_probs * 100).astype(np.int64)
+        return compute_progressive_risk(features, ml_risk_scores)
@@ -0,0 +1,168 @@
+#
+# File: inference_pool.py
+#
+# Runs the CPU-bound ML path off the asyncio event loop, so one slow
+# inference can't stall every other request (or the '/' health check).
+#
+# Modes (SURAKSHA_INFERENCE_MODE):
+#   thread   default, a thread pool sized to the CPU count
+#   process  a process pool; each worker loads its own model copy
+#   inline   the old behaviour, scored directly on the event loop
+#            (kept for load-test comparisons)
+#
+# Back-pressure: at most SURAKSHA_INFERENCE_MAX_PENDING batches may be
+# queued or running; beyond that callers get InferenceOverloaded (503).
+# Each request waits at most SURAKSHA_INFERENCE_TIMEOUT_S seconds (504).
+#
+
+import os
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Optional
+
+from schemas import UnifiedWorkerContext
+from risk_kernel import ProgressiveRiskBatch
+from inference import InferenceEngine, load_model
+
+MODES = ("thread", "process", "inline")
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the pending-inference limit is reached."""
+
+
+# --- 1. Process-Pool Worker Side ---
+_process_engine: Optional[InferenceEngine] = None
+
+
+def _init_process_worker():
+    global _process_engine
+    model = load_model()
+    _process_engine = InferenceEngine(model) if model is not None else None
+
+
+def _score_batch_in_process(contexts: List[UnifiedWorkerContext]) -> ProgressiveRiskBatch:
+    if _process_engine is None:
+        raise RuntimeError("ML Model is not loaded in the inference worker.")
+    return _process_engine.score_batch(contexts)
+
+
+def _score_features_in_process(features: np.ndarray) -> ProgressiveRiskBatch:
+    if _process_engine is None:
+        raise RuntimeError("ML Model is not loaded in the inference worker.")
+    return _process_engine.score_features(features)
+
+
+# --- 2. The Executor ---
+class InferenceExecutor:
+    """
+    Bounded, timed front door to the inference engine.
+    """
+
+    def __init__(self, engine: Optional[InferenceEngine], mode: str = "thread",
+                 max_workers: Optional[int] = None, max_pending: int = 256,
+                 timeout_s: float = 2.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown inference mode '{mode}', expected one of {MODES}")
+
+        self.engine = engine
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout_s = timeout_s
+
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.timed_out = 0
+        self.completed = 0
+
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        elif mode == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_process_worker)
+        else:
+            self._pool = None
+
+    @classmethod
+    def from_env(cls, engine: Optional[InferenceEngine]) -> "InferenceExecutor":
+        workers = os.environ.get("SURAKSHA_INFERENCE_WORKERS")
+        return cls(
+            engine,
+            mode=os.environ.get("SURAKSHA_INFERENCE_MODE", "thread").lower(),
+            max_workers=int(workers) if workers else None,
+            max_pending=int(os.environ.get("SURAKSHA_INFERENCE_MAX_PENDING", "256")),
+            timeout_s=float(os.environ.get("SURAKSHA_INFERENCE_TIMEOUT_S", "2.0"))
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def score_batch(self, contexts: List[UnifiedWorkerContext]) -> ProgressiveRiskBatch:
+        """
+        Scores a batch on the pool. Raises InferenceOverloaded when too
+        much work is already queued and asyncio.TimeoutError when the
+        result doesn't arrive within timeout_s.
+        """
+        if self.mode == "inline":
+            return self.engine.score_batch(contexts)
+        if self.mode == "thread":
+            return await self._run(self.engine.score_batch, contexts)
+        return await self._run(_score_batch_in_process, contexts)
+
+    async def score_features(self, features: np.ndarray) -> ProgressiveRiskBatch:
+        """score_batch() for a ready-made (N, 9) feature matrix, same limits."""
+        if self.mode == "inline":
+            return self.engine.score_features(features)
+        if self.mode == "thread":
+            return await self._run(self.engine.score_features, features)
+        return await self._run(_score_features_in_process, features)
+
+    async def _run(self, fn, arg) -> ProgressiveRiskBatch:
+        """Submits fn(arg) to the pool under the pending limit and timeout."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceOverloaded(f"{self._pending} inferences already pending")
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(fn, arg)
+        except Exception:
+            self._release()
+            raise
+
+        # The slot is only freed once the work really finishes, even if the
+        # caller gave up waiting; a timed-out job still occupies a worker.
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers if self._pool is not None else 0,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "timeout_s": self.timeout_s,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,182 @@
+#
+# File: load_test.py
+#
+# Concurrent load test for the AI engine. Fires /predict (or
+# /predict/batch) requests from many keep-alive clients while a
+# separate probe polls the '/' health check, then prints latency
+# percentiles for both plus the status code mix.
+#
+# Compare inference on the event loop vs. on the executor:
+#   SURAKSHA_INFERENCE_MODE=inline python3 main.py   # before
+#   SURAKSHA_INFERENCE_MODE=thread python3 main.py   # after
+#   python3 load_test.py --clients 32 --requests 200
+#
+# Compare request encodings (see wire_format.py):
+#   python3 load_test.py --batch 64 --wire json
+#   python3 load_test.py --batch 64 --wire struct    # or msgpack
+#
+# Stdlib only for JSON, so it runs anywhere the engine does.
+#
+
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_context(i: int) -> dict:
+    """A random but schema-valid UnifiedWorkerContext (no SOS/fall, so the ML path runs)."""
+    return {
+        "workerId": f"LOAD-{i:05d}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "badgeTelemetry": {
+            "hr": random.randint(60, 140),
+            "spo2": random.randint(88, 100),
+            "skinTemp": round(random.uniform(35.5, 39.0), 2),
+        },
+        "visionTelemetry": {
+            "isCompliant": random.random() < 0.8,
+            "missingItems": random.choice([[], ["helmet"], ["vest"]]),
+        },
+        "scadaContext": {
+            "ambientGasPpm": random.randint(5, 70),
+            "zoneTemp": random.randint(25, 50),
+        },
+        "workerProfile": {
+            "shiftDurationHours": round(random.uniform(0.5, 11.5), 2),
+            "pastIncidentCount": random.randint(0, 3),
+            "age": random.randint(20, 60),
+            "fatigueScore": round(random.uniform(0.0, 0.6), 2),
+        },
+    }
+
+
+def flatten(context: dict) -> dict:
+    """A context as the flat record the compact wire formats carry."""
+    flat = {"workerId": context["workerId"]}
+    for group in ("badgeTelemetry", "visionTelemetry", "scadaContext", "workerProfile"):
+        flat.update(context[group])
+    return flat
+
+
+def encode_body(contexts, wire: str) -> bytes:
+    if wire == "json":
+        return json.dumps(contexts).encode()
+    import wire_format
+    records = [flatten(context) for context in contexts]
+    if wire == "struct":
+        return wire_format.encode_struct(records)
+    import msgpack
+    return msgpack.packb([[r["workerId"]] + [r.get(name) for name, _, _ in wire_format.FLAT_FIELDS]
+                          for r in records])
+
+
+CONTENT_TYPES = {"json": "application/json", "struct": "application/x-suraksha-uwc",
+                 "msgpack": "application/msgpack"}
+
+
+def percentile(samples, p: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(name: str, latencies_ms, wall_s: float = None):
+    line = (f"{name:<10} n={len(latencies_ms):<6} "
+            f"p50={percentile(latencies_ms, 50):7.2f}ms  "
+            f"p95={percentile(latencies_ms, 95):7.2f}ms  "
+            f"p99={percentile(latencies_ms, 99):7.2f}ms  "
+            f"max={max(latencies_ms or [float('nan')]):7.2f}ms")
+    if wall_s:
+        line += f"  {len(latencies_ms) / wall_s:8.1f} req/s"
+    print(line)
+
+
+def run_client(url, path: str, n_requests: int, batch: int, wire: str, latencies, statuses, lock):
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    headers = {"Content-Type": CONTENT_TYPES[wire]}
+    local_lat, local_status = [], Counter()
+
+    for i in range(n_requests):
+        if batch > 0:
+            body = encode_body([make_context(i * batch + j) for j in range(batch)], wire)
+        elif wire == "json":
+            body = json.dumps(make_context(i))
+        else:
+            body = encode_body([make_context(i)], wire)
+
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local_status[response.status] += 1
+        except Exception as e:
+            local_status[type(e).__name__] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        local_lat.append((time.perf_counter() - start) * 1000)
+
+    conn.close()
+    with lock:
+        latencies.extend(local_lat)
+        statuses.update(local_status)
+
+
+def run_health_probe(url, interval_s: float, stop: threading.Event, latencies):
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        time.sleep(interval_s)
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SurakshaMesh AI engine load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent keep-alive clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--batch", type=int, default=0, help="send /predict/batch with this many contexts (0 = /predict)")
+    parser.add_argument("--wire", choices=sorted(CONTENT_TYPES), default="json", help="request encoding")
+    parser.add_argument("--health-interval", type=float, default=0.05, help="seconds between '/' probes")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    path = "/predict/batch" if args.batch > 0 else "/predict"
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    health_latencies, stop = [], threading.Event()
+
+    print(f"🚀 {args.clients} clients x {args.requests} requests -> {args.url}{path}"
+          + (f" (batch {args.batch})" if args.batch else "") + f" [{args.wire}]")
+
+    probe = threading.Thread(target=run_health_probe, args=(url, args.health_interval, stop, health_latencies))
+    probe.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for _ in range(args.clients):
+            pool.submit(run_client, url, path, args.requests, args.batch, args.wire, latencies, statuses, lock)
+    wall_s = time.perf_counter() - start
+
+    stop.set()
+    probe.join()
+
+    print("---")
+    summarize(path, latencies, wall_s)
+    summarize("/ health", health_latencies)
+    print(f"status codes: {dict(statuses)}")
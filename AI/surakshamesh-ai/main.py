@@ -7,54 +7,52 @@
 # - Maintains 100% compatibility with Guru's backend
 #
 import uvicorn
-import pandas as pd
-import joblib
+import asyncio
 import datetime
+from typing import Awaitable, Callable, List, Optional
 from fastapi import FastAPI, HTTPException
 from schemas import UnifiedWorkerContext, RiskResponse
+from engine_logging import setup_logging, log_risk, debug_factors_enabled, logger
+
+# Per-request logs go through a queue to a background JSON-lines writer
+# (set up first so the rule engine's load messages are captured too)
+setup_logging()
 
 # Import our custom rule engine functions
-from rules_engine import run_hazard_chain_rules, get_advisory_and_risk
+from rules_engine import (run_hazard_chain_rules, run_hazard_chain_rules_batch,
+                          run_hazard_chain_rules_columns, get_advisory_and_risk)
+from risk_kernel import ProgressiveRiskBatch
+from inference import InferenceEngine, load_model
+from inference_pool import InferenceExecutor, InferenceOverloaded
+from coalescer import RequestCoalescer
+from feature_cache import FeatureCache, quantize, quantize_values
+from wire_format import CompactWireMiddleware, WireFormatError, UnsupportedWireFormat, decode as decode_compact
 
 # --- 1. Load Model at Startup ---
-try:
-    model = joblib.load("xgboost_model.pkl")
-    print("✅ XGBoost model 'xgboost_model.pkl' loaded successfully.")
-except FileNotFoundError:
-    print("❌ ERROR: Model file 'xgboost_model.pkl' not found.")
-    print("Please run 'python3 train.py' first.")
-    model = None
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    model = None
-
-# These are the *exact* features our model was trained on
-MODEL_FEATURES = [
-    'hr',
-    'spo2',
-    'skinTemp',
-    'ambientGasPpm',
-    'zoneTemp',
-    'ppeCompliant',
-    'shiftDurationHours',
-    'pastIncidentCount',
-    'age'
-]
+model = load_model()
+
+# Pandas-free scoring path over whichever model loaded
+engine = InferenceEngine(model) if model is not None else None
+
+# Keeps inference off the event loop (bounded queue + timeout)
+executor = InferenceExecutor.from_env(engine)
+
+# Micro-batches concurrent single /predict calls into one model call
+coalescer = RequestCoalescer.from_env(executor.score_batch)
+
+# Reuses a worker's last ML score while their quantized features are unchanged
+feature_cache = FeatureCache.from_env()
 
 # Create the FastAPI app instance
 app = FastAPI(title="SurakshaMesh X Intelligence Engine v3.1 (ENHANCED)")
 
-import traceback
 from fastapi import Request
 from fastapi.responses import JSONResponse
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print("\n" + "="*80)
-    print("❌ EXCEPTION CAUGHT:")
-    print("="*80)
-    print(traceback.format_exc())
-    print("="*80 + "\n")
+    logger.error("unhandled_exception", exc_info=exc,
+                 extra={"fields": {"path": request.url.path, "type": type(exc).__name__}})
     
     return JSONResponse(
         status_code=500,
@@ -70,9 +68,139 @@ async def global_exception_handler(request: Request, exc: Exception):
 def read_root():
     return {"status": "SurakshaMesh AI Engine v3.1 is Online (Enhanced)"}
 
-# --- 3. The Hybrid /predict Endpoint ---
+@app.get("/stats")
+def read_stats():
+    return {"inference": executor.stats(), "coalescer": coalescer.stats(), "cache": feature_cache.stats()}
+
+# --- 3. Shared Scoring Helpers ---
+def wants_breakdown(request: Request) -> bool:
+    """
+    Full factor breakdowns are logged only when SURAKSHA_DEBUG_FACTORS is
+    set or the caller sends 'X-Debug-Factors: 1'.
+    """
+    if debug_factors_enabled():
+        return True
+    return request.headers.get("x-debug-factors", "").lower() in ("1", "true", "yes")
+
+
+def build_rule_response(worker_id: str, rule_result: dict) -> RiskResponse:
+    """
+    Wraps a triggered hazard-chain rule into a RiskResponse.
+    """
+    advisory_data = get_advisory_and_risk(rule_result['riskScore'])
+    log_risk(worker_id, advisory_data['riskScore'], advisory_data['level'],
+             rule_result['modelUsed'], [rule_result['reason']], rule_id=rule_result.get('ruleId'))
+
+    return RiskResponse(
+        workerId=worker_id,
+        risk=advisory_data['riskScore'],
+        riskScore=advisory_data['riskScore'],
+        confidence=100.0,
+        topRiskFactors=[rule_result['reason']],
+        advisoryHinglish=advisory_data['advisory'],
+        modelUsed=rule_result['modelUsed'],
+        timestamp=datetime.datetime.now().isoformat()
+    )
+
+
+def build_ml_response(worker_id: str, missing_items: Optional[List[str]], risk_batch: ProgressiveRiskBatch,
+                      i: int, debug: bool = False) -> RiskResponse:
+    """
+    Builds the final RiskResponse for row i of a progressive risk batch.
+    The factor strings are only formatted here, for rows actually returned.
+    """
+    final_risk_score = risk_batch.risk(i)
+    factors = risk_batch.top_risk_factors(i, missing_items)
+
+    # Get the final advisory text (using FINAL risk score)
+    advisory_data = get_advisory_and_risk(final_risk_score)
+    
+    log_risk(worker_id, final_risk_score, advisory_data['level'], "XGBoost_v1_Enhanced", factors,
+             breakdown=risk_batch.breakdown(i, missing_items) if debug else None)
+
+    return RiskResponse(
+        workerId=worker_id,
+        risk=final_risk_score,              # Use final enhanced score
+        riskScore=final_risk_score,         # Use final enhanced score
+        confidence=100.0,
+        topRiskFactors=factors,
+        advisoryHinglish=advisory_data['advisory'],
+        modelUsed="XGBoost_v1_Enhanced",
+        timestamp=datetime.datetime.now().isoformat()
+    )
+
+
+async def await_inference(pending):
+    """
+    Awaits executor/coalescer work, turning back-pressure into 503 and
+    timeouts into 504.
+    """
+    try:
+        return await pending
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Inference queue full: {e}", headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Inference timed out after {executor.timeout_s}s")
+
+
+async def predict_rows(worker_ids: List[str], missing_items: List[Optional[List[str]]],
+                       rule_results: List[Optional[dict]], cache_key: Callable[[int], tuple],
+                       score_rows: Callable[[List[int]], Awaitable[ProgressiveRiskBatch]],
+                       debug: bool = False) -> List[RiskResponse]:
+    """
+    Shared body of the batch paths (JSON and compact wire format). Rows a
+    rule claimed or the cache can answer are resolved here; the rest are
+    scored with one score_rows(indices) call on the inference executor.
+    Responses come back in input order.
+    """
+    responses: List[Optional[RiskResponse]] = [None] * len(worker_ids)
+    ml_indices = []
+    cache_keys = {}
+
+    for i, (worker_id, rule_result) in enumerate(zip(worker_ids, rule_results)):
+        if rule_result:
+            responses[i] = build_rule_response(worker_id, rule_result)
+            continue
+
+        cache_keys[i] = cache_key(i)
+        cached = None if debug else feature_cache.get(worker_id, cache_keys[i])
+        if cached is not None:
+            responses[i] = cached
+        else:
+            ml_indices.append(i)
+
+    if not ml_indices:
+        return responses
+
+    if engine is None:
+        raise HTTPException(status_code=500, detail="ML Model is not loaded.")
+
+    try:
+        risk_batch = await await_inference(score_rows(ml_indices))
+        for k, i in enumerate(ml_indices):
+            responses[i] = build_ml_response(worker_ids[i], missing_items[i], risk_batch, k, debug)
+            feature_cache.put(worker_ids[i], cache_keys[i], responses[i])
+
+        return responses
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("batch_prediction_failed", exc_info=e, extra={"fields": {"batch_size": len(worker_ids)}})
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {e}")
+
+
+async def score_ml_single(context: UnifiedWorkerContext, debug: bool = False) -> RiskResponse:
+    """
+    ML path for one context, coalesced with other concurrent /predict
+    calls into a shared model call.
+    """
+    risk_batch, i = await await_inference(coalescer.submit(context))
+    return build_ml_response(context.workerId, context.visionTelemetry.missingItems, risk_batch, i, debug)
+
+# --- 4. The Hybrid /predict Endpoint ---
 @app.post("/predict", response_model=RiskResponse)
-async def predict_risk(context: UnifiedWorkerContext):
+async def predict_risk(context: UnifiedWorkerContext, request: Request):
     """
     Enhanced risk assessment with progressive multi-factor analysis
     """
@@ -81,197 +209,87 @@ async def predict_risk(context: UnifiedWorkerContext):
     rule_result = run_hazard_chain_rules(context)
     
     if rule_result:
-        print(f"⚠️  Rule triggered for {context.workerId}: {rule_result['reason']}")
-        advisory_data = get_advisory_and_risk(rule_result['riskScore'])
-        
-        return RiskResponse(
-            workerId=context.workerId,
-            risk=advisory_data['riskScore'],
-            riskScore=advisory_data['riskScore'],
-            confidence=100.0,
-            topRiskFactors=[rule_result['reason']],
-            advisoryHinglish=advisory_data['advisory'],
-            modelUsed=rule_result['modelUsed'],
-            timestamp=datetime.datetime.now().isoformat()
-        )
+        return build_rule_response(context.workerId, rule_result)
 
-    # --- B. Run the ML Model ---
-    if model is None:
+    # --- B. Reuse the last score if this worker's features haven't changed ---
+    debug = wants_breakdown(request)
+    cache_key = quantize(context)
+    if not debug:
+        cached = feature_cache.get(context.workerId, cache_key)
+        if cached is not None:
+            return cached
+
+    # --- C. Run the ML Model ---
+    if engine is None:
         raise HTTPException(status_code=500, detail="ML Model is not loaded.")
 
     try:
-        # 1. Prepare input data
-        ppe_compliant_value = int(context.visionTelemetry.isCompliant or False)
-        
-        input_data = {
-            'hr': context.badgeTelemetry.hr or 72,
-            'spo2': context.badgeTelemetry.spo2 or 99,
-            'skinTemp': context.badgeTelemetry.skinTemp or 36.5,
-            'ambientGasPpm': context.scadaContext.ambientGasPpm or 30,
-            'zoneTemp': context.scadaContext.zoneTemp or 35,
-            'ppeCompliant': ppe_compliant_value,
-            'shiftDurationHours': context.workerProfile.shiftDurationHours or 6.5,
-            'pastIncidentCount': context.workerProfile.pastIncidentCount or 0,
-            'age': context.workerProfile.age or 28
-        }
-        
-        input_df = pd.DataFrame([input_data], columns=MODEL_FEATURES)
-
-        # 2. Get ML prediction
-        prediction_prob = model.predict_proba(input_df)[0][1]
-        ml_risk_score = int(prediction_prob * 100)
-        
-        # ============================================================
-        # === ENHANCED: PROGRESSIVE RISK CALCULATION ===
-        # ============================================================
-        
-        print(f"\n{'='*60}")
-        print(f"🧠 RISK ASSESSMENT FOR {context.workerId}")
-        print(f"{'='*60}")
-        
-        # Start with ML base prediction
-        base_ml_risk = ml_risk_score
-        print(f"📊 ML Base Risk: {base_ml_risk}%")
-        
-        # Initialize progressive factors
-        progressive_bonus = 0
-        risk_factors_detailed = []
-        
-        # --- Factor 1: PPE Compliance (CRITICAL FACTOR) ---
-        if not input_data['ppeCompliant']:
-            ppe_penalty = 45
-            progressive_bonus += ppe_penalty
-            risk_factors_detailed.append(f"PPE Violation (+{ppe_penalty}%)")
-            print(f"  ⚠️  PPE Non-Compliant: +{ppe_penalty}%")
-            
-            # Add specific missing items if available
-            if context.visionTelemetry.missingItems:
-                missing_str = ", ".join(context.visionTelemetry.missingItems)
-                risk_factors_detailed.append(f"Missing: {missing_str}")
-        
-        # --- Factor 2: Heart Rate Elevation (Stress/Exertion) ---
-        if input_data['hr'] > 100:
-            hr_excess = input_data['hr'] - 100
-            hr_penalty = min((hr_excess // 5) * 5, 25)  # +5% per 5 bpm, max +25%
-            progressive_bonus += hr_penalty
-            risk_factors_detailed.append(f"Elevated HR: {input_data['hr']} bpm (+{hr_penalty}%)")
-            print(f"  ⚠️  Elevated Heart Rate ({input_data['hr']} bpm): +{hr_penalty}%")
-        
-        # --- Factor 3: Temperature Elevation (Heat Stress) ---
-        if input_data['skinTemp'] > 37.5:
-            temp_excess = input_data['skinTemp'] - 37.5
-            temp_penalty = int(temp_excess * 15)  # +15% per degree
-            temp_penalty = min(temp_penalty, 30)  # Cap at +30%
-            progressive_bonus += temp_penalty
-            risk_factors_detailed.append(f"Heat Stress: {input_data['skinTemp']}°C (+{temp_penalty}%)")
-            print(f"  ⚠️  Heat Stress ({input_data['skinTemp']}°C): +{temp_penalty}%")
-        
-        # --- Factor 4: Shift Duration (Fatigue Accumulation) ---
-        if input_data['shiftDurationHours'] > 7:
-            shift_excess = input_data['shiftDurationHours'] - 7
-            fatigue_penalty = int(shift_excess * 6)  # +6% per hour over 7h
-            fatigue_penalty = min(fatigue_penalty, 20)  # Cap at +20%
-            progressive_bonus += fatigue_penalty
-            risk_factors_detailed.append(f"Fatigue: {input_data['shiftDurationHours']}h shift (+{fatigue_penalty}%)")
-            print(f"  ⚠️  Long Shift ({input_data['shiftDurationHours']}h): +{fatigue_penalty}%")
-        
-        # --- Factor 5: Environmental Hazards (Gas Levels) ---
-        if input_data['ambientGasPpm'] > 45:
-            gas_excess = input_data['ambientGasPpm'] - 45
-            gas_penalty = min((gas_excess // 3) * 2, 20)  # +2% per 3 ppm, max +20%
-            progressive_bonus += gas_penalty
-            risk_factors_detailed.append(f"High Gas: {input_data['ambientGasPpm']} ppm (+{gas_penalty}%)")
-            print(f"  ⚠️  High Gas Level ({input_data['ambientGasPpm']} ppm): +{gas_penalty}%")
-        
-        # --- Factor 6: Zone Temperature (Heat Zone) ---
-        if input_data['zoneTemp'] > 40:
-            zone_temp_excess = input_data['zoneTemp'] - 40
-            zone_penalty = min(zone_temp_excess // 5 * 3, 15)  # +3% per 5°C, max +15%
-            progressive_bonus += zone_penalty
-            risk_factors_detailed.append(f"Hot Zone: {input_data['zoneTemp']}°C (+{zone_penalty}%)")
-            print(f"  ⚠️  Hot Zone ({input_data['zoneTemp']}°C): +{zone_penalty}%")
-        
-        # --- Factor 7: SpO2 (Oxygen Saturation) ---
-        if input_data['spo2'] < 95:
-            o2_deficit = 95 - input_data['spo2']
-            o2_penalty = o2_deficit * 3  # +3% per point below 95
-            progressive_bonus += o2_penalty
-            risk_factors_detailed.append(f"Low O2: {input_data['spo2']}% SpO2 (+{o2_penalty}%)")
-            print(f"  ⚠️  Low Oxygen Saturation ({input_data['spo2']}%): +{o2_penalty}%")
-        
-        # --- Factor 8: Past Incidents (Worker History) ---
-        if input_data['pastIncidentCount'] > 0:
-            history_penalty = input_data['pastIncidentCount'] * 8  # +8% per incident
-            history_penalty = min(history_penalty, 25)  # Cap at +25%
-            progressive_bonus += history_penalty
-            risk_factors_detailed.append(f"History: {input_data['pastIncidentCount']} past incidents (+{history_penalty}%)")
-            print(f"  ⚠️  Past Incidents ({input_data['pastIncidentCount']}): +{history_penalty}%")
-        
-        # --- CALCULATE FINAL RISK SCORE ---
-        # Weighted combination: 30% ML + 70% Progressive
-        # (Progressive factors are more reliable for demo)
-        weighted_ml = int(base_ml_risk * 0.3)
-        weighted_progressive = int(progressive_bonus * 0.7)
-        final_risk_score = weighted_ml + weighted_progressive
-        
-        # Apply minimum baseline (industrial environments always have some risk)
-        if final_risk_score < 12 and input_data['ppeCompliant']:
-            final_risk_score = 12
-            print(f"  ℹ️  Applied baseline industrial risk: 12%")
-        
-        # Cap at 95 (reserve 100 for SOS)
-        final_risk_score = min(final_risk_score, 95)
-        
-        print(f"\n📈 Progressive Factors: +{progressive_bonus}%")
-        print(f"🔢 Weighted Calculation: ({base_ml_risk}×0.3) + ({progressive_bonus}×0.7) = {final_risk_score}%")
-        print(f"{'='*60}\n")
-        
-        # ============================================================
-        # === END PROGRESSIVE RISK CALCULATION ===
-        # ============================================================
-        
-        ml_confidence = 100.0
-        
-        # 4. Generate Top Risk Factors for response
-        # Use detailed factors if available, otherwise use legacy logic
-        if risk_factors_detailed:
-            factors = risk_factors_detailed[:3]  # Top 3 factors
-        else:
-            # Legacy factor generation
-            factors = []
-            if input_data['hr'] > 110: 
-                factors.append(f"Elevated HR ({input_data['hr']} bpm)")
-            if input_data['ambientGasPpm'] > 50: 
-                factors.append(f"High Gas ({input_data['ambientGasPpm']} ppm)")
-            if not input_data['ppeCompliant']: 
-                factors.append("PPE Violation (Missing Item)")
-            if input_data['shiftDurationHours'] > 8: 
-                factors.append("Long Shift (Fatigue)")
-            if not factors: 
-                factors.append("Baseline industrial risk")
-        
-        # 5. Get the final advisory text (using FINAL risk score)
-        advisory_data = get_advisory_and_risk(final_risk_score)
-        
-        print(f"✅ Final Risk Score for {context.workerId}: {final_risk_score}%")
-
-        # 6. Build and return the final response
-        return RiskResponse(
-            workerId=context.workerId,
-            risk=final_risk_score,              # Use final enhanced score
-            riskScore=final_risk_score,         # Use final enhanced score
-            confidence=ml_confidence,
-            topRiskFactors=factors[:3],
-            advisoryHinglish=advisory_data['advisory'],
-            modelUsed="XGBoost_v1_Enhanced",
-            timestamp=datetime.datetime.now().isoformat()
-        )
+        response = await score_ml_single(context, debug)
+        feature_cache.put(context.workerId, cache_key, response)
+        return response
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error during prediction: {e}")
-        print(traceback.format_exc())
+        logger.error("prediction_failed", exc_info=e, extra={"fields": {"worker_id": context.workerId}})
         raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
 
-# --- 4. Run the server ---
+# --- 5. The Batch /predict/batch Endpoint ---
+@app.post("/predict/batch", response_model=List[RiskResponse])
+async def predict_risk_batch(contexts: List[UnifiedWorkerContext], request: Request):
+    """
+    Scores many workers in one call. Rules run on every context; only the
+    rows no rule claimed and the cache can't answer go through a single
+    model call.
+    Responses come back in input order.
+    """
+    return await predict_rows(
+        [context.workerId for context in contexts],
+        [context.visionTelemetry.missingItems for context in contexts],
+        run_hazard_chain_rules_batch(contexts),
+        lambda i: quantize(contexts[i]),
+        lambda rows: executor.score_batch([contexts[i] for i in rows]),
+        debug=wants_breakdown(request)
+    )
+
+# --- 6. Compact Wire Format (both endpoints) ---
+async def predict_compact(request: Request, content_type: str):
+    """
+    /predict and /predict/batch for application/x-suraksha-uwc and
+    application/msgpack bodies (see wire_format.py). The body decodes
+    straight into rule columns and the feature matrix, skipping the
+    nested pydantic models. /predict expects exactly one record and,
+    unlike the JSON path, isn't coalesced; batch the records instead.
+    Compact records carry no missing-PPE list.
+    """
+    try:
+        batch = decode_compact(await request.body(), content_type)
+        single = request.url.path == "/predict"
+        if single and len(batch) != 1:
+            raise WireFormatError(f"/predict takes exactly one record, got {len(batch)}")
+    except WireFormatError as e:
+        status = 415 if isinstance(e, UnsupportedWireFormat) else 422
+        return JSONResponse(status_code=status, content={"detail": str(e)})
+
+    features = batch.features()
+    try:
+        responses = await predict_rows(
+            batch.worker_ids,
+            [None] * len(batch),
+            run_hazard_chain_rules_columns(batch.columns, len(batch)),
+            lambda i: quantize_values(features[i]),
+            lambda rows: executor.score_features(features[rows]),
+            debug=wants_breakdown(request)
+        )
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
+
+    content = [response.model_dump() for response in responses]
+    return JSONResponse(content=content[0] if single else content)
+
+
+app.add_middleware(CompactWireMiddleware, handler=predict_compact, paths=("/predict", "/predict/batch"))
+
+# --- 7. Run the server ---
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
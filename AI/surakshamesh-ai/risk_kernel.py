@@ -0,0 +1,205 @@
+#
+# File: risk_kernel.py
+#
+# Vectorized version of the v3.1 progressive risk calculation.
+# Scores a whole batch of MODEL_FEATURES rows with NumPy array ops
+# and keeps the per-factor contributions around, so the
+# topRiskFactors strings are only formatted for rows that need them.
+#
+# Must stay bit-identical to the original scalar rules
+# (run 'python3 check_risk_parity.py' after touching anything here).
+#
+
+import numpy as np
+from typing import List, Optional
+
+from features import FEATURE_INDEX, INT_FEATURES
+
+# --- 1. Factor Table ---
+# (factor name, feature it reads, label template) in the order the
+# original "Factor N" blocks ran. Order matters: it drives both the
+# summation order and the order of the topRiskFactors strings.
+FACTORS = [
+    ('ppe', 'ppeCompliant', "PPE Violation (+{penalty}%)"),
+    ('hr', 'hr', "Elevated HR: {value} bpm (+{penalty}%)"),
+    ('skinTemp', 'skinTemp', "Heat Stress: {value}°C (+{penalty}%)"),
+    ('shift', 'shiftDurationHours', "Fatigue: {value}h shift (+{penalty}%)"),
+    ('gas', 'ambientGasPpm', "High Gas: {value} ppm (+{penalty}%)"),
+    ('zoneTemp', 'zoneTemp', "Hot Zone: {value}°C (+{penalty}%)"),
+    ('spo2', 'spo2', "Low O2: {value}% SpO2 (+{penalty}%)"),
+    ('history', 'pastIncidentCount', "History: {value} past incidents (+{penalty}%)"),
+]
+
+BASELINE_RISK = 12   # Industrial environments always have some risk
+MAX_RISK = 95        # Reserve 100 for SOS
+ML_WEIGHT = 0.3
+PROGRESSIVE_WEIGHT = 0.7
+
+
+def _format_value(feature: str, value: float):
+    """Renders a feature the way the scalar path's f-strings did."""
+    if feature in INT_FEATURES:
+        return int(value)
+    return float(value)
+
+
+# --- 2. Batch Result ---
+class ProgressiveRiskBatch:
+    """
+    Output of compute_progressive_risk for N rows.
+
+    - triggered:  (8, N) bool, which factor blocks fired per row
+    - penalties:  (8, N) float64, each factor's contribution (0 if not fired)
+    - progressive_bonus, weighted_ml, baseline_applied, final_risk: (N,)
+    """
+
+    def __init__(self, features, ml_risk, triggered, penalties,
+                 progressive_bonus, weighted_ml, baseline_applied, final_risk):
+        self.features = features
+        self.ml_risk = ml_risk
+        self.triggered = triggered
+        self.penalties = penalties
+        self.progressive_bonus = progressive_bonus
+        self.weighted_ml = weighted_ml
+        self.baseline_applied = baseline_applied
+        self.final_risk = final_risk
+
+    def __len__(self) -> int:
+        return len(self.final_risk)
+
+    def risk(self, i: int) -> int:
+        return int(self.final_risk[i])
+
+    def factor_breakdown(self, i: int, missing_items: Optional[List[str]] = None) -> List[str]:
+        """
+        Every fired factor for row i, formatted exactly like the
+        original risk_factors_detailed list.
+        """
+        return self._factor_strings(i, missing_items, limit=None)
+
+    def breakdown(self, i: int, missing_items: Optional[List[str]] = None) -> dict:
+        """
+        The full calculation for row i (what the old per-factor prints
+        showed), for debug logging.
+        """
+        return {
+            "ml_base_risk": int(self.ml_risk[i]),
+            "progressive_bonus": float(self.progressive_bonus[i]),
+            "weighted_ml": int(self.weighted_ml[i]),
+            "weighted_progressive": int(np.trunc(self.progressive_bonus[i] * PROGRESSIVE_WEIGHT)),
+            "baseline_applied": bool(self.baseline_applied[i]),
+            "final_risk": int(self.final_risk[i]),
+            "factors": self.factor_breakdown(i, missing_items),
+        }
+
+    def top_risk_factors(self, i: int, missing_items: Optional[List[str]] = None, limit: int = 3) -> List[str]:
+        """
+        The topRiskFactors list for row i. Stops formatting as soon
+        as `limit` strings have been produced.
+        """
+        factors = self._factor_strings(i, missing_items, limit=limit)
+        if not factors:
+            # The legacy fallback (HR > 110, gas > 50, PPE, shift > 8) can
+            # only run when no factor fired, and every one of its checks
+            # implies a factor would have fired, so it always lands here.
+            factors = ["Baseline industrial risk"]
+        return factors
+
+    def _factor_strings(self, i: int, missing_items: Optional[List[str]], limit: Optional[int]) -> List[str]:
+        factors = []
+        for k, (name, feature, template) in enumerate(FACTORS):
+            if limit is not None and len(factors) >= limit:
+                break
+            if not self.triggered[k, i]:
+                continue
+
+            value = _format_value(feature, self.features[i, FEATURE_INDEX[feature]])
+            factors.append(template.format(value=value, penalty=int(self.penalties[k, i])))
+
+            # Add specific missing items if available
+            if name == 'ppe' and missing_items:
+                factors.append(f"Missing: {', '.join(missing_items)}")
+
+        return factors if limit is None else factors[:limit]
+
+
+# --- 3. The Kernel ---
+def compute_progressive_risk(features, ml_risk) -> ProgressiveRiskBatch:
+    """
+    Applies the progressive multi-factor adjustment to a batch.
+
+    `features` is an (N, 9) array ordered by MODEL_FEATURES and
+    `ml_risk` the N integer ML base risks (int(prob * 100)).
+    """
+    X = np.asarray(features, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    ml_risk = np.asarray(ml_risk, dtype=np.float64).reshape(-1)
+
+    def col(name):
+        return X[:, FEATURE_INDEX[name]]
+
+    hr = col('hr')
+    spo2 = col('spo2')
+    skin_temp = col('skinTemp')
+    gas = col('ambientGasPpm')
+    zone_temp = col('zoneTemp')
+    ppe = col('ppeCompliant')
+    shift = col('shiftDurationHours')
+    past = col('pastIncidentCount')
+
+    n = X.shape[0]
+    triggered = np.empty((len(FACTORS), n), dtype=bool)
+    penalties = np.zeros((len(FACTORS), n), dtype=np.float64)
+
+    # Factor 1: PPE violation, flat +45%
+    triggered[0] = ppe == 0
+    penalties[0] = 45.0
+    # Factor 2: +5% per 5 bpm over 100, max +25%
+    triggered[1] = hr > 100
+    penalties[1] = np.minimum(((hr - 100) // 5) * 5, 25)
+    # Factor 3: +15% per degree over 37.5°C, max +30%
+    triggered[2] = skin_temp > 37.5
+    penalties[2] = np.minimum(np.trunc((skin_temp - 37.5) * 15), 30)
+    # Factor 4: +6% per hour over 7h, max +20%
+    triggered[3] = shift > 7
+    penalties[3] = np.minimum(np.trunc((shift - 7) * 6), 20)
+    # Factor 5: +2% per 3 ppm over 45, max +20%
+    triggered[4] = gas > 45
+    penalties[4] = np.minimum(((gas - 45) // 3) * 2, 20)
+    # Factor 6: +3% per 5°C over 40, max +15%
+    triggered[5] = zone_temp > 40
+    penalties[5] = np.minimum((zone_temp - 40) // 5 * 3, 15)
+    # Factor 7: +3% per SpO2 point below 95, uncapped
+    triggered[6] = spo2 < 95
+    penalties[6] = (95 - spo2) * 3
+    # Factor 8: +8% per past incident, max +25%
+    triggered[7] = past > 0
+    penalties[7] = np.minimum(past * 8, 25)
+
+    penalties[~triggered] = 0.0
+
+    # Accumulate in the original factor order (keeps float sums identical)
+    progressive_bonus = np.zeros(n, dtype=np.float64)
+    for k in range(len(FACTORS)):
+        progressive_bonus += penalties[k]
+
+    # Weighted combination: 30% ML + 70% Progressive, each truncated like int()
+    weighted_ml = np.trunc(ml_risk * ML_WEIGHT)
+    weighted_progressive = np.trunc(progressive_bonus * PROGRESSIVE_WEIGHT)
+    final_risk = weighted_ml + weighted_progressive
+
+    baseline_applied = (final_risk < BASELINE_RISK) & (ppe != 0)
+    final_risk = np.where(baseline_applied, BASELINE_RISK, final_risk)
+    final_risk = np.minimum(final_risk, MAX_RISK).astype(np.int64)
+
+    return ProgressiveRiskBatch(
+        features=X,
+        ml_risk=ml_risk,
+        triggered=triggered,
+        penalties=penalties,
+        progressive_bonus=progressive_bonus,
+        weighted_ml=weighted_ml,
+        baseline_applied=baseline_applied,
+        final_risk=final_risk
+    )
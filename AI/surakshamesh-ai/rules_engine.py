@@ -5,9 +5,22 @@
 # It checks for deterministic, high-risk "hazard chains"
 # and generates the correct advisory.
 #
+# The hazard chains live in a rules file (hazard_rules.json by
+# default, or SURAKSHA_RULES_FILE; .yaml/.yml also accepted), are
+# compiled at startup into a vectorized evaluator that runs over a
+# whole batch of contexts at once, and are hot-reloaded when the
+# file changes.
+#
 
-from schemas import UnifiedWorkerContext # We re-use our schema
-from typing import Optional, Tuple, Dict, Any
+import os
+import json
+import time
+import operator
+import numpy as np
+from schemas import (UnifiedWorkerContext, BadgeTelemetry, VisionTelemetry,
+                     SCADAContext, WorkerProfile) # We re-use our schema
+from typing import Optional, Tuple, Dict, Any, List
+from engine_logging import logger
 
 # --- 1. The Advisory Mapping ---
 # This function maps a risk score to a specific action.
@@ -49,6 +62,228 @@ def get_advisory_and_risk(risk_score: int) -> Dict[str, Any]:
 
 # --- 2. The Hazard-Chain Rule Engine ---
 # This is the "common sense" expert system.
+# Each rule is a list of conditions (all must hold). Rules are tried in
+# priority order (highest first, file order breaks ties) and the first
+# match wins.
+
+RULES_FILENAME = os.environ.get("SURAKSHA_RULES_FILE", "hazard_rules.json")
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# Used when the rules file can't be loaded at startup: worker-down
+# overrides must never disappear because of a bad deploy.
+FALLBACK_RULES = {
+    "modelUsed": "Rule_Engine_v1",
+    "rules": [
+        {"id": "R1_SOS", "priority": 100, "riskScore": 100, "reason": "SOS Button Activated",
+         "when": [{"field": "badgeTelemetry.sosActive", "op": "==", "value": True}]},
+        {"id": "R1_FALL", "priority": 100, "riskScore": 100, "reason": "Fall Detected",
+         "when": [{"field": "badgeTelemetry.fallDetected", "op": "==", "value": True}]},
+    ]
+}
+
+# A fully-defaulted context, used to check rule field paths at compile time
+_SAMPLE_CONTEXT = UnifiedWorkerContext(
+    workerId="_", timestamp="_",
+    badgeTelemetry=BadgeTelemetry(), visionTelemetry=VisionTelemetry(),
+    scadaContext=SCADAContext(), workerProfile=WorkerProfile()
+)
+
+
+def _as_number(value, missing: float = np.nan) -> float:
+    """Rule fields as floats: bools become 0/1, missing values `missing` (NaN never matches)."""
+    if value is None:
+        return missing
+    return float(value)
+
+
+class CompiledRules:
+    """
+    A rules spec compiled into column lookups and NumPy comparisons.
+    """
+
+    def __init__(self, spec: Dict[str, Any], source: str):
+        self.source = source
+        model_used = spec.get("modelUsed", "Rule_Engine_v1")
+
+        indexed = list(enumerate(spec["rules"]))
+        indexed.sort(key=lambda item: (-item[1].get("priority", 0), item[0]))
+
+        self.fields: List[str] = []
+        self.rules: List[Dict[str, Any]] = []
+        for _, rule in indexed:
+            conditions = []
+            for cond in rule["when"]:
+                field, op = cond["field"], cond["op"]
+                if op not in OPERATORS:
+                    raise ValueError(f"Rule {rule['id']}: unknown operator '{op}'")
+                try:
+                    operator.attrgetter(field)(_SAMPLE_CONTEXT)
+                except AttributeError:
+                    raise ValueError(f"Rule {rule['id']}: unknown field '{field}'")
+                if field not in self.fields:
+                    self.fields.append(field)
+                conditions.append((self.fields.index(field), OPERATORS[op], _as_number(cond["value"])))
+
+            self.rules.append({
+                "id": rule["id"],
+                "conditions": conditions,
+                "result": {
+                    "riskScore": int(rule["riskScore"]),
+                    "reason": rule["reason"],
+                    "modelUsed": rule.get("modelUsed", model_used),
+                    "ruleId": rule["id"],
+                }
+            })
+
+        self._getters = [operator.attrgetter(field) for field in self.fields]
+        # An explicit null flag reads as false, as the model features treat
+        # it (isCompliant: null is non-compliant); null numbers never match
+        self._missing = [0.0 if isinstance(get(_SAMPLE_CONTEXT), bool) else np.nan for get in self._getters]
+
+    def extract(self, contexts: List[UnifiedWorkerContext]) -> np.ndarray:
+        """(N, F) float matrix of every field any rule reads."""
+        values = np.empty((len(contexts), len(self.fields)), dtype=np.float64)
+        for i, context in enumerate(contexts):
+            values[i] = [_as_number(get(context), missing) for get, missing in zip(self._getters, self._missing)]
+        return values
+
+    def extract_columns(self, columns: Dict[str, np.ndarray], n: int) -> np.ndarray:
+        """
+        Same matrix from pre-decoded columns keyed by field path (the
+        compact wire format). Fields the columns don't carry take the
+        schema default.
+        """
+        values = np.empty((n, len(self.fields)), dtype=np.float64)
+        for col, (field, get) in enumerate(zip(self.fields, self._getters)):
+            if field in columns:
+                values[:, col] = columns[field]
+            else:
+                values[:, col] = _as_number(get(_SAMPLE_CONTEXT))
+        return values
+
+    def evaluate(self, contexts: List[UnifiedWorkerContext]) -> List[Optional[Dict[str, Any]]]:
+        """
+        First matching rule's result per context (None if no rule fires).
+        Each rule costs one vectorized pass over the batch.
+        """
+        if not contexts or not self.rules:
+            return [None] * len(contexts)
+        return self.evaluate_values(self.extract(contexts))
+
+    def evaluate_values(self, values: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        """evaluate() over an already-extracted (N, F) field matrix."""
+        n = values.shape[0]
+        if n == 0 or not self.rules:
+            return [None] * n
+
+        winner = np.full(n, -1, dtype=np.int64)
+        undecided = np.ones(n, dtype=bool)
+
+        for k, rule in enumerate(self.rules):
+            match = undecided.copy()
+            for col, compare, threshold in rule["conditions"]:
+                match &= compare(values[:, col], threshold)
+            winner[match] = k
+            undecided &= ~match
+            if not undecided.any():
+                break
+
+        return [dict(self.rules[k]["result"]) if k >= 0 else None for k in winner]
+
+
+def _load_spec(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class HazardRuleEngine:
+    """
+    Holds the compiled rules and swaps in a recompiled set whenever the
+    rules file's mtime changes (checked at most every check_interval_s).
+    A file that fails to compile is logged and the previous rules stay.
+    """
+
+    def __init__(self, path: str = RULES_FILENAME, check_interval_s: float = 1.0):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._mtime = None
+        self._next_check = 0.0
+        self.reloads = 0
+
+        try:
+            self._load()
+        except Exception as e:
+            logger.error("rules_load_failed", extra={"fields": {"path": path, "error": str(e)}})
+            self.compiled = CompiledRules(FALLBACK_RULES, source="<fallback>")
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        self.compiled = CompiledRules(_load_spec(self.path), source=self.path)
+        self._mtime = mtime
+        logger.info("rules_loaded", extra={"fields": {
+            "path": self.path, "rules": [r["id"] for r in self.compiled.rules]}})
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval_s
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+
+        try:
+            self._load()
+            self.reloads += 1
+        except Exception as e:
+            self._mtime = mtime  # don't retry a broken file until it changes again
+            logger.error("rules_reload_failed", extra={"fields": {"path": self.path, "error": str(e)}})
+
+    def evaluate(self, contexts: List[UnifiedWorkerContext]) -> List[Optional[Dict[str, Any]]]:
+        self.maybe_reload()
+        return self.compiled.evaluate(contexts)
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], n: int) -> List[Optional[Dict[str, Any]]]:
+        self.maybe_reload()
+        compiled = self.compiled
+        return compiled.evaluate_values(compiled.extract_columns(columns, n))
+
+
+hazard_rules = HazardRuleEngine()
+
+
+def run_hazard_chain_rules_batch(contexts: List[UnifiedWorkerContext]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Runs the hazard chains over a batch. For each context returns a dict
+    with (riskScore, reason, modelUsed, ruleId) if a rule is triggered,
+    otherwise None.
+    """
+    return hazard_rules.evaluate(contexts)
+
+
+def run_hazard_chain_rules_columns(columns: Dict[str, np.ndarray], n: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    run_hazard_chain_rules_batch() for n rows already decoded into
+    columns keyed by field path (see wire_format.CompactBatch).
+    """
+    return hazard_rules.evaluate_columns(columns, n)
+
+
 def run_hazard_chain_rules(context: UnifiedWorkerContext) -> Optional[Dict[str, Any]]:
     """
     Checks for deterministic, high-risk "facts" that
@@ -57,55 +292,4 @@ def run_hazard_chain_rules(context: UnifiedWorkerContext) -> Optional[Dict[str,
     Returns a dict with (riskScore, reason) if a rule is triggered,
     otherwise returns None.
     """
-    
-    # Get sensor values for easy access
-    badge = context.badgeTelemetry
-    scada = context.scadaContext
-    vision = context.visionTelemetry
-    profile = context.workerProfile
-
-    # --- RULE 1: CRITICAL - Worker Down (SOS or Fall) ---
-    # This is the highest priority. Risk = 100.
-    if badge.sosActive:
-        return {
-            "riskScore": 100,
-            "reason": "SOS Button Activated",
-            "modelUsed": "Rule_Engine_v1"
-        }
-    if badge.fallDetected:
-        return {
-            "riskScore": 100,
-            "reason": "Fall Detected",
-            "modelUsed": "Rule_Engine_v1"
-        }
-
-    # --- RULE 2: HIGH - Critical Gas Leak ---
-    # (High gas + high temp + worker present)
-    if scada.ambientGasPpm > 75 and scada.zoneTemp > 40:
-        return {
-            "riskScore": 95,
-            "reason": "Critical Gas + High Temp in Zone",
-            "modelUsed": "Rule_Engine_v1"
-        }
-
-    # --- RULE 3: HIGH - Hypoxia/Heat Stroke Risk ---
-    # (High HR + High Temp + Long Shift)
-    if badge.hr > 130 and badge.skinTemp > 38.5 and profile.shiftDurationHours > 6:
-        return {
-            "riskScore": 90,
-            "reason": "Heat Stroke Risk (High HR + Temp + Long Shift)",
-            "modelUsed": "Rule_Engine_v1"
-        }
-
-    # --- RULE 4: CAUTION - Fatigue + PPE Violation ---
-    if profile.fatigueScore > 0.7 and not vision.ppeCompliant:
-        return {
-            "riskScore": 75,
-            "reason": "Fatigue + PPE Violation",
-            "modelUsed": "Rule_Engine_v1"
-        }
-
-    # --- No rules triggered ---
-    # If we get here, no high-priority "facts" were found,
-    # so we should trust the ML model's prediction.
-    return None
\ No newline at end of file
+    return hazard_rules.evaluate([context])[0]
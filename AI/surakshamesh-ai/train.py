@@ -2,25 +2,26 @@
 # File: train.py
 #
 # This script trains our v1 XGBoost model on the data
-# we just generated. It saves the trained model to a file.
+# we just generated. It saves the trained model to a file,
+# plus a compiled copy for the pure-NumPy evaluator.
+#
+# Usage:
+#   python3 train.py                 # train + save + compile
+#   python3 train.py --export-only   # only compile the existing .pkl
 #
 
+import sys
+import json
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 import joblib # Used to save the model
 
-print("Starting model training...")
+from tree_model import TreeEnsemble, TREES_FILENAME
 
-# 1. Load the dataset
-try:
-    df = pd.read_csv('training_data.csv')
-except FileNotFoundError:
-    print("ERROR: 'training_data.csv' not found.")
-    print("Please run 'python3 generate_dataset.py' first.")
-    exit()
+model_filename = 'xgboost_model.pkl'
 
-# 2. Define our Features (X) and Target (y)
 # These are the *exact* features our API will receive.
 features = [
     'hr',
@@ -34,6 +35,107 @@ features = [
     'age'
 ]
 
+
+def export_tree_arrays(model, filename=TREES_FILENAME):
+    """
+    Dumps the booster into flat node arrays (feature index, threshold,
+    left/right child, default direction, leaf value) for tree_model.py.
+    """
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic can be compiled, got '{objective}'")
+
+    trees = learner['gradient_booster']['model']['trees']
+    columns = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'default_left', 'leaf_value')}
+    roots = []
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        left = np.array(tree['left_children'], dtype=np.int32)
+        right = np.array(tree['right_children'], dtype=np.int32)
+        is_leaf = left == -1
+        # For leaves XGBoost stores the leaf output in split_conditions
+        conditions = np.array(tree['split_conditions'], dtype=np.float32)
+
+        roots.append(offset)
+        columns['feature'].append(np.array(tree['split_indices'], dtype=np.int32))
+        columns['threshold'].append(np.where(is_leaf, np.float32(0), conditions))
+        columns['left'].append(np.where(is_leaf, -1, left + offset))
+        columns['right'].append(np.where(is_leaf, -1, right + offset))
+        columns['default_left'].append(np.array(tree['default_left'], dtype=bool))
+        columns['leaf_value'].append(np.where(is_leaf, conditions, np.float32(0)))
+
+        # Depth of the deepest leaf, walking parents up to the root
+        parents = tree['parents']
+        for node in np.flatnonzero(is_leaf):
+            depth = 0
+            while node != 0:
+                node = parents[node]
+                depth += 1
+            max_depth = max(max_depth, depth)
+
+        offset += len(left)
+
+    # base_score is stored as a probability; the trees add to its logit
+    base_score = np.float32(float(learner['learner_model_param']['base_score'].strip('[]')))
+    base_margin = np.float32(-np.log(np.float32(1.0) / base_score - np.float32(1.0)))
+
+    np.savez(
+        filename,
+        roots=np.array(roots, dtype=np.int32),
+        base_margin=base_margin,
+        max_depth=np.int32(max_depth),
+        feature_names=np.array(booster.feature_names or features),
+        **{k: np.concatenate(v) for k, v in columns.items()}
+    )
+    print(f"Compiled {len(trees)} trees (depth {max_depth}) to '{filename}'")
+
+
+def check_tree_parity(model, X, filename=TREES_FILENAME):
+    """
+    Asserts the NumPy evaluator reproduces the booster: identical margins,
+    probabilities within 1 float32 ULP (numpy's exp vs the C expf the
+    booster uses) and identical integer ML risk scores.
+    """
+    booster = model.get_booster()
+    ensemble = TreeEnsemble.load(filename)
+    X = np.asarray(X, dtype=np.float32)
+
+    expected_margin = booster.inplace_predict(X, predict_type='margin')
+    expected_prob = booster.inplace_predict(X)
+    got_margin = ensemble.predict_margin(X)
+    got_prob = ensemble.predict_proba(X)
+
+    assert np.array_equal(expected_margin, got_margin), "Margins differ from the booster"
+    ulps = np.abs(expected_prob.view(np.int32) - got_prob.view(np.int32))
+    assert ulps.max() <= 1, f"Probabilities differ by up to {ulps.max()} ULP"
+    assert np.array_equal((expected_prob * 100).astype(np.int64), (got_prob * 100).astype(np.int64)), \
+        "ML risk scores differ from the booster"
+
+    print(f"Parity OK on {len(X)} rows ({(ulps == 0).mean() * 100:.2f}% bit-identical probabilities)")
+
+
+# 1. Load the dataset
+try:
+    df = pd.read_csv('training_data.csv')
+except FileNotFoundError:
+    print("ERROR: 'training_data.csv' not found.")
+    print("Please run 'python3 generate_dataset.py' first.")
+    exit()
+
+if '--export-only' in sys.argv:
+    model = joblib.load(model_filename)
+    export_tree_arrays(model)
+    check_tree_parity(model, df[features])
+    exit()
+
+print("Starting model training...")
+
+# 2. Define our Features (X) and Target (y)
 target = 'accident_occurred'
 
 X = df[features]
@@ -64,9 +166,13 @@ accuracy = model.score(X_test, y_test)
 print(f"Model trained. Test Accuracy: {accuracy * 100:.2f}%")
 
 # 6. Save the trained model to a file
-model_filename = 'xgboost_model.pkl'
 joblib.dump(model, model_filename)
 
 print(f"Model successfully saved to '{model_filename}'")
+
+# 7. Compile the trees for the NumPy evaluator and verify them
+export_tree_arrays(model)
+check_tree_parity(model, X)
+
 print("---")
-print("TRAINING COMPLETE")
\ No newline at end of file
+print("TRAINING COMPLETE")
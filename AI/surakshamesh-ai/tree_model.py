@@ -0,0 +1,94 @@
+#
+# File: tree_model.py
+#
+# Pure-NumPy evaluator for the trained XGBoost model.
+# 'python3 train.py' compiles the booster into flat node arrays
+# (xgboost_model_trees.npz); this file loads them and scores whole
+# batches with a vectorized, fixed-depth tree walk. No xgboost,
+# sklearn or pandas needed at runtime.
+#
+
+import numpy as np
+
+TREES_FILENAME = "xgboost_model_trees.npz"
+
+
+class TreeEnsemble:
+    """
+    A binary:logistic tree ensemble stored as flat node arrays.
+
+    All trees share one node table. For node i:
+    - feature[i], threshold[i]: go left when x[feature] < threshold
+    - left[i], right[i]: child node ids (-1 in the file for leaves)
+    - default_left[i]: direction for missing (NaN) values
+    - leaf_value[i]: output of the node when it is a leaf
+    roots[t] is the node id of tree t's root.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left,
+                 leaf_value, roots, base_margin, max_depth, feature_names):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.base_margin = np.float32(base_margin)
+        self.max_depth = int(max_depth)
+        self.feature_names = [str(f) for f in feature_names]
+
+        # Leaves point at themselves, so every row can take exactly
+        # max_depth steps without branching on "already at a leaf"
+        node_ids = np.arange(len(self.feature), dtype=np.int32)
+        left = np.asarray(left, dtype=np.int32)
+        right = np.asarray(right, dtype=np.int32)
+        is_leaf = left < 0
+        self.left = np.where(is_leaf, node_ids, left)
+        self.right = np.where(is_leaf, node_ids, right)
+        self.feature = np.where(is_leaf, 0, self.feature)
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def load(cls, path: str = TREES_FILENAME) -> "TreeEnsemble":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                default_left=data["default_left"],
+                leaf_value=data["leaf_value"],
+                roots=data["roots"],
+                base_margin=data["base_margin"],
+                max_depth=data["max_depth"],
+                feature_names=data["feature_names"]
+            )
+
+    def predict_leaves(self, X) -> np.ndarray:
+        """(N, num_trees) leaf node id reached by every row in every tree."""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.num_trees)).copy()
+
+        for _ in range(self.max_depth):
+            value = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(value), self.default_left[node], value < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return node
+
+    def predict_margin(self, X) -> np.ndarray:
+        """Raw log-odds, summed in float32 tree by tree like XGBoost does."""
+        leaves = self.leaf_value[self.predict_leaves(X)]
+        base = np.full((leaves.shape[0], 1), self.base_margin, dtype=np.float32)
+        # cumsum accumulates sequentially (a plain sum would reorder it)
+        return np.cumsum(np.hstack([base, leaves]), axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Positive-class probability, mirroring XGBoost's float32 sigmoid."""
+        margin = self.predict_margin(X)
+        x = np.minimum(-margin, np.float32(88.7))
+        exp = np.exp(x.astype(np.float64)).astype(np.float32)
+        return np.float32(1.0) / (exp + np.float32(1.0) + np.float32(1e-16))
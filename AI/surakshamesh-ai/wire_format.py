@@ -0,0 +1,241 @@
+#
+# File: wire_format.py
+#
+# Compact request encodings for the AI engine. Instead of the full
+# nested UWC JSON (which the backend pads with dozens of alias keys),
+# a client can send just the nine model features plus the rule flags:
+#
+#   Content-Type: application/x-suraksha-uwc
+#     b"SMW1" + uint32 record count + fixed little-endian records
+#     laid out as STRUCT_DTYPE, RECORD_BYTES each: workerId (32 bytes,
+#     UTF-8, NUL-padded), the nine features as float64, a flags byte
+#     and 7 pad bytes. NaN = not provided.
+#
+#   Content-Type: application/msgpack   (needs the 'msgpack' package)
+#     an array of flat arrays in FLAT_FIELDS order; null = not provided.
+#
+# Both decode straight into column arrays (CompactBatch) with no
+# per-record pydantic models. Values that weren't provided take the
+# same schema defaults a JSON request would get.
+#
+
+import struct
+import numpy as np
+from typing import Dict, List
+from starlette.requests import Request
+
+from features import MODEL_FEATURES, INT_FEATURES
+
+STRUCT_CONTENT_TYPE = "application/x-suraksha-uwc"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPACT_CONTENT_TYPES = (STRUCT_CONTENT_TYPE,) + MSGPACK_CONTENT_TYPES
+
+MAGIC = b"SMW1"
+HEADER = struct.Struct("<4sI")
+WORKER_ID_BYTES = 32
+
+# (wire name, UWC field path, schema default) in wire order
+FLAT_FIELDS = [
+    ("hr", "badgeTelemetry.hr", 72),
+    ("spo2", "badgeTelemetry.spo2", 99),
+    ("skinTemp", "badgeTelemetry.skinTemp", 36.5),
+    ("ambientGasPpm", "scadaContext.ambientGasPpm", 30),
+    ("zoneTemp", "scadaContext.zoneTemp", 35),
+    ("shiftDurationHours", "workerProfile.shiftDurationHours", 6.5),
+    ("pastIncidentCount", "workerProfile.pastIncidentCount", 0),
+    ("age", "workerProfile.age", 28),
+    ("fatigueScore", "workerProfile.fatigueScore", 0.3),
+    ("isCompliant", "visionTelemetry.isCompliant", True),
+    ("sosActive", "badgeTelemetry.sosActive", False),
+    ("fallDetected", "badgeTelemetry.fallDetected", False),
+    ("zoneAlarmActive", "scadaContext.zoneAlarmActive", False),
+]
+FLAG_FIELDS = ["isCompliant", "sosActive", "fallDetected", "zoneAlarmActive"]
+NUMERIC_FIELDS = [name for name, _, _ in FLAT_FIELDS if name not in FLAG_FIELDS]
+
+# Flags byte: bit 0 isCompliant, 1 sosActive, 2 fallDetected, 3 zoneAlarmActive.
+# Bit 7 set means "isCompliant not provided" (schema default True applies).
+FLAG_COMPLIANCE_UNKNOWN = 0x80
+
+STRUCT_DTYPE = np.dtype(
+    [("workerId", f"S{WORKER_ID_BYTES}")]
+    + [(name, "<f8") for name in NUMERIC_FIELDS]
+    + [("flags", "u1"), ("_pad", "V7")]
+)
+RECORD_BYTES = STRUCT_DTYPE.itemsize  # 112
+
+# Mirrors features.feature_values: these use `value or default`
+FEATURE_DEFAULTS = {
+    'hr': 72, 'spo2': 99, 'skinTemp': 36.5, 'ambientGasPpm': 30, 'zoneTemp': 35,
+    'shiftDurationHours': 6.5, 'pastIncidentCount': 0, 'age': 28
+}
+
+
+class WireFormatError(ValueError):
+    """The body doesn't match the declared compact encoding."""
+
+
+class UnsupportedWireFormat(WireFormatError):
+    """The encoding is known but can't be decoded on this engine."""
+
+
+class CompactBatch:
+    """
+    Decoded compact request: worker ids plus one float64 column per
+    FLAT_FIELDS entry, keyed by its UWC field path (flags as 0/1).
+    """
+
+    def __init__(self, worker_ids: List[str], columns: Dict[str, np.ndarray]):
+        self.worker_ids = worker_ids
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.worker_ids)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[_PATHS[name]]
+
+    def features(self) -> np.ndarray:
+        """(N, 9) MODEL_FEATURES matrix, defaults applied like feature_values()."""
+        out = np.empty((len(self), len(MODEL_FEATURES)), dtype=np.float64)
+        for j, name in enumerate(MODEL_FEATURES):
+            if name == 'ppeCompliant':
+                out[:, j] = self.column('isCompliant')
+                continue
+            values = self.column(name)
+            out[:, j] = np.where(values == 0, FEATURE_DEFAULTS[name], values)
+        return out
+
+
+_PATHS = {name: path for name, path, _ in FLAT_FIELDS}
+_DEFAULTS = {name: float(default) for name, _, default in FLAT_FIELDS}
+
+
+def _finish(worker_ids: List[str], raw: Dict[str, np.ndarray]) -> CompactBatch:
+    """Applies schema defaults for missing (NaN) values and checks int fields."""
+    columns = {}
+    for name, path, _ in FLAT_FIELDS:
+        values = raw[name]
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, _DEFAULTS[name], values)
+        if name in INT_FEATURES and not np.array_equal(values, np.trunc(values)):
+            raise WireFormatError(f"'{name}' must be an integer")
+        columns[path] = values
+    if any(not w for w in worker_ids):
+        raise WireFormatError("every record needs a workerId")
+    return CompactBatch(worker_ids, columns)
+
+
+# --- 1. Fixed Struct Layout ---
+def decode_struct(body: bytes) -> CompactBatch:
+    if len(body) < HEADER.size:
+        raise WireFormatError("body shorter than the header")
+    magic, count = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise WireFormatError(f"bad magic {magic!r}, expected {MAGIC!r}")
+    expected = HEADER.size + count * RECORD_BYTES
+    if len(body) != expected:
+        raise WireFormatError(f"expected {expected} bytes for {count} records, got {len(body)}")
+
+    records = np.frombuffer(body, dtype=STRUCT_DTYPE, count=count, offset=HEADER.size)
+    flags = records["flags"]
+
+    raw = {name: records[name].astype(np.float64) for name in NUMERIC_FIELDS}
+    for bit, name in enumerate(FLAG_FIELDS):
+        raw[name] = ((flags >> bit) & 1).astype(np.float64)
+    raw["isCompliant"][(flags & FLAG_COMPLIANCE_UNKNOWN) != 0] = np.nan
+
+    worker_ids = [w.rstrip(b"\0").decode("utf-8") for w in records["workerId"].tolist()]
+    return _finish(worker_ids, raw)
+
+
+def encode_struct(records: List[dict]) -> bytes:
+    """
+    Client-side helper: flat dicts (workerId + FLAT_FIELDS names, any
+    subset) -> application/x-suraksha-uwc body.
+    """
+    out = np.zeros(len(records), dtype=STRUCT_DTYPE)
+    for i, record in enumerate(records):
+        worker_id = record["workerId"].encode("utf-8")
+        if len(worker_id) > WORKER_ID_BYTES:
+            raise WireFormatError(f"workerId longer than {WORKER_ID_BYTES} bytes")
+        out[i]["workerId"] = worker_id
+        for name in NUMERIC_FIELDS:
+            value = record.get(name)
+            out[i][name] = np.nan if value is None else value
+        flags = 0
+        for bit, name in enumerate(FLAG_FIELDS):
+            if record.get(name):
+                flags |= 1 << bit
+        if record.get("isCompliant") is None:
+            flags |= FLAG_COMPLIANCE_UNKNOWN
+        out[i]["flags"] = flags
+    return HEADER.pack(MAGIC, len(records)) + out.tobytes()
+
+
+# --- 2. MessagePack Flat Arrays ---
+def decode_msgpack(body: bytes) -> CompactBatch:
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedWireFormat("msgpack is not installed on this engine")
+
+    try:
+        rows = msgpack.unpackb(body, use_list=True)
+    except Exception as e:
+        raise WireFormatError(f"invalid msgpack body: {e}")
+    if not isinstance(rows, list) or any(not isinstance(r, list) or len(r) != len(FLAT_FIELDS) + 1 for r in rows):
+        raise WireFormatError(f"expected an array of [workerId, {len(FLAT_FIELDS)} fields] arrays")
+
+    # Same as the JSON path: workerId must be a non-empty string, not nil/int/bytes
+    if any(not isinstance(r[0], str) or not r[0] for r in rows):
+        raise WireFormatError("every record needs a workerId string")
+    worker_ids = [r[0] for r in rows]
+    try:
+        matrix = np.array([[np.nan if v is None else float(v) for v in r[1:]] for r in rows],
+                          dtype=np.float64).reshape(len(rows), len(FLAT_FIELDS))
+    except (TypeError, ValueError) as e:
+        raise WireFormatError(f"non-numeric field value: {e}")
+
+    raw = {name: matrix[:, j] for j, (name, _, _) in enumerate(FLAT_FIELDS)}
+    return _finish(worker_ids, raw)
+
+
+def decode(body: bytes, content_type: str) -> CompactBatch:
+    if content_type == STRUCT_CONTENT_TYPE:
+        return decode_struct(body)
+    if content_type in MSGPACK_CONTENT_TYPES:
+        return decode_msgpack(body)
+    raise UnsupportedWireFormat(f"unsupported content type '{content_type}'")
+
+
+# --- 3. Content-Type Negotiation ---
+class CompactWireMiddleware:
+    """
+    ASGI middleware that hands POSTs to `paths` carrying a compact
+    Content-Type to `handler(request, content_type)` (which returns a
+    Response) before FastAPI's JSON body parsing runs. Everything else,
+    JSON included, goes through the normal routes untouched.
+    """
+
+    def __init__(self, app, handler, paths):
+        self.app = app
+        self.handler = handler
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths:
+            content_type = _content_type(scope)
+            if content_type in COMPACT_CONTENT_TYPES:
+                response = await self.handler(Request(scope, receive), content_type)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def _content_type(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            return value.decode("latin-1").split(";", 1)[0].strip().lower()
+    return ""
@@ -0,0 +1,287 @@
+#
+# File: batch_inference.py
+#
+# Shared, cross-camera YOLO inference. Bridges hand in frames from any
+# number of sources; one worker thread takes what is pending (the
+# newest frame per source, up to max_batch, waiting at most
+# max_wait_ms for stragglers), letterboxes it into one preallocated
+# batch tensor, runs a single forward pass and splits the detections
+# back out per source, mapped to original-frame pixels and stamped
+# with capture and inference times.
+#
+# The canvas defaults to 480x640 (h x w), the bridges' capture size,
+# so 4:3 cameras are batched without padding compute.
+#
+# Benchmark against the single-frame loop the bridges run today:
+#   python3 batch_inference.py --source cam1.mp4 --source cam2.mp4 --source cam3.mp4 --frames 100
+#
+
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import CancelledError, Future
+
+import cv2
+import numpy as np
+import torch
+
+from vision_pipeline import RateMeter, open_source
+
+PAD_VALUE = 114  # ultralytics' letterbox grey
+
+
+class Detections:
+    """One frame's detections as NumPy arrays, boxes in original-frame pixels."""
+
+    __slots__ = ("source", "frame_no", "captured_at", "inferred_at", "xyxy", "conf", "cls")
+
+    def __init__(self, source, frame_no, captured_at, inferred_at, xyxy, conf, cls):
+        self.source = source
+        self.frame_no = frame_no
+        self.captured_at = captured_at
+        self.inferred_at = inferred_at
+        self.xyxy = xyxy      # (n, 4) float32
+        self.conf = conf      # (n,) float32
+        self.cls = cls        # (n,) int
+
+    @classmethod
+    def from_results(cls, results, source=None, frame_no=0, captured_at=None) -> "Detections":
+        """From a single-frame ultralytics call (boxes already in frame pixels)."""
+        boxes = results[0].boxes
+        return cls(source, frame_no, captured_at, time.time(), boxes.xyxy.cpu().numpy(),
+                   boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int))
+
+    def __len__(self):
+        return len(self.conf)
+
+
+def letterbox_into(frame, slot, geometry=None):
+    """
+    Resizes frame (keeping its aspect ratio) into the centre of `slot`
+    (h x w x 3, uint8) and pads the rest. Returns (scale, pad_x, pad_y).
+    Padding is only repainted when the geometry differs from `geometry`,
+    the slot's previous one.
+    """
+    slot_h, slot_w = slot.shape[:2]
+    h, w = frame.shape[:2]
+    scale = min(slot_w / w, slot_h / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (slot_w - new_w) // 2, (slot_h - new_h) // 2
+
+    if geometry != (scale, pad_x, pad_y):
+        slot[:] = PAD_VALUE
+    if (new_w, new_h) == (w, h):
+        slot[pad_y:pad_y + h, pad_x:pad_x + w] = frame
+    else:
+        slot[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h),
+                                                                    interpolation=cv2.INTER_LINEAR)
+    return scale, pad_x, pad_y
+
+
+class BatchInferenceService:
+    """
+    One YOLO model shared by every source. submit() queues a frame and
+    returns a Future of its Detections; a newer frame from the same
+    source replaces (and cancels) one still waiting.
+    """
+
+    def __init__(self, model, imgsz=(480, 640), max_batch: int = 8, max_wait_ms: float = 5.0,
+                 conf: float = 0.55, iou: float = 0.5):
+        self.model = model
+        self.imgsz = tuple(imgsz)
+        if self.imgsz[0] % 32 or self.imgsz[1] % 32:
+            raise ValueError("imgsz must be a multiple of 32 (model stride)")
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.conf = conf
+        self.iou = iou
+
+        h, w = self.imgsz
+        self.canvas = np.full((self.max_batch, h, w, 3), PAD_VALUE, dtype=np.uint8)   # BGR, HWC
+        self.tensor = torch.empty((self.max_batch, 3, h, w), dtype=torch.float32)     # RGB, CHW, 0-1
+        self._geometry = [None] * self.max_batch
+
+        self._pending = {}   # source -> (frame, frame_no, captured_at, future), arrival order
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+        self.batch_meter = RateMeter()
+        self.frames = 0
+        self.superseded = 0
+
+    # --- 1. Client side ---
+    def submit(self, source, frame, frame_no: int = 0, captured_at: float = None) -> Future:
+        future = Future()
+        with self._cond:
+            old = self._pending.pop(source, None)
+            if old is not None:
+                old[3].cancel()
+                self.superseded += 1
+            self._pending[source] = (frame, frame_no, captured_at or time.time(), future)
+            self._cond.notify()
+        return future
+
+    def infer(self, source, frame, frame_no: int = 0, captured_at: float = None):
+        """Blocking submit(); None if a newer frame from the same source took its place."""
+        try:
+            return self.submit(source, frame, frame_no, captured_at).result()
+        except CancelledError:
+            return None
+
+    # --- 2. Worker ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _take(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                return None
+            # Give the other sources a moment to join this batch
+            self._cond.wait_for(lambda: len(self._pending) >= self.max_batch or self._closed, self.max_wait_s)
+            sources = list(self._pending)[:self.max_batch]
+            return [(source,) + self._pending.pop(source) for source in sources]
+
+    def _run(self):
+        while True:
+            items = self._take()
+            if items is None:
+                return
+            items = [item for item in items if item[4].set_running_or_notify_cancel()]
+            if not items:
+                continue
+            start = time.perf_counter()
+            try:
+                detections = self.run_batch([(source, frame, frame_no, captured_at)
+                                             for source, frame, frame_no, captured_at, _ in items])
+            except Exception as e:
+                for item in items:
+                    item[4].set_exception(e)
+                continue
+            self.batch_meter.tick(time.perf_counter() - start)
+            for item, result in zip(items, detections):
+                item[4].set_result(result)
+
+    def run_batch(self, items):
+        """[(source, frame, frame_no, captured_at)] -> [Detections], one forward pass."""
+        n = len(items)
+        geometries = []
+        for i, (_, frame, _, _) in enumerate(items):
+            self._geometry[i] = letterbox_into(frame, self.canvas[i], self._geometry[i])
+            geometries.append(self._geometry[i])
+
+        # BHWC BGR uint8 -> BCHW RGB float 0-1, into the preallocated tensor
+        batch = self.tensor[:n]
+        batch.copy_(torch.from_numpy(self.canvas[:n]).permute(0, 3, 1, 2).flip(1))
+        batch.div_(255.0)
+
+        results = self.model(batch, conf=self.conf, iou=self.iou, imgsz=self.imgsz, verbose=False)
+        inferred_at = time.time()
+        self.frames += n
+
+        detections = []
+        for (source, frame, frame_no, captured_at), (scale, pad_x, pad_y), result in zip(items, geometries, results):
+            boxes = result.boxes
+            xyxy = boxes.xyxy.cpu().numpy()
+            if len(xyxy):
+                # Letterboxed canvas -> original frame pixels
+                xyxy = (xyxy - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / scale
+                h, w = frame.shape[:2]
+                np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+                np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+            detections.append(Detections(source, frame_no, captured_at, inferred_at, xyxy,
+                                         boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)))
+        return detections
+
+    def stats(self) -> dict:
+        batches = self.batch_meter.count
+        return {
+            "frames": self.frames,
+            "batches": batches,
+            "mean_batch_size": round(self.frames / batches, 2) if batches else 0.0,
+            "batch_ms": round(self.batch_meter.mean_ms, 1),
+            "superseded": self.superseded,
+            "pending": len(self._pending),
+        }
+
+
+# --- 3. Benchmark ---
+def load_frames(source: str, n: int):
+    cap = open_source(source)
+    frames = []
+    while len(frames) < n:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def benchmark(model, sources, n_frames: int, max_batch: int, imgsz, conf: float, iou: float):
+    clips = [load_frames(source, n_frames) for source in sources]
+    n_frames = min(len(clip) for clip in clips)
+    total = n_frames * len(clips)
+    cores = torch.get_num_threads()
+    print(f"🎥 {len(clips)} sources x {n_frames} frames, {cores} torch thread(s)")
+
+    model(clips[0][0], conf=conf, iou=iou, verbose=False)   # warm-up
+
+    # 1. Today's loop: one model call per frame per camera
+    start = time.perf_counter()
+    for k in range(n_frames):
+        for clip in clips:
+            model(clip[k], conf=conf, iou=iou, verbose=False)
+    single_s = time.perf_counter() - start
+
+    # 2. Shared service: one thread per camera submitting every frame
+    service = BatchInferenceService(model, imgsz=imgsz, max_batch=max_batch, conf=conf, iou=iou).start()
+    service.run_batch([(i, clip[0], 0, None) for i, clip in enumerate(clips[:max_batch])])   # warm-up
+    service.frames = 0
+
+    def feed(i, clip):
+        for k, frame in enumerate(clip[:n_frames]):
+            service.infer(i, frame, k)
+
+    threads = [threading.Thread(target=feed, args=(i, clip)) for i, clip in enumerate(clips)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batched_s = time.perf_counter() - start
+    service.stop()
+
+    print("---")
+    for name, wall in (("single-frame", single_s), ("batched", batched_s)):
+        fps = total / wall
+        print(f"{name:<13} {fps:7.2f} fps  {fps / cores:7.2f} fps/core  ({wall:.1f}s)")
+    print(f"speed-up x{single_s / batched_s:.2f} | {service.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-camera batched YOLO inference benchmark")
+    parser.add_argument("--source", action="append", required=True,
+                        help="video file, image directory, RTSP URL or webcam index (repeat per camera)")
+    parser.add_argument("--model", default="bestn.pt")
+    parser.add_argument("--frames", type=int, default=100, help="frames per source")
+    parser.add_argument("--batch", type=int, default=0, help="max batch (default: one slot per source)")
+    parser.add_argument("--imgsz", type=int, nargs=2, default=[480, 640], metavar=("H", "W"))
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (default: all cores)")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    torch.set_num_threads(args.threads or os.cpu_count() or 1)
+    benchmark(YOLO(args.model), args.source, args.frames, args.batch or len(args.source),
+              args.imgsz, conf=0.55, iou=0.5)
@@ -1,13 +1,19 @@
 #
 # File: data_bridge_demo.py (v8.0 - FIXED 400 ERROR)
 #
+# Sources and headless mode work as in data_bridge_enhanced.py:
+#   python3 data_bridge_demo.py --headless --source rtsp://cam1/stream --source footage/
+#
 import cv2
 import numpy as np
 from ultralytics import YOLO
 import json
 import time
+import argparse
 import requests 
 
+from vision_pipeline import default_threads, limit_threads, open_source, run_per_source
+
 
 # --- 1. CONFIGURATION ---
 GURU_BACKEND_URL = "https://5aea8b61971b.ngrok-free.app" 
@@ -20,7 +26,13 @@ global_sos_active = False
 
 
 class SurakshaMeshBridge:
-    def __init__(self):
+    def __init__(self, source="0", headless=False, send=True, max_frames=0, backend_url=GURU_BACKEND_URL):
+        self.source = source
+        self.headless = headless
+        self.send = send
+        self.max_frames = max_frames
+        self.backend_url = backend_url
+
         # --- Model Setup ---
         try:
             self.model = YOLO("bestn.pt")
@@ -28,32 +40,49 @@ class SurakshaMeshBridge:
             print(f"Successfully loaded 'bestn.pt'. Model classes: {self.class_names}")
         except Exception as e:
             print(f"--- FATAL ERROR: 'bestn.pt' NOT FOUND --- {e}")
-            exit()
+            raise
             
         self.confidence_threshold = 0.4 
         self.required_ppe = ['hardhat', 'vest']
         self.all_ppe_classes = ['gloves', 'hardhat', 'safety glasses', 'vest']
 
-        # --- Webcam Setup ---
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            print("Error: Unable to access the webcam.")
-            exit()
+        # --- Video Source Setup (webcam index, RTSP/HTTP URL, video file, image directory) ---
+        try:
+            self.cap = open_source(source)
+        except IOError as e:
+            print(f"Error: {e}")
+            raise
 
-        cv2.namedWindow("SurakshaMesh X - LIVE DATA BRIDGE", cv2.WINDOW_NORMAL)
-        cv2.setWindowProperty("SurakshaMesh X - LIVE DATA BRIDGE", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        if not headless:
+            cv2.namedWindow("SurakshaMesh X - LIVE DATA BRIDGE", cv2.WINDOW_NORMAL)
+            cv2.setWindowProperty("SurakshaMesh X - LIVE DATA BRIDGE", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
         # --- Data Bridge Timer ---
         self.last_send_time = time.time()
         self.send_interval = 10
+        self.frames = 0
 
 
     def run(self):
+        started = time.time()
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            wall = time.time() - started
+            print(f"[{self.source}] {self.frames} frames in {wall:.1f}s ({self.frames / wall if wall else 0:.1f} fps)")
+            self.cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+
+    def _loop(self):
         global global_sos_active
-        
-        while True:
+
+        while not self.max_frames or self.frames < self.max_frames:
             ret, frame = self.cap.read()
             if not ret: break
+            self.frames += 1
 
             # --- 1. YOLOv8 Inference ---
             results = self.model(frame, conf=self.confidence_threshold, iou=0.3, verbose=False)
@@ -70,13 +99,16 @@ class SurakshaMeshBridge:
 
             # --- 5. Send Data to Backend (Every 2s) ---
             current_time = time.time()
-            if (current_time - self.last_send_time) > self.send_interval:
+            if self.send and (current_time - self.last_send_time) > self.send_interval:
                 self.send_data_to_backend(vision_telemetry, badge_telemetry)
                 self.last_send_time = current_time
                 if global_sos_active:
                     print(">>> SOS Signal Sent! Resetting flag. <<<")
                     global_sos_active = False
 
+            if self.headless:
+                continue
+
             # --- 6. Visualization ---
             annotated_frame = results[0].plot()
             annotated_frame = self.draw_hud(annotated_frame, vision_telemetry)
@@ -90,9 +122,6 @@ class SurakshaMeshBridge:
                 print("\n*** SOS KEY PRESSED! (SIMULATING LORA MESH) ***")
                 global_sos_active = True
 
-        self.cap.release()
-        cv2.destroyAllWindows()
-
 
     def get_vision_telemetry(self, results, worker_id="EMP-107"):
         """
@@ -169,7 +198,7 @@ class SurakshaMeshBridge:
         
         # Send Vision Data
         try:
-            vision_url = f"{GURU_BACKEND_URL}/telemetry/vision"
+            vision_url = f"{self.backend_url}/telemetry/vision"
             res_vision = requests.post(vision_url, json=vision_data, timeout=1.0)
             
             if res_vision.status_code in [200, 202]:
@@ -184,7 +213,7 @@ class SurakshaMeshBridge:
         
         # Send Badge Data
         try:
-            badge_url = f"{GURU_BACKEND_URL}/telemetry/badge"
+            badge_url = f"{self.backend_url}/telemetry/badge"
             res_badge = requests.post(badge_url, json=badge_data, timeout=1.0)
             
             if res_badge.status_code in [200, 202]:
@@ -220,6 +249,35 @@ class SurakshaMeshBridge:
         return frame
 
 
+def run_bridge(source, options):
+    """Entry point of one bridge (one per source when several are given)."""
+    if options.threads:
+        limit_threads(options.threads)
+    try:
+        app = SurakshaMeshBridge(source, headless=options.headless, send=not options.no_send,
+                                 max_frames=options.max_frames, backend_url=options.backend)
+    except Exception:
+        raise SystemExit(1)
+    app.run()
+
+
 if __name__ == '__main__':
-    app = SurakshaMeshBridge()
-    app.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SurakshaMesh live data bridge")
+    parser.add_argument("--source", action="append",
+                        help="webcam index, RTSP/HTTP URL, video file or image directory (repeat for more cameras)")
+    parser.add_argument("--headless", action="store_true", help="no window (required for several sources)")
+    parser.add_argument("--max-frames", type=int, default=0, help="stop each source after this many frames")
+    parser.add_argument("--no-send", action="store_true", help="don't post telemetry (offline benchmarks)")
+    parser.add_argument("--backend", default=GURU_BACKEND_URL)
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per process (default: cores / sources)")
+    options = parser.parse_args()
+    sources = options.source or ["0"]
+
+    if len(sources) == 1:
+        run_bridge(sources[0], options)
+    else:
+        options.headless = True
+        options.threads = options.threads or default_threads(len(sources))
+        print(f"{len(sources)} sources, one process each, {options.threads} thread(s) per process")
+        codes = run_per_source(run_bridge, sources, options)
+        raise SystemExit(max(code or 0 for code in codes))
\ No newline at end of file
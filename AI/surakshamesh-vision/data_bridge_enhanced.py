@@ -2,29 +2,61 @@
 # File: data_bridge_ultimate.py
 # ULTIMATE: Multi-person tracking, face memory, zero hair false positives
 #
+# Pipelined: a capture thread, an inference thread and a sender thread
+# joined by drop-oldest queues (vision_pipeline.py); the main thread
+# only draws. Detection FPS is bounded by the model, not by the
+# network or the display.
+#
+# Sources and headless mode:
+#   python3 data_bridge_enhanced.py                                  # webcam 0 + window
+#   python3 data_bridge_enhanced.py --headless --source rtsp://cam1/stream --source rtsp://cam2/stream
+#   python3 data_bridge_enhanced.py --headless --no-send --source shift1.mp4   # offline benchmark
+# Several sources run as one process each, or with --batched as threads
+# of one process sharing a single batched YOLO (batch_inference.py).
+#
 
 import cv2
 import numpy as np
 from ultralytics import YOLO
 import json
 import time
-import requests
 import random
+import argparse
+import threading
+import traceback
 from collections import defaultdict
 
+from vision_pipeline import (DropOldestQueue, FrameGrabber, RateMeter, TelemetrySender,
+                             default_threads, is_live, limit_threads, open_source, run_per_source)
+from batch_inference import BatchInferenceService, Detections
+from tracker import SortTracker, assign
+
 GURU_BACKEND_URL = "https://5309c211657a.ngrok-free.app"
 global_sos_active = False
 
+STATS_INTERVAL = 5  # seconds between pipeline stats lines
+PPE_MATCH_RANGE = 1000.0  # px; larger than any valid PPE-to-head distance
+
 class UltimateMultiPersonPPEDetector:
-    def __init__(self):
+    def __init__(self, source="0", headless=False, realtime=False, send=True, max_frames=0,
+                 backend_url=GURU_BACKEND_URL, service=None):
+        self.source = source
+        self.headless = headless
+        self.send = send
+        self.service = service  # shared BatchInferenceService, or None for a local model
+
         # Load YOLO model
-        try:
-            self.model = YOLO("bestn.pt")
+        if service is not None:
+            self.model = service.model
             self.class_names = self.model.names
-            print(f"✅ YOLO model loaded")
-        except Exception as e:
-            print(f"❌ FATAL: {e}")
-            exit()
+        else:
+            try:
+                self.model = YOLO("bestn.pt")
+                self.class_names = self.model.names
+                print(f"✅ YOLO model loaded")
+            except Exception as e:
+                print(f"❌ FATAL: {e}")
+                raise
         
         # === ULTRA-STRICT HARDHAT DETECTION (NO HAIR!) ===
         self.confidence_thresholds = {
@@ -38,9 +70,16 @@ class UltimateMultiPersonPPEDetector:
         self.min_hardhat_area = 1500  # Large minimum for hardhat
         self.min_vest_area = 2000     # Even larger for vest
         
+        # Per-class-id lookups, so a frame's detections are filtered as arrays
+        self.min_conf_by_class = np.full(max(self.class_names) + 1, 0.55, dtype=np.float32)
+        for i, name in self.class_names.items():
+            self.min_conf_by_class[i] = self.confidence_thresholds.get(name, 0.55)
+        self.hardhat_class_ids = [i for i, name in self.class_names.items() if name == 'hardhat']
+        self.vest_class_ids = [i for i, name in self.class_names.items() if name == 'vest']
+        
         # === MULTI-PERSON TRACKING ===
         self.active_workers = {}  # {person_location: worker_info}
-        self.worker_assignments = {}  # {face_hash: worker_id} - remembers people
+        self.worker_assignments = {}  # {track_id: worker_id} - released when the track expires
         
         # Worker pools
         self.worker_pool_male = [
@@ -61,59 +100,105 @@ class UltimateMultiPersonPPEDetector:
         self.used_workers = set()
         self.person_boxes = []  # Track detected persons by bounding box
         
-        # Face detection for person tracking
+        # Person tracking: boxes from the PPE model's person class if it has
+        # one, else Haar faces every `detect_every` frames; the tracker
+        # predicts in between and keeps IDs stable as people move
+        self.person_class_ids = [i for i, name in self.class_names.items() if name.lower() == 'person']
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.detect_every = 3
+        self.tracker = SortTracker(max_age=5 * self.detect_every, min_hits=2, max_coast=2 * self.detect_every)
         
         # Performance optimization
         self.frame_skip = 2
         self.frame_count = 0
         self.last_results = None
         
-        # Webcam
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        if not self.cap.isOpened():
-            print("❌ Webcam error")
-            exit()
+        # Video source (webcam index, RTSP/HTTP URL, video file, image directory)
+        try:
+            self.cap = open_source(source)
+        except IOError as e:
+            print(f"❌ Source error: {e}")
+            raise
         
-        cv2.namedWindow("SurakshaMesh X - Multi-Person Tracking", cv2.WINDOW_NORMAL)
+        if not headless:
+            cv2.namedWindow("SurakshaMesh X - Multi-Person Tracking", cv2.WINDOW_NORMAL)
         
         self.last_send_time = time.time()
         self.send_interval = 2
-        
-        print(f"\n🚀 MULTI-PERSON TRACKING ACTIVE")
+
+        # === PIPELINE: capture -> inference -> display / sender ===
+        # Live feeds: the model always gets the newest frame. Recordings:
+        # every frame, as fast as the model goes (or at native FPS with realtime)
+        live = is_live(source)
+        lossless = not live and not realtime
+        pace_fps = (self.cap.get(cv2.CAP_PROP_FPS) or 30) if realtime and not live else None
+        self.grabber = FrameGrabber(self.cap, maxsize=2 if lossless else 1, lossless=lossless,
+                                    pace_fps=pace_fps, max_frames=max_frames)
+        self.display_queue = DropOldestQueue(2)
+        self.sender = TelemetrySender(backend_url, maxsize=64, timeout=1.0)
+        self.inference_meter = RateMeter()
+        self.display_meter = RateMeter()
+        self.stop_event = threading.Event()
+        self.reset_requested = threading.Event()
+        self.inference_error = None  # what stopped inference_loop, if it failed
+        
+        print(f"\n🚀 MULTI-PERSON TRACKING ACTIVE [{source}]")
         print(f"👥 Can track multiple workers simultaneously")
         print(f"🎯 Ultra-strict hardhat detection (no hair!)")
-        print(f"🔄 Press 'R'=Reset All | 'S'=SOS | 'Q'=Quit\n")
+        if headless:
+            print(f"🖥️  Headless - Ctrl+C to stop\n")
+        else:
+            print(f"🔄 Press 'R'=Reset All | 'S'=SOS | 'Q'=Quit\n")
 
-    def detect_persons(self, frame):
+    def detect_persons(self, frame, detections=None):
         """
-        Detect individual persons in frame using face detection
-        Returns list of person locations (x, y, w, h)
+        Tracked persons in frame. Detection runs only on some frames (the
+        PPE model's person boxes when `detections` is given, else Haar
+        faces every `detect_every` frames); other frames just advance
+        the tracker.
+        Returns list of persons with a stable track_id, bbox (x, y, w, h)
+        and head center
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(50, 50))
-        
+        boxes = None
+        if self.person_class_ids:
+            if detections is not None:
+                boxes = detections.xyxy[np.isin(detections.cls, self.person_class_ids)]
+        elif (self.frame_count - 1) % self.detect_every == 0:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(50, 50))
+            boxes = np.array([(x, y, x + w, y + h) for (x, y, w, h) in faces]).reshape(-1, 4)
+
+        tracks, expired = self.tracker.step(boxes)
+        for track_id in expired:
+            self.release_track(track_id)
+
         persons = []
-        for (x, y, w, h) in faces:
-            # Create person identifier based on position
-            person_location = f"{x//50}_{y//50}"  # Grid-based location
+        for track in tracks:
+            x1, y1, x2, y2 = track.bbox.astype(int)
+            w, h = x2 - x1, y2 - y1
+            # PPE checks are relative to the head: a face box's centre, or near the top of a body box
+            head_y = y1 + h // 8 if self.person_class_ids else y1 + h // 2
             persons.append({
-                'location': person_location,
-                'bbox': (x, y, w, h),
-                'center': (x + w//2, y + h//2)
+                'track_id': track.id,
+                'bbox': (x1, y1, w, h),
+                'center': (x1 + w // 2, head_y)
             })
         
         return persons
 
-    def assign_worker_to_person(self, person_location):
+    def release_track(self, track_id):
+        """Forget an expired track's worker so the pool and assignments don't grow"""
+        worker_id = self.worker_assignments.pop(track_id, None)
+        if worker_id is not None and worker_id not in self.worker_assignments.values():
+            self.used_workers.discard(worker_id)
+            print(f"\n👋 Track {track_id} left ({worker_id} released)")
+
+    def assign_worker_to_person(self, track_id):
         """Assign or retrieve worker for a specific person"""
         
         # Check if this person already has a worker assigned
-        if person_location in self.worker_assignments:
-            worker_id = self.worker_assignments[person_location]
+        if track_id in self.worker_assignments:
+            worker_id = self.worker_assignments[track_id]
             # Find worker info
             for pool in [self.worker_pool_male, self.worker_pool_female]:
                 for worker in pool:
@@ -133,146 +218,113 @@ class UltimateMultiPersonPPEDetector:
         
         worker = random.choice(available)
         self.used_workers.add(worker["id"])
-        self.worker_assignments[person_location] = worker["id"]
+        self.worker_assignments[track_id] = worker["id"]
         
-        print(f"\n👤 NEW WORKER: {worker['name']} ({worker['id']}) at position {person_location}")
+        print(f"\n👤 NEW WORKER: {worker['name']} ({worker['id']}) on track {track_id}")
         
         return worker
 
-    def validate_hardhat_detection(self, box, frame_shape, person_centers):
+    def hardhat_geometry_mask(self, xyxy, frame_shape):
         """
-        ULTRA-STRICT hardhat validation
-        - Must be near a detected person's head
+        ULTRA-STRICT hardhat shape checks, for all boxes at once
         - Must have correct size, aspect ratio, position
         - Rejects hair, phones, random objects
+        Returns a boolean mask over the (n, 4) boxes
         """
-        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-        width = x2 - x1
-        height = y2 - y1
-        area = width * height
+        width = xyxy[:, 2] - xyxy[:, 0]
+        height = xyxy[:, 3] - xyxy[:, 1]
         frame_height, frame_width = frame_shape[:2]
         
         # Check 1: Minimum area (must be substantial)
-        if area < self.min_hardhat_area:
-            return False, None
+        ok = width * height >= self.min_hardhat_area
         
         # Check 2: Aspect ratio (hardhats are WIDER than tall)
-        aspect_ratio = width / height if height > 0 else 0
-        
         # Hardhats: 1.1 - 2.5 (wider)
         # Hair: < 1.0 (taller) ← REJECT
-        if aspect_ratio < 1.05 or aspect_ratio > 2.8:
-            return False, None
+        aspect_ratio = np.divide(width, height, out=np.zeros_like(width), where=height > 0)
+        ok &= (aspect_ratio >= 1.05) & (aspect_ratio <= 2.8)
         
         # Check 3: Position (must be in upper 50% of frame)
-        center_y = (y1 + y2) / 2
-        relative_y = center_y / frame_height
-        if relative_y > 0.50:
-            return False, None
+        center_y = (xyxy[:, 1] + xyxy[:, 3]) / 2
+        ok &= center_y / frame_height <= 0.50
         
         # Check 4: Not too wide/tall (reject body detections)
-        if width / frame_width > 0.45 or height / frame_height > 0.30:
-            return False, None
-        
-        # Check 5: Must be near a detected person's face
-        hardhat_center = ((x1 + x2) / 2, (y1 + y2) / 2)
-        
-        nearest_person = None
-        min_distance = float('inf')
-        
-        for person in person_centers:
-            face_center = person['center']
-            distance = np.sqrt((hardhat_center[0] - face_center[0])**2 + 
-                             (hardhat_center[1] - face_center[1])**2)
-            
-            # Hardhat should be within 100 pixels of face center (head area)
-            if distance < min_distance and distance < 150:
-                min_distance = distance
-                nearest_person = person
-        
-        if nearest_person is None:
-            # No person nearby = false positive (hair, wall, etc.)
-            return False, None
-        
-        # Check 6: Hardhat must be ABOVE the face (not below)
-        if hardhat_center[1] > nearest_person['center'][1]:
-            return False, None
-        
-        return True, nearest_person
-
-    def validate_vest_detection(self, box, frame_shape, person_centers):
-        """Validate vest - must be near a person's body"""
-        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-        width = x2 - x1
-        height = y2 - y1
-        area = width * height
-        
-        if area < self.min_vest_area:
-            return False, None
-        
-        aspect_ratio = width / height if height > 0 else 0
-        if aspect_ratio > 2.5 or aspect_ratio < 0.3:
-            return False, None
-        
-        # Vest should be near a person
-        vest_center = ((x1 + x2) / 2, (y1 + y2) / 2)
-        
-        for person in person_centers:
-            face_center = person['center']
-            distance = np.sqrt((vest_center[0] - face_center[0])**2 + 
-                             (vest_center[1] - face_center[1])**2)
-            
-            # Vest should be 50-250 pixels below face
-            if 50 < distance < 300:
-                # Check if vest is below face (not above)
-                if vest_center[1] > face_center[1]:
-                    return True, person
-        
-        return False, None
-
-    def get_ppe_per_person(self, results, frame_shape, persons):
+        ok &= (width / frame_width <= 0.45) & (height / frame_height <= 0.30)
+        return ok
+
+    def vest_geometry_mask(self, xyxy):
+        """Vest shape checks (area, aspect ratio), for all boxes at once"""
+        width = xyxy[:, 2] - xyxy[:, 0]
+        height = xyxy[:, 3] - xyxy[:, 1]
+        aspect_ratio = np.divide(width, height, out=np.zeros_like(width), where=height > 0)
+        return (width * height >= self.min_vest_area) & (aspect_ratio >= 0.3) & (aspect_ratio <= 2.5)
+
+    def get_ppe_per_person(self, detections, frame_shape, persons):
         """
         Get PPE status for EACH detected person
-        Returns: {person_location: {"hardhat": bool, "vest": bool, ...}}
+        Returns: {track_id: {"hardhat": bool, "vest": bool, ...}}
+
+        Every check runs on whole arrays: shape masks per box, then a
+        (boxes x persons) matrix of box-centre offsets from each head.
+        Items are matched to people one-to-one, nearest first, so in a
+        crowd two hardhats next to one head can't leave the neighbour
+        without one.
         """
         person_ppe = defaultdict(lambda: {"hardhat": False, "vest": False, "items": []})
         
-        if len(persons) == 0:
+        if len(persons) == 0 or len(detections) == 0:
             return person_ppe
         
-        # Analyze each PPE detection
-        for box in results[0].boxes:
-            cls_id = int(box.cls[0])
-            label = self.class_names[cls_id]
-            confidence = float(box.conf[0])
-            
-            required_conf = self.confidence_thresholds.get(label, 0.55)
-            
-            if confidence < required_conf:
-                continue
-            
-            # Validate and assign to person
-            if label == "hardhat":
-                is_valid, assigned_person = self.validate_hardhat_detection(box, frame_shape, persons)
-                if is_valid and assigned_person:
-                    location = assigned_person['location']
-                    person_ppe[location]["hardhat"] = True
-                    person_ppe[location]["items"].append("hardhat")
-                    print(f"  ✅ Hardhat for {location} (conf: {confidence:.2f})")
-                else:
-                    print(f"  ❌ Hardhat rejected (likely hair/phone, conf: {confidence:.2f})")
-            
-            elif label == "vest":
-                is_valid, assigned_person = self.validate_vest_detection(box, frame_shape, persons)
-                if is_valid and assigned_person:
-                    location = assigned_person['location']
-                    person_ppe[location]["vest"] = True
-                    person_ppe[location]["items"].append("vest")
+        xyxy = detections.xyxy.astype(np.float32, copy=False)
+        confident = detections.conf >= self.min_conf_by_class[detections.cls]
+        
+        # Offsets of every box centre from every person's head
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        heads = np.array([person['center'] for person in persons], dtype=np.float32)
+        dx = centers[:, None, 0] - heads[None, :, 0]
+        dy = centers[:, None, 1] - heads[None, :, 1]
+        distance = np.hypot(dx, dy)
+        
+        # Hardhat: near the head (within 150 px) and ABOVE the face, not below
+        hardhats = np.flatnonzero(confident & np.isin(detections.cls, self.hardhat_class_ids))
+        valid = self.hardhat_geometry_mask(xyxy[hardhats], frame_shape)[:, None] \
+            & (distance[hardhats] < 150) & (dy[hardhats] <= 0)
+        matched = self.assign_ppe(persons, person_ppe, "hardhat", hardhats, valid, distance[hardhats])
+        for i in hardhats.tolist():
+            confidence = float(detections.conf[i])
+            if i in matched:
+                print(f"  ✅ Hardhat for track {matched[i]} (conf: {confidence:.2f})")
+            else:
+                print(f"  ❌ Hardhat rejected (likely hair/phone, conf: {confidence:.2f})")
+        
+        # Vest: on the body, 50-300 px from the face and below it
+        vests = np.flatnonzero(confident & np.isin(detections.cls, self.vest_class_ids))
+        valid = self.vest_geometry_mask(xyxy[vests])[:, None] \
+            & (distance[vests] > 50) & (distance[vests] < 300) & (dy[vests] > 0)
+        self.assign_ppe(persons, person_ppe, "vest", vests, valid, distance[vests])
         
         return person_ppe
 
+    def assign_ppe(self, persons, person_ppe, item, box_ids, valid, distance):
+        """
+        Matches boxes to persons (rows/cols of `valid`) one-to-one,
+        maximising the number of valid pairs, then their closeness.
+        Marks `item` on each matched person; returns {box_id: track_id}.
+        """
+        if not valid.any():
+            return {}
+        # Any valid pair outscores every invalid one; among valid, nearer wins
+        score = np.where(valid, PPE_MATCH_RANGE - distance, 0.0)
+        matched = {}
+        for r, c in zip(*assign(score, 1.0)):
+            track_id = persons[c]['track_id']
+            person_ppe[track_id][item] = True
+            person_ppe[track_id]["items"].append(item)
+            matched[int(box_ids[r])] = track_id
+        return matched
+
     def send_data_for_person(self, worker, ppe_status):
-        """Send vision + badge data for ONE person"""
+        """Queue vision + badge data for ONE person (posted by the sender thread)"""
         
         # Build vision telemetry
         is_compliant = ppe_status["hardhat"] and ppe_status["vest"]
@@ -312,12 +364,24 @@ class UltimateMultiPersonPPEDetector:
             }
         
         # Send to Guru
-        try:
-            res1 = requests.post(f"{GURU_BACKEND_URL}/telemetry/vision", json=vision_data, timeout=1.0)
-            res2 = requests.post(f"{GURU_BACKEND_URL}/telemetry/badge", json=badge_data, timeout=1.0)
-            print(f"  📤 {worker['id']}: Vision={res1.status_code}, Badge={res2.status_code}")
-        except Exception as e:
-            print(f"  ⚠️  Send error for {worker['id']}: {e}")
+        self.sender.submit("/telemetry/vision", vision_data)
+        self.sender.submit("/telemetry/badge", badge_data)
+        print(f"  📤 {worker['id']}: queued")
+
+    def detect(self, frame, frame_no=0, captured_at=None):
+        """PPE detections for one frame, through the shared batch service if there is one"""
+        if self.service is not None:
+            return self.service.infer(self.source, frame, frame_no, captured_at)
+        results = self.model(frame, conf=0.55, iou=0.5, verbose=False)
+        return Detections.from_results(results, self.source, frame_no, captured_at)
+
+    def draw_detections(self, frame, detections):
+        """Raw PPE boxes with label and confidence"""
+        for (x1, y1, x2, y2), cls_id, confidence in zip(detections.xyxy.astype(int), detections.cls, detections.conf):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 128, 0), 2)
+            cv2.putText(frame, f"{self.class_names[int(cls_id)]} {confidence:.2f}", (x1, max(12, y1 - 5)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 128, 0), 1)
+        return frame
 
     def draw_hud(self, frame, persons, person_ppe):
         """Draw HUD showing all tracked workers"""
@@ -331,9 +395,8 @@ class UltimateMultiPersonPPEDetector:
                         cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
         else:
             for person in persons:
-                location = person['location']
-                worker = self.assign_worker_to_person(location)
-                ppe = person_ppe.get(location, {"hardhat": False, "vest": False, "items": []})
+                worker = person['worker']
+                ppe = person_ppe.get(person['track_id'], {"hardhat": False, "vest": False, "items": []})
                 
                 is_compliant = ppe["hardhat"] and ppe["vest"]
                 
@@ -365,6 +428,12 @@ class UltimateMultiPersonPPEDetector:
                 
                 y_offset += box_height + 5
         
+        # Pipeline rates
+        cv2.putText(frame, f"cam {self.grabber.meter.fps:.0f} fps | det {self.inference_meter.fps:.1f} fps "
+                           f"{self.inference_meter.mean_ms:.0f} ms",
+                    (10, frame.shape[0] - 28),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
+
         # Instructions
         cv2.putText(frame, "R=Reset | S=SOS | Q=Quit", 
                     (10, frame.shape[0] - 10),
@@ -372,65 +441,221 @@ class UltimateMultiPersonPPEDetector:
         
         return frame
 
-    def run(self):
-        """ULTIMATE MAIN LOOP"""
-        global global_sos_active
-        
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            
+    def inference_loop(self):
+        """Stage 2: persons + PPE on the newest captured frame; queues sends and display."""
+        try:
+            self._inference_loop()
+        except Exception as e:
+            self.inference_error = e
+            print(f"❌ [{self.source}] Inference stopped: {e}")
+            traceback.print_exc()
+        finally:
+            # Always, so the display loop ends instead of waiting forever
+            self.display_queue.close()
+
+    def _inference_loop(self):
+        while not self.stop_event.is_set():
+            item = self.grabber.queue.get(timeout=0.5)
+            if item is None:
+                if self.grabber.queue.closed:
+                    break
+                continue
+            frame_no, captured_at, frame = item
+
+            if self.reset_requested.is_set():
+                print(f"\n🔄 RESET - Clearing all worker assignments\n")
+                self.worker_assignments.clear()
+                self.used_workers.clear()
+                self.tracker.reset()
+                self.reset_requested.clear()
+
+            start = time.perf_counter()
             self.frame_count += 1
-            
-            # Detect persons in frame
-            persons = self.detect_persons(frame)
-            
+
             # Process PPE detection every 2nd frame
-            if self.frame_count % self.frame_skip == 0:
-                results = self.model(frame, conf=0.55, iou=0.5, verbose=False)
-                self.last_results = results
-            else:
-                results = self.last_results or self.model(frame, conf=0.55, iou=0.5, verbose=False)
-            
+            fresh = self.frame_count % self.frame_skip == 0 or self.last_results is None
+            if fresh:
+                detections = self.detect(frame, frame_no, captured_at)
+                if detections is not None:
+                    self.last_results = detections
+                else:
+                    fresh = False   # superseded in the batch queue; reuse the last detections
+            results = self.last_results
+            if results is None:
+                continue
+
+            # Tracked persons (detected on some frames, predicted on the rest)
+            persons = self.detect_persons(frame, results if fresh else None)
+
             # Get PPE status for each person
             person_ppe = self.get_ppe_per_person(results, frame.shape, persons)
-            
+            for person in persons:
+                person['worker'] = self.assign_worker_to_person(person['track_id'])
+            self.inference_meter.tick(time.perf_counter() - start)
+
             # Send data every 2 seconds
             current_time = time.time()
-            if (current_time - self.last_send_time) >= self.send_interval:
+            if self.send and (current_time - self.last_send_time) >= self.send_interval:
                 print(f"\n--- Sending Data for {len(persons)} worker(s) ---")
-                
+
                 for person in persons:
-                    location = person['location']
-                    worker = self.assign_worker_to_person(location)
-                    ppe = person_ppe.get(location, {"hardhat": False, "vest": False, "items": []})
-                    self.send_data_for_person(worker, ppe)
-                
+                    ppe = person_ppe.get(person['track_id'], {"hardhat": False, "vest": False, "items": []})
+                    self.send_data_for_person(person['worker'], ppe)
+
                 print("-" * 50)
                 self.last_send_time = current_time
-            
-            # Visualization
-            display_frame = frame.copy()
-            if self.frame_count % self.frame_skip == 0:
-                display_frame = results[0].plot()
-            
-            display_frame = self.draw_hud(display_frame, persons, person_ppe)
-            cv2.imshow("SurakshaMesh X - Multi-Person Tracking", display_frame)
-            
-            # Key controls
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('r'):
-                print(f"\n🔄 RESET - Clearing all worker assignments\n")
-                self.worker_assignments.clear()
-                self.used_workers.clear()
-        
-        self.cap.release()
-        cv2.destroyAllWindows()
+
+            if not self.headless:
+                self.display_queue.put((frame, results if fresh else None, persons, person_ppe, captured_at))
+
+    def stats(self):
+        """Frame rates, inference latency and queue depths of every stage."""
+        return {
+            "capture": {**self.grabber.meter.stats(), "queue": self.grabber.queue.stats()},
+            "inference": {**self.inference_meter.stats(), "queue": self.display_queue.stats()},
+            "display": self.display_meter.stats(),
+            "sender": self.sender.stats(),
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        display = "" if self.headless else \
+            f"display {s['display']['fps']} fps (dropped {s['inference']['queue']['dropped']}) | "
+        print(f"📊 [{self.source}] cam {s['capture']['fps']} fps (dropped {s['capture']['queue']['dropped']}) | "
+              f"det {s['inference']['fps']} fps, {s['inference']['mean_ms']} ms | " + display +
+              f"sent {s['sender']['sent']}, failed {s['sender']['failed']}, "
+              f"queued {s['sender']['queue']['depth']}")
+
+    def run(self):
+        """ULTIMATE MAIN LOOP: starts the stages, then draws whatever inference produces"""
+        global global_sos_active
+
+        inference = threading.Thread(target=self.inference_loop, name="ppe-inference", daemon=True)
+        self.grabber.start()
+        self.sender.start()
+        inference.start()
+        started = last_stats = time.time()
+
+        try:
+            while self.headless:
+                inference.join(timeout=STATS_INTERVAL)
+                if not inference.is_alive():
+                    break
+                self.print_stats()
+
+            while not self.headless:
+                item = self.display_queue.get(timeout=0.1)
+                if item is None:
+                    if self.display_queue.closed:
+                        break
+                else:
+                    frame, results, persons, person_ppe, _ = item
+
+                    # Visualization
+                    display_frame = frame.copy()
+                    if results is not None:
+                        display_frame = self.draw_detections(display_frame, results)
+                    display_frame = self.draw_hud(display_frame, persons, person_ppe)
+                    cv2.imshow("SurakshaMesh X - Multi-Person Tracking", display_frame)
+                    self.display_meter.tick()
+
+                if time.time() - last_stats >= STATS_INTERVAL:
+                    self.print_stats()
+                    last_stats = time.time()
+
+                # Key controls (also on empty polls, so the window keeps responding)
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+                elif key == ord('r'):
+                    self.reset_requested.set()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            self.grabber.stop()
+            inference.join(timeout=5)
+            self.grabber.join(timeout=5)
+            self.sender.stop()
+            self.sender.join(timeout=5)
+            self.print_stats()
+            wall = time.time() - started
+            print(f"🏁 [{self.source}] {self.inference_meter.count} frames analysed in {wall:.1f}s "
+                  f"({self.inference_meter.count / wall if wall else 0:.1f} fps)")
+            self.cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+
+
+def run_bridge(source, options):
+    """Entry point of one bridge (one per source when several are given)."""
+    if options.threads:
+        limit_threads(options.threads)
+    try:
+        detector = UltimateMultiPersonPPEDetector(source, headless=options.headless, realtime=options.realtime,
+                                                  send=not options.no_send, max_frames=options.max_frames,
+                                                  backend_url=options.backend)
+    except Exception:
+        raise SystemExit(1)
+    detector.run()
+    if detector.inference_error is not None:
+        raise SystemExit(1)
+
+
+def run_batched(sources, options):
+    """All sources as threads of this process, sharing one batched YOLO (one forward pass per batch)."""
+    limit_threads(options.threads or default_threads(1))
+    service = BatchInferenceService(YOLO("bestn.pt"), max_batch=len(sources), conf=0.55, iou=0.5).start()
+    detectors = []
+    for source in sources:
+        try:
+            detectors.append(UltimateMultiPersonPPEDetector(source, headless=True, realtime=options.realtime,
+                                                            send=not options.no_send, max_frames=options.max_frames,
+                                                            backend_url=options.backend, service=service))
+        except Exception:
+            pass   # already reported; the other cameras keep running
+    threads = [threading.Thread(target=detector.run, name=f"bridge-{i}") for i, detector in enumerate(detectors)]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            next(thread for thread in threads if thread.is_alive()).join(timeout=STATS_INTERVAL)
+            if any(thread.is_alive() for thread in threads):
+                print(f"🧠 shared inference: {service.stats()}")
+    except KeyboardInterrupt:
+        for detector in detectors:
+            detector.stop_event.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        service.stop()
+        print(f"🧠 shared inference: {service.stats()}")
+    return len(detectors) == len(sources)
 
 
 if __name__ == "__main__":
-    detector = UltimateMultiPersonPPEDetector()
-    detector.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SurakshaMesh multi-person PPE data bridge")
+    parser.add_argument("--source", action="append",
+                        help="webcam index, RTSP/HTTP URL, video file or image directory (repeat for more cameras)")
+    parser.add_argument("--headless", action="store_true", help="no window (required for several sources)")
+    parser.add_argument("--realtime", action="store_true", help="play recordings at native FPS instead of every frame")
+    parser.add_argument("--max-frames", type=int, default=0, help="stop each source after this many frames")
+    parser.add_argument("--no-send", action="store_true", help="don't post telemetry (offline benchmarks)")
+    parser.add_argument("--backend", default=GURU_BACKEND_URL)
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per process (default: cores / sources)")
+    parser.add_argument("--batched", action="store_true",
+                        help="several sources: one process, frames batched through one YOLO call")
+    options = parser.parse_args()
+    sources = options.source or ["0"]
+
+    if len(sources) == 1:
+        run_bridge(sources[0], options)
+    elif options.batched:
+        print(f"🎥 {len(sources)} sources, one process, batched inference")
+        raise SystemExit(0 if run_batched(sources, options) else 1)
+    else:
+        options.headless = True
+        options.threads = options.threads or default_threads(len(sources))
+        print(f"🎥 {len(sources)} sources, one process each, {options.threads} thread(s) per process")
+        codes = run_per_source(run_bridge, sources, options)
+        raise SystemExit(max(code or 0 for code in codes))
\ No newline at end of file
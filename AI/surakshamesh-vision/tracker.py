@@ -0,0 +1,221 @@
+#
+# File: tracker.py
+#
+# SORT-style multi-object tracker for the vision bridges. Each person
+# is a track with a constant-velocity Kalman filter over its box
+# (centre, area, aspect ratio). On frames with detections, tracks are
+# matched to boxes by IoU (Hungarian via scipy when available, greedy
+# otherwise); on the frames in between the filter just predicts, which
+# costs a few small matrix products per track. Tracks that go
+# unmatched for max_age steps expire, and their IDs are reported so
+# callers can drop whatever they keyed on them.
+#
+# Self-check (matching with and without scipy, crossing people, expiry):
+#   python3 tracker.py
+#
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # greedy matching is close enough for a handful of people
+    linear_sum_assignment = None
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (n, 4) and (m, 4) xyxy boxes -> (n, m)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def assign(score, min_score):
+    """
+    Maximum-score one-to-one matching of rows to columns of `score`,
+    keeping only pairs scoring at least min_score. Returns (rows, cols)
+    index arrays.
+    """
+    score = np.asarray(score, dtype=np.float64)
+    if score.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-score)
+    else:
+        # Greedy: best remaining pair first
+        order = np.argsort(-score, axis=None)
+        rows, cols = np.unravel_index(order, score.shape)
+        used_r, used_c, keep = set(), set(), []
+        for k, (r, c) in enumerate(zip(rows, cols)):
+            if score[r, c] < min_score:
+                break
+            if r not in used_r and c not in used_c:
+                used_r.add(r)
+                used_c.add(c)
+                keep.append(k)
+        rows, cols = rows[keep], cols[keep]
+    ok = score[rows, cols] >= min_score
+    return rows[ok], cols[ok]
+
+
+def _to_z(box):
+    x1, y1, x2, y2 = box
+    w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+    return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h])
+
+
+def _to_box(x):
+    area, ratio = max(x[2], 1e-3), max(x[3], 1e-3)
+    w = np.sqrt(area * ratio)
+    h = area / w
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2])
+
+
+class Track:
+    """One person: Kalman state [cx, cy, area, ratio, vcx, vcy, varea]."""
+
+    # Constant velocity; the aspect ratio is assumed constant
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+    H = np.eye(4, 7)
+    Q = np.diag([1.0, 1.0, 1.0, 1e-4, 1e-2, 1e-2, 1e-4])
+    R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+    def __init__(self, track_id: int, box):
+        self.id = track_id
+        self.x = np.zeros(7)
+        self.x[:4] = _to_z(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.hits = 1
+        self.age = 0
+        self.time_since_update = 0
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.age += 1
+        self.time_since_update += 1
+
+    def update(self, box):
+        y = _to_z(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.hits += 1
+        self.time_since_update = 0
+
+    @property
+    def bbox(self):
+        return _to_box(self.x)
+
+
+class SortTracker:
+    """
+    step(boxes) with this frame's (n, 4) detections, or step() on
+    frames where detection was skipped. Returns (visible tracks, IDs of
+    tracks that just expired).
+    """
+
+    def __init__(self, max_age: int = 15, min_hits: int = 2, iou_threshold: float = 0.2, max_coast: int = 5):
+        self.max_age = max_age              # steps without a match before a track is dropped
+        self.min_hits = min_hits            # matches before a track is reported
+        self.iou_threshold = iou_threshold
+        self.max_coast = max_coast          # steps a reported track may go unmatched and stay visible
+        self.tracks = []
+        self._next_id = 1
+
+    def step(self, boxes=None):
+        for track in self.tracks:
+            track.predict()
+
+        if boxes is not None:
+            boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+            predicted = np.array([track.bbox for track in self.tracks]).reshape(-1, 4)
+            rows, cols = assign(iou_matrix(predicted, boxes), self.iou_threshold)
+            for r, c in zip(rows, cols):
+                self.tracks[r].update(boxes[c])
+            for c in np.setdiff1d(np.arange(len(boxes)), cols):
+                self.tracks.append(Track(self._next_id, boxes[c]))
+                self._next_id += 1
+
+        expired = [track.id for track in self.tracks if track.time_since_update > self.max_age]
+        if expired:
+            self.tracks = [track for track in self.tracks if track.time_since_update <= self.max_age]
+        visible = [track for track in self.tracks
+                   if track.hits >= self.min_hits and track.time_since_update <= self.max_coast]
+        return visible, expired
+
+    def reset(self):
+        self.tracks = []
+
+
+# --- Self-check: python3 tracker.py ---
+def _crossing(tracker, frames: int = 40, detect_every: int = 1):
+    """Two people walking past each other; returns {person: set of track IDs seen}."""
+    seen = {0: set(), 1: set()}
+    for t in range(frames):
+        truth = np.array([[20 + 12 * t, 100, 80 + 12 * t, 220],      # left to right
+                          [520 - 12 * t, 130, 580 - 12 * t, 250]],   # right to left, a little lower
+                         dtype=np.float32)
+        visible, _ = tracker.step(truth if t % detect_every == 0 else None)
+        if not visible:
+            continue
+        iou = iou_matrix(truth, np.array([track.bbox for track in visible]))
+        for person, k in enumerate(iou.argmax(axis=1)):
+            if iou[person, k] > 0.3:
+                seen[person].add(visible[k].id)
+    return seen
+
+
+def _self_check():
+    global linear_sum_assignment
+    hungarian = linear_sum_assignment
+
+    # assign(): the one-to-one optimum, and pairs under min_score dropped
+    score = np.array([[0.9, 0.8, 0.0],
+                      [0.8, 0.1, 0.0],
+                      [0.0, 0.0, 0.05]])
+    for name, solver in (("hungarian", hungarian), ("greedy", None)):
+        if name == "hungarian" and solver is None:
+            continue
+        linear_sum_assignment = solver
+        try:
+            rows, cols = assign(score, 0.2)
+            pairs = sorted(zip(rows.tolist(), cols.tolist()))
+            expected = [(0, 1), (1, 0)] if solver else [(0, 0)]   # greedy takes 0.9 first
+            assert pairs == expected, (name, pairs)
+            assert assign(np.empty((0, 3)), 0.2)[0].size == 0
+
+            # Crossing people keep their IDs, detecting every frame and every 3rd
+            for every in (1, 3):
+                seen = _crossing(SortTracker(max_age=15, min_hits=2, max_coast=6), detect_every=every)
+                assert all(len(ids) == 1 for ids in seen.values()) and seen[0] != seen[1], (name, every, seen)
+            print(f"✅ assign + crossing ({name})")
+        finally:
+            linear_sum_assignment = hungarian
+
+    # Coasting and expiry: visible for max_coast steps, expired after max_age
+    tracker = SortTracker(max_age=4, min_hits=2, max_coast=2)
+    box = [[100, 100, 160, 220]]
+    tracker.step(box)
+    visible, _ = tracker.step(box)
+    assert [track.id for track in visible] == [1]
+    history = [tracker.step() for _ in range(5)]
+    assert [len(visible) for visible, _ in history] == [1, 1, 0, 0, 0], history
+    assert [expired for _, expired in history] == [[], [], [], [], [1]], history
+    assert tracker.tracks == []
+    print("✅ coasting + expiry")
+
+
+if __name__ == "__main__":
+    _self_check()
@@ -0,0 +1,291 @@
+#
+# File: vision_pipeline.py
+#
+# Threaded stages for the PPE data bridges. Capture, inference and
+# sending each run on their own thread, joined by small drop-oldest
+# queues: when a stage falls behind (slow network, busy display) the
+# stage before it overwrites its oldest pending item instead of
+# blocking, so the model always works on the newest frame and a 1 s
+# HTTP timeout never freezes the video.
+#
+# Sources (open_source): a webcam index ("0"), an RTSP/HTTP URL, a
+# video file or a directory of images. Live sources drop frames when
+# the model falls behind; recorded ones are processed frame by frame
+# (lossless) unless paced to their native FPS. run_per_source() runs one
+# bridge process per source for multi-camera, headless deployments.
+#
+
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+
+import cv2
+import requests
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class DropOldestQueue:
+    """Bounded, thread-safe FIFO; put() never blocks, it drops the oldest item instead."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item, block: bool = False, timeout: float = None) -> bool:
+        """
+        Appends item, dropping the oldest if full. With block=True it
+        waits for room instead and returns False (item not queued) if
+        `timeout` runs out first.
+        """
+        with self._cond:
+            if block and not self._cond.wait_for(lambda: len(self._items) < self.maxsize or self.closed, timeout):
+                return False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float = None):
+        """The oldest item, or None on timeout / once closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()   # room for a blocked put()
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {"depth": len(self._items), "max": self.maxsize, "put": self.put_count, "dropped": self.dropped}
+
+
+class RateMeter:
+    """Events per second and mean/last duration, smoothed over roughly the last `window_s`."""
+
+    def __init__(self, window_s: float = 2.0):
+        self.window_s = window_s
+        self.count = 0
+        self.fps = 0.0
+        self.last_ms = 0.0
+        self.mean_ms = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def tick(self, duration_s: float = None):
+        with self._lock:
+            self.count += 1
+            self._window_count += 1
+            if duration_s is not None:
+                self.last_ms = duration_s * 1000
+                self.mean_ms = self.last_ms if self.count == 1 else 0.9 * self.mean_ms + 0.1 * self.last_ms
+            now = time.perf_counter()
+            elapsed = now - self._window_start
+            if elapsed >= self.window_s:
+                self.fps = self._window_count / elapsed
+                self._window_start, self._window_count = now, 0
+
+    def stats(self) -> dict:
+        return {"count": self.count, "fps": round(self.fps, 1),
+                "last_ms": round(self.last_ms, 1), "mean_ms": round(self.mean_ms, 1)}
+
+
+class ImageDirSource:
+    """cv2.VideoCapture-like reader over the images in a directory, in name order."""
+
+    def __init__(self, path: str):
+        self.paths = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def get(self, prop):
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.index = len(self.paths)
+
+
+def is_live(source: str) -> bool:
+    return source.isdigit() or source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://"))
+
+
+def open_source(source: str, width: int = 640, height: int = 480):
+    """
+    Opens a webcam index ("0"), RTSP/HTTP URL, video file or image
+    directory. Raises IOError if it can't be opened.
+    """
+    if os.path.isdir(source):
+        cap = ImageDirSource(source)
+    elif source.isdigit():
+        cap = cv2.VideoCapture(int(source))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    else:
+        cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"cannot open video source {source!r}")
+    return cap
+
+
+class FrameGrabber(threading.Thread):
+    """
+    Reads frames and queues them as (frame_no, captured_at, frame). The
+    queue is closed when the source ends.
+
+    Default: as fast as the source delivers, keeping only the newest
+    `maxsize` (live cameras). lossless=True waits for the consumer
+    instead, so every frame of a recording is processed. pace_fps
+    replays a recording at that rate, like a live camera.
+    """
+
+    def __init__(self, cap, maxsize: int = 1, lossless: bool = False, pace_fps: float = None,
+                 max_frames: int = 0):
+        super().__init__(name="frame-grabber", daemon=True)
+        self.cap = cap
+        self.queue = DropOldestQueue(maxsize)
+        self.lossless = lossless
+        self.pace_fps = pace_fps
+        self.max_frames = max_frames
+        self.meter = RateMeter()
+        self._stopping = threading.Event()
+
+    def run(self):
+        frame_no = 0
+        started = time.perf_counter()
+        try:
+            while not self._stopping.is_set():
+                if self.max_frames and frame_no >= self.max_frames:
+                    break
+                if self.pace_fps:
+                    delay = started + frame_no / self.pace_fps - time.perf_counter()
+                    if delay > 0:
+                        self._stopping.wait(delay)
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                frame_no += 1
+                item = (frame_no, time.time(), frame)
+                if self.lossless:
+                    while not self.queue.put(item, block=True, timeout=0.5):
+                        if self._stopping.is_set():
+                            return
+                else:
+                    self.queue.put(item)
+                self.meter.tick()
+        finally:
+            self.queue.close()
+
+    def stop(self):
+        self._stopping.set()
+
+
+class TelemetrySender(threading.Thread):
+    """
+    Posts (path, payload) items to the backend from its own thread over
+    one pooled keep-alive session, so the video loop only enqueues.
+    """
+
+    def __init__(self, base_url: str, maxsize: int = 64, timeout: float = 1.0):
+        super().__init__(name="telemetry-sender", daemon=True)
+        self.base_url = base_url
+        self.timeout = timeout
+        self.queue = DropOldestQueue(maxsize)
+        self.session = requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self.meter = RateMeter()
+
+    def submit(self, path: str, payload: dict):
+        self.queue.put((path, payload))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, payload = item
+            start = time.perf_counter()
+            try:
+                res = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+                self.sent += 1
+                if res.status_code not in (200, 202):
+                    print(f"  ⚠️  {path} {payload.get('workerId', '')} -> [Code: {res.status_code}]")
+            except Exception as e:
+                self.failed += 1
+                print(f"  ⚠️  Send error for {payload.get('workerId', path)}: {e}")
+            self.meter.tick(time.perf_counter() - start)
+        self.session.close()
+
+    def stop(self):
+        self.queue.close()
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "post_ms": round(self.meter.mean_ms, 1),
+                "queue": self.queue.stats()}
+
+
+def default_threads(n_processes: int) -> int:
+    """CPU threads each of n_processes bridge processes should use."""
+    return max(1, (os.cpu_count() or 1) // max(1, n_processes))
+
+
+def limit_threads(n: int):
+    """Caps OpenCV's and torch's thread pools so per-camera processes don't oversubscribe the CPU."""
+    cv2.setNumThreads(n)
+    try:
+        import torch
+        torch.set_num_threads(n)
+    except ImportError:
+        pass
+
+
+def run_per_source(target, sources, *args) -> list:
+    """
+    Runs target(source, *args) in one process per source and waits for
+    all of them. Returns the exit codes in source order.
+    """
+    processes = [multiprocessing.Process(target=target, args=(source,) + args, name=f"bridge-{i}")
+                 for i, source in enumerate(sources)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the children too; give them time to print their stats
+        for process in processes:
+            process.join(timeout=10)
+    return [process.exitcode for process in processes]
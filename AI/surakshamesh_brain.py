@@ -1,49 +1,95 @@
 """
-SurakshaMesh Brain - RAM ONLY Version (Crash-Proof)
+SurakshaMesh Brain - RAM-first, with an append-only log (Crash-Proof)
+
+Incidents are served from memory (incident_store.py) and appended to an
+on-disk log (incident_log.py) in AI/brain_log (gitignored) by default,
+which is replayed on startup so history survives restarts.
+SURAKSHA_BRAIN_LOG_DIR picks another directory; set it to '' for RAM only.
 """
 from datetime import datetime, timedelta
 from typing import Dict, Any
+import os
+import atexit
 import random
+import time
+
+from incident_store import IncidentStore, DEFAULT_CAPACITY
+from incident_log import IncidentLog
+from risk_windows import RiskAnalytics, HIGH_RISK
+
+# Append-only incident log (SURAKSHA_BRAIN_LOG_DIR, '' = RAM only)
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brain_log")
 
 class SurakshaMeshBrain:
-    def __init__(self):
-        # IN-MEMORY STORAGE (No database file = No locks)
-        self.incidents = []
-        print("🧠 Brain initialized in RAM-ONLY mode (Super Fast)")
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, log: IncidentLog = None):
+        # IN-MEMORY STORAGE (no database, no locks in the hot path)
+        # Per-worker ring buffers: the last `capacity` incidents per worker
+        # plus all-time running totals
+        self.store = IncidentStore(capacity)
+
+        # Streaming EWMA / rolling-window / trend stats per worker and zone
+        self.analytics = RiskAnalytics()
+
+        # Durability without locks in the hot path: remember() only queues
+        # the record, a background thread group-commits it to the log, and
+        # the log is replayed into the store here on startup
+        self.log = log
+        if log is None:
+            print(f"🧠 Brain initialized in RAM-ONLY mode (Super Fast, {capacity} records/worker)")
+        else:
+            replayed = log.replay(self.store)
+            self._rebuild_analytics()
+            atexit.register(log.close)
+            print(f"🧠 Brain initialized (RAM + append-only log '{log.directory}', "
+                  f"{replayed} records replayed, {capacity} records/worker)")
+
+    def _rebuild_analytics(self):
+        """Seeds the streaming stats from the retained (replayed) records, in time order."""
+        records = [r for w_id in self.store.worker_ids() for r in self.store.recent(w_id)]
+        records.sort(key=lambda r: r["timestamp"])
+        for r in records:
+            self.analytics.update(r["worker_id"], r["zone"], r["timestamp"], r["risk_score"])
+
+    @property
+    def incidents(self):
+        """Every retained incident, oldest first per worker (for debugging/export)."""
+        return [dict(record, timestamp=datetime.fromtimestamp(record["timestamp"]))
+                for w_id in self.store.worker_ids() for record in self.store.recent(w_id)]
 
     def remember(self, worker_id: str, risk_score: int, zone: str):
         try:
-            record = {
-                "worker_id": worker_id,
-                "timestamp": datetime.now(),
-                "risk_score": risk_score,
-                "zone": zone
-            }
-            self.incidents.append(record)
-            print(f"🧠 Memory Updated: {worker_id} | Risk: {risk_score} | Total Records: {len(self.incidents)}")
+            timestamp = time.time()
+            self.store.append(worker_id, timestamp, int(risk_score), zone)
+            self.analytics.update(worker_id, zone, timestamp, int(risk_score))
+            if self.log is not None:
+                self.log.append(worker_id, timestamp, int(risk_score), zone)
+            print(f"🧠 Memory Updated: {worker_id} | Risk: {risk_score} | Total Records: {self.store.total_recorded}")
         except Exception as e:
             print(f"❗ Logic Error: {e}")
 
     def get_insights(self, worker_id: str) -> Dict[str, Any]:
-        # Filter list in memory
-        worker_incidents = [i for i in self.incidents if i["worker_id"] == worker_id]
-        
-        total = len(worker_incidents)
+        # Running totals and streaming stats, no scan
+        total, risk_sum, last = self.store.summary(worker_id)
         avg = 0
         if total > 0:
-            avg = sum(i["risk_score"] for i in worker_incidents) / total
+            avg = risk_sum / total
 
+        now = time.time()
         return {
             "worker_id": worker_id,
             "total_incidents": total,
             "avg_risk": round(avg, 1),
+            "trends": self.analytics.worker(worker_id, now),
+            "zone_trends": self.analytics.zone(last["zone"], now) if last else None,
             "prediction": self.predict_next_incident(worker_id)
         }
 
     def predict_next_incident(self, worker_id: str) -> Dict[str, Any]:
-        worker_incidents = [i for i in self.incidents if i["worker_id"] == worker_id]
+        total, _, last = self.store.summary(worker_id)
+        # No streaming stats for a worker known only by replayed totals
+        stats = self.analytics.worker(worker_id, time.time()) if total >= 2 else None
         
-        if len(worker_incidents) < 2:
+        if stats is None:
             return {
                 "prediction": "LOW",
                 "confidence": 90, 
@@ -51,22 +97,44 @@ class SurakshaMeshBrain:
                 "time_until_hours": 8.0
             }
 
-        # Simple Demo Logic
-        last_risk = worker_incidents[-1]["risk_score"]
-        
-        if last_risk > 80:
+        # Trend Logic: smoothed level, slope and recent high-risk events
+        level = stats["ewma_risk"]
+        slope = stats["trend_per_min"]
+        last_risk = last["risk_score"]
+
+        # Hours until the smoothed risk crosses HIGH_RISK at the current slope
+        eta_hours = (HIGH_RISK - level) / slope / 60 if slope > 0 and level < HIGH_RISK else None
+
+        # More recent evidence -> more confidence
+        confidence = min(95, 60 + 5 * stats["windows"]["1h"]["count"])
+
+        if level > HIGH_RISK or (last_risk > HIGH_RISK and slope >= 0):
             return {
                 "prediction": "CRITICAL",
                 "confidence": 98,
                 "recommendation": "IMMEDIATE EVACUATION",
                 "time_until_hours": 0.1
             }
-        else:
-             return {
+        elif (eta_hours is not None and eta_hours <= 1) or stats["high_risk_per_hour"] >= 3:
+            return {
+                "prediction": "HIGH",
+                "confidence": confidence,
+                "recommendation": "Move out of zone, supervisor check",
+                "time_until_hours": round(min(eta_hours if eta_hours is not None else 0.5, 1.0), 2)
+            }
+        elif eta_hours is not None or level >= 50:
+            return {
                 "prediction": "MEDIUM",
-                "confidence": 75,
+                "confidence": confidence,
                 "recommendation": "Schedule Break",
-                "time_until_hours": 4.5
+                "time_until_hours": round(min(eta_hours if eta_hours is not None else 4.5, 8.0), 2)
+            }
+        else:
+            return {
+                "prediction": "LOW",
+                "confidence": confidence,
+                "recommendation": "Keep monitoring",
+                "time_until_hours": 8.0
             }
 
     def autonomous_actions(self, context: Dict, risk_score: int):
@@ -84,4 +152,4 @@ class SurakshaMeshBrain:
             
         return actions
 
-brain = SurakshaMeshBrain()
\ No newline at end of file
+brain = SurakshaMeshBrain(log=IncidentLog.from_env(DEFAULT_LOG_DIR, DEFAULT_CAPACITY))
\ No newline at end of file
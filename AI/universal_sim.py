@@ -1,78 +1,260 @@
 """
 SurakshaMesh X - Universal Sensor Array Simulator
-Simulates: Gas, Acoustic, Thermal, Dust, and Seismic sensors with Predictive AI.
+Simulates: Gas, Acoustic, Thermal, Dust, and Seismic sensors at plant scale.
+
+An asyncio load generator for the Universal Brain (websocket_universal.py):
+thousands of drifting sensors spread over zones, sent at a target rate
+through one pooled keep-alive HTTP client. Prints progress every second
+and, at the end, the achieved throughput plus the brain's response-time
+percentiles. Status and prediction are computed by the brain
+(sensor_evaluator.py), so only raw values are sent.
+
+    python3 universal_sim.py --sensors 5 --rate 3 --mode single --log   # classic demo
+    python3 universal_sim.py --sensors 5000 --zones 40 --rate 20000 --mode batch --batch 200
+    python3 universal_sim.py --sensors 5000 --rate 20000 --mode stream --connections 4
+
+Modes:
+    single  one POST /telemetry/universal per reading
+    batch   POST /telemetry/universal/batch with up to --batch readings
+    stream  --connections long-lived chunked NDJSON uploads to
+            /telemetry/universal/stream (one response per stream, so
+            latency percentiles are for single/batch only)
+
+Requires httpx (pinned in surakshamesh-ai/requirements.txt).
 """
-import requests
+import json
 import time
 import random
+import asyncio
+import argparse
+from collections import Counter
 
-BRAIN_URL = "http://localhost:8002/telemetry/universal"
+import httpx
 
 # --- SENSOR DEFINITIONS ---
-sensors = [
-    { "id": "GAS-01", "type": "GAS", "zone": "Furnace-A", "unit": "ppm", "base": 15, "limit": 50 },
-    { "id": "AUDIO-04", "type": "ACOUSTIC", "zone": "Generator-Room", "unit": "dB", "base": 65, "limit": 90 },
-    { "id": "THERM-02", "type": "THERMAL", "zone": "Main-Tunnel", "unit": "°C", "base": 32, "limit": 45 },
-    { "id": "DUST-09", "type": "DUST", "zone": "Excavation-B", "unit": "µg/m³", "base": 40, "limit": 150 },
-    { "id": "VIB-01", "type": "SEISMIC", "zone": "Wall-North", "unit": "g", "base": 0.02, "limit": 1.5 }
+SENSOR_TYPES = [
+    { "prefix": "GAS", "type": "GAS", "unit": "ppm", "base": 15, "limit": 50 },
+    { "prefix": "AUDIO", "type": "ACOUSTIC", "unit": "dB", "base": 65, "limit": 90 },
+    { "prefix": "THERM", "type": "THERMAL", "unit": "°C", "base": 32, "limit": 45 },
+    { "prefix": "DUST", "type": "DUST", "unit": "µg/m³", "base": 40, "limit": 150 },
+    { "prefix": "VIB", "type": "SEISMIC", "unit": "g", "base": 0.02, "limit": 1.5 }
 ]
+DEMO_ZONES = ["Furnace-A", "Generator-Room", "Main-Tunnel", "Excavation-B", "Wall-North"]
+
+PATHS = {
+    "single": "/telemetry/universal",
+    "batch": "/telemetry/universal/batch",
+    "stream": "/telemetry/universal/stream",
+}
+
+
+class SensorArray:
+    """Sensor i has type i % 5 and zone i % zones; values drift per reading."""
+
+    def __init__(self, n_sensors: int, n_zones: int):
+        zones = DEMO_ZONES[:n_zones] if n_zones <= len(DEMO_ZONES) else \
+            [f"Zone-{z:03d}" for z in range(n_zones)]
+        self.sensors = []
+        for i in range(n_sensors):
+            spec = SENSOR_TYPES[i % len(SENSOR_TYPES)]
+            self.sensors.append({
+                "sensor_id": f"{spec['prefix']}-{i:05d}",
+                "sensor_type": spec["type"],
+                "zone": zones[i % len(zones)],
+                "unit": spec["unit"],
+            })
+        self.specs = [SENSOR_TYPES[i % len(SENSOR_TYPES)] for i in range(n_sensors)]
+        self.values = [spec["base"] for spec in self.specs]
+        self.next = 0
+
+    def reading(self) -> dict:
+        """The next sensor's reading (round robin)."""
+        i = self.next
+        self.next = (i + 1) % len(self.sensors)
+        spec = self.specs[i]
+
+        # 1. Realistic Drift Logic (Brownian Motion), scaled to the sensor's range
+        self.values[i] = max(0.0, self.values[i] + random.uniform(-1.5, 1.8) * spec["limit"] / 50)
+        value = self.values[i]
 
-# Internal state to track "drifting" values
-sensor_state = {s["id"]: s["base"] for s in sensors}
-
-print("📡 Universal Sensor Mesh Online. Monitoring 5 Environmental Parameters...")
-
-while True:
-    for s in sensors:
-        # 1. Realistic Drift Logic (Brownian Motion)
-        drift = random.uniform(-1.5, 1.8) # Slightly upward bias for tension
-        sensor_state[s["id"]] += drift
-        
-        # Clamp values so they don't go negative or insane (unless we want them to)
-        current_val = max(0, round(sensor_state[s["id"]], 2))
-        
-        # 2. Determine Status & Prediction
-        limit = s["limit"]
-        status = "NORMAL"
-        prediction = "Stable trend"
-        
         # --- SCENARIO: 5% Chance of "Pre-Failure" Spike ---
-        if random.random() < 0.05: 
-            current_val += (limit * 0.4) # Sudden jump
-            status = "WARNING"
-            prediction = f"⚠️ Rising Trend: Limit breach in <10m"
-        
-        # --- CRITICAL THRESHOLD CHECK ---
-        if current_val > limit:
-            status = "CRITICAL"
-            if s["type"] == "GAS":
-                prediction = "🚨 GAS LEAK DETECTED - EXPLOSION RISK"
-            elif s["type"] == "ACOUSTIC":
-                prediction = "🚨 BEARING FAILURE IMMINENT"
-            elif s["type"] == "SEISMIC":
-                prediction = "🚨 STRUCTURAL COLLAPSE PREDICTED"
-            else:
-                prediction = f"🚨 CRITICAL LEVEL ({current_val}{s['unit']})"
-
-        # 3. Send to Brain
-        payload = {
-            "sensor_id": s["id"],
-            "sensor_type": s["type"],
-            "zone": s["zone"],
-            "value": current_val,
-            "unit": s["unit"],
-            "status": status,
-            "prediction": prediction
-        }
+        if random.random() < 0.05:
+            value += spec["limit"] * 0.4
+
+        return {**self.sensors[i], "value": round(value, 2), "timestamp": time.time()}
+
+
+def percentile(samples, p: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class Stats:
+    def __init__(self):
+        self.scheduled = 0       # readings the rate called for
+        self.sent = 0            # readings handed to a request
+        self.accepted = 0        # readings the brain acknowledged
+        self.latencies_ms = []   # per request
+        self.statuses = Counter()
+        self.in_flight = 0
 
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.array = SensorArray(args.sensors, args.zones)
+        self.stats = Stats()
+        self.path = PATHS[args.mode]
+        self.slots = asyncio.Semaphore(args.connections)
+        self.tasks = set()
+        self.streams = []
+
+    # --- 1. Request modes ---
+    async def post(self, client: httpx.AsyncClient, body, n_readings: int):
+        stats = self.stats
+        start = time.perf_counter()
         try:
-            requests.post(BRAIN_URL, json=payload, timeout=0.5)
-            
-            # Print pretty log for your terminal demo
-            icon = "🟢" if status == "NORMAL" else "🔴" if status == "CRITICAL" else "🟡"
-            print(f"{icon} {s['type']} [{s['zone']}]: {current_val} {s['unit']} | {prediction}")
-            
-        except:
-            print("❌ Brain Offline")
-
-    time.sleep(1.5) # Fast updates
\ No newline at end of file
+            response = await client.post(self.path, json=body)
+            stats.statuses[response.status_code] += 1
+            if response.status_code == 200:
+                stats.accepted += n_readings
+                stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+                if self.args.log and self.args.mode == "single":
+                    result = response.json()
+                    icon = "🟢" if result["sensor_status"] == "NORMAL" else \
+                        "🔴" if result["sensor_status"] == "CRITICAL" else "🟡"
+                    print(f"{icon} {body['sensor_type']} [{body['zone']}]: {body['value']} {body['unit']} | {result['prediction']}")
+        except httpx.HTTPError as e:
+            stats.statuses[type(e).__name__] += 1
+        finally:
+            stats.in_flight -= 1
+            self.slots.release()
+
+    async def dispatch(self, client: httpx.AsyncClient, due: int, deadline: float):
+        """
+        Sends `due` readings as connection slots free up. Readings are
+        made just before sending; any not sent by the deadline are left
+        behind (the brain could not keep up with the target rate).
+        """
+        size = self.args.batch if self.args.mode == "batch" else 1
+        for i in range(0, due, size):
+            await self.slots.acquire()
+            if time.perf_counter() >= deadline:
+                self.slots.release()
+                return
+            chunk = [self.array.reading() for _ in range(min(size, due - i))]
+            self.stats.in_flight += 1
+            self.stats.sent += len(chunk)
+            body = chunk if self.args.mode == "batch" else chunk[0]
+            task = asyncio.create_task(self.post(client, body, len(chunk)))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    # --- 2. Stream mode ---
+    async def stream(self, client: httpx.AsyncClient, queue: asyncio.Queue):
+        async def body():
+            while True:
+                lines = await queue.get()
+                if lines is None:
+                    return
+                yield lines
+
+        try:
+            response = await client.post(self.path, content=body(),
+                                         headers={"Content-Type": "application/x-ndjson"})
+            self.stats.statuses[response.status_code] += 1
+            if response.status_code == 200:
+                self.stats.accepted += response.json()["accepted"]
+        except httpx.HTTPError as e:
+            self.stats.statuses[type(e).__name__] += 1
+
+    def feed_streams(self, readings):
+        share = -(-len(readings) // len(self.streams))
+        for k, (queue, _) in enumerate(self.streams):
+            part = readings[k * share:(k + 1) * share]
+            if part:
+                queue.put_nowait("".join(json.dumps(r) + "\n" for r in part).encode())
+                self.stats.sent += len(part)
+
+    # --- 3. Pacing ---
+    async def run(self):
+        args, stats = self.args, self.stats
+        limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+        timeout = httpx.Timeout(args.timeout, read=None if args.mode == "stream" else args.timeout)
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            if args.mode == "stream":
+                for _ in range(args.connections):
+                    queue = asyncio.Queue()
+                    self.streams.append((queue, asyncio.create_task(self.stream(client, queue))))
+
+            start = last_report = time.perf_counter()
+            last_accepted = 0
+            deadline = start + args.duration if args.duration > 0 else float("inf")
+            try:
+                while True:
+                    now = time.perf_counter()
+                    if now >= deadline:
+                        break
+                    # Everything the target rate calls for by now, sent in one go
+                    due = int((now - start) * args.rate) - stats.scheduled
+                    if due > 0:
+                        stats.scheduled += due
+                        if args.mode == "stream":
+                            self.feed_streams([self.array.reading() for _ in range(due)])
+                        else:
+                            await self.dispatch(client, due, deadline)
+
+                    if now - last_report >= 1.0:
+                        rate = (stats.accepted - last_accepted) / (now - last_report)
+                        print(f"📡 {stats.accepted:>9} accepted  {rate:9.0f}/s  "
+                              f"in flight {stats.in_flight:<4}  behind {stats.scheduled - stats.sent}")
+                        last_report, last_accepted = now, stats.accepted
+                    await asyncio.sleep(args.tick)
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                pass
+            finally:
+                for queue, _ in self.streams:
+                    queue.put_nowait(None)
+                await asyncio.gather(*self.tasks, *[task for _, task in self.streams],
+                                     return_exceptions=True)
+                self.report(time.perf_counter() - start)
+
+    def report(self, wall_s: float):
+        args, stats = self.args, self.stats
+        lat = stats.latencies_ms
+        print("---")
+        print(f"{args.sensors} sensors / {args.zones} zones, {args.mode} mode"
+              + (f" (batch {args.batch})" if args.mode == "batch" else "")
+              + f", {args.connections} connections, {wall_s:.1f}s")
+        print(f"target {args.rate:.0f}/s  achieved {stats.accepted / wall_s:.0f}/s  "
+              f"({stats.accepted}/{stats.scheduled} readings accepted)")
+        if lat:
+            print(f"latency n={len(lat)} p50={percentile(lat, 50):.2f}ms  p95={percentile(lat, 95):.2f}ms  "
+                  f"p99={percentile(lat, 99):.2f}ms  max={max(lat):.2f}ms")
+        print(f"status codes: {dict(stats.statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SurakshaMesh universal sensor load generator")
+    parser.add_argument("--url", default="http://localhost:8002")
+    parser.add_argument("--sensors", type=int, default=1000)
+    parser.add_argument("--zones", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=1000, help="target readings per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds (0 = until Ctrl+C)")
+    parser.add_argument("--mode", choices=sorted(PATHS), default="batch")
+    parser.add_argument("--batch", type=int, default=100, help="readings per batch request")
+    parser.add_argument("--connections", type=int, default=16, help="pooled connections / concurrent requests")
+    parser.add_argument("--timeout", type=float, default=10.0, help="request timeout, seconds")
+    parser.add_argument("--tick", type=float, default=0.01, help="pacing interval, seconds")
+    parser.add_argument("--log", action="store_true", help="print every reading (single mode)")
+    args = parser.parse_args()
+
+    print(f"📡 Universal Sensor Mesh Online. {args.sensors} sensors across {args.zones} zones "
+          f"-> {args.url}{PATHS[args.mode]} at {args.rate:.0f} readings/s")
+    try:
+        asyncio.run(LoadGenerator(args).run())
+    except KeyboardInterrupt:
+        pass
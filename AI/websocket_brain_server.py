@@ -1,10 +1,14 @@
+import os
+import time
 import asyncio
 import json
 from datetime import datetime
+from typing import Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from surakshamesh_brain import brain
+from ws_hub import BroadcastHub
 
 app = FastAPI()
 
@@ -16,7 +20,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-active_connections = []
+# Every dashboard gets the same pre-serialized messages through its own
+# bounded, drop-oldest send queue
+hub = BroadcastHub(
+    max_queue=int(os.environ.get("SURAKSHA_WS_QUEUE", "32")),
+    send_timeout_s=float(os.environ.get("SURAKSHA_WS_SEND_TIMEOUT_S", "5"))
+)
+
+# get_prediction rebuilds the snapshot if it is older than this (trend
+# windows move with time even when no incident arrives)
+SNAPSHOT_MAX_AGE_S = float(os.environ.get("SURAKSHA_SNAPSHOT_MAX_AGE_S", "1"))
 
 # Pre-defined workers for the demo
 workers_db = [
@@ -25,15 +38,119 @@ workers_db = [
     {"id": "WKR-2403-F", "name": "Priya Sharma", "zone": "Storage", "risk": 25, "hr": 72, "spo2": 98},
 ]
 
+def merge_patch(old: dict, new: dict) -> dict:
+    """
+    JSON Merge Patch (RFC 7386) turning `old` into `new`: only changed
+    keys, nested dicts diffed recursively, removed keys set to null.
+    """
+    patch = {}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            sub = merge_patch(old[key], value)
+            if sub:
+                patch[key] = sub
+        elif old[key] != value:
+            patch[key] = value
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+class SnapshotPublisher:
+    """
+    Versioned roster state for the dashboards. Each state change
+    rebuilds it once and broadcasts, serialized once:
+    - to delta clients, a `patch` (merge patch of only the workers and
+      fields that changed) with the next sequence number
+    - to full clients (the default), the whole `full_update`
+    Clients opt in to deltas with ?delta=1. A delta client starts from a
+    `full_update` carrying `seq`; if it sees a patch whose seq isn't
+    last seq + 1 it sends {"type": "resync"} and gets a fresh full_update.
+    Changes that arrive while a snapshot is being built fold into the
+    next one; a rebuild that changes nothing sends nothing.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.state = {}   # worker id -> worker dict with insights
+        self.built_at = 0.0
+        self._full_text = None
+        self._dirty = False
+        self._task = None
+        self._building = asyncio.Lock()
+
+    def _collect(self) -> dict:
+        """Gathers every worker's insights (runs in a worker thread)."""
+        updated_workers = {}
+        for w in workers_db:
+            w_copy = w.copy()
+            w_copy["insights"] = brain.get_insights(w["id"])
+            updated_workers[w["id"]] = w_copy
+        return updated_workers
+
+    async def rebuild(self) -> Optional[str]:
+        """Refreshes the state; returns the serialized patch, or None if nothing changed."""
+        async with self._building:
+            new_state = await asyncio.to_thread(self._collect)
+            self.built_at = time.monotonic()
+            patch = merge_patch(self.state, new_state)
+            if not patch and self.seq > 0:
+                return None
+
+            self.seq += 1
+            self.state = new_state
+            self._full_text = None
+            return json.dumps({"type": "patch", "seq": self.seq, "workers": patch})
+
+    def full_update(self) -> str:
+        if self._full_text is None:
+            self._full_text = json.dumps({
+                "type": "full_update",
+                "seq": self.seq,
+                "version": self.seq,
+                "workers": list(self.state.values())
+            })
+        return self._full_text
+
+    async def latest(self) -> str:
+        if self.seq == 0:
+            await self.rebuild()
+        return self.full_update()
+
+    def invalidate(self):
+        """Schedules a rebuild + broadcast (at most one running at a time)."""
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._publish())
+
+    async def _publish(self):
+        while self._dirty:
+            self._dirty = False
+            patch = await self.rebuild()
+            if patch is None:
+                continue
+            hub.broadcast(patch, where=lambda c: c.delta)
+            if any(not c.delta for c in hub.connections):
+                hub.broadcast(self.full_update(), where=lambda c: not c.delta)
+
+
+publisher = SnapshotPublisher()
+
+
 @app.websocket("/ws/brain")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    active_connections.append(websocket)
-    print(f"🟢 Client connected. Total: {len(active_connections)}")
+    conn = hub.connect(websocket)
+    # Full updates by default, so older dashboards keep working; ?delta=1 opts in to patches
+    conn.delta = websocket.query_params.get("delta", "0") == "1"
+    print(f"🟢 Client connected. Total: {len(hub)}")
     
     try:
         # Send initial state immediately
-        await send_full_update(websocket)
+        conn.send(await publisher.latest())
 
         while True:
             # Wait for message
@@ -55,42 +172,38 @@ async def websocket_endpoint(websocket: WebSocket):
                 actions = brain.autonomous_actions(context, int(risk))
                 
                 # 3. Send confirmations
-                await websocket.send_json({
+                conn.send(json.dumps({
                     "type": "incident_recorded",
                     "worker_id": w_id,
                     "risk": risk,
                     "actions": actions
-                })
+                }))
                 
-                # 4. Send updated predictions
-                await send_full_update(websocket)
+                # 4. Push updated predictions to every dashboard
+                publisher.invalidate()
 
             elif message.get("type") == "get_prediction":
-                 # Just refresh everyone
-                 await send_full_update(websocket)
+                # Trend windows move with time: refresh if stale, else
+                # the client is already up to date
+                if time.monotonic() - publisher.built_at > SNAPSHOT_MAX_AGE_S:
+                    publisher.invalidate()
+                elif not conn.delta:
+                    conn.send(publisher.full_update())
+
+            elif message.get("type") == "resync":
+                conn.send(publisher.full_update())
 
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
         print("🔴 Client disconnected")
     except Exception as e:
         print(f"❗ Server Error: {e}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-
-async def send_full_update(websocket: WebSocket):
-    """Helper to gather all insights and send to client"""
-    updated_workers = []
-    for w in workers_db:
-        # Offload insight calculation too
-        insights = await asyncio.to_thread(brain.get_insights, w["id"])
-        w_copy = w.copy()
-        w_copy["insights"] = insights
-        updated_workers.append(w_copy)
-    
-    await websocket.send_json({
-        "type": "full_update",
-        "workers": updated_workers
-    })
+    finally:
+        hub.disconnect(conn)
+
+
+@app.get("/stats")
+def read_stats():
+    return {"snapshot_seq": publisher.seq, "hub": hub.stats()}
 
 if __name__ == "__main__":
     print("🚀 SurakshaMesh Brain Server running on port 8002")
@@ -1,9 +1,14 @@
+import os
+import time
 import asyncio
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import List, Optional
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import uvicorn
+from ws_hub import BroadcastHub, ConflatingBroadcaster
+from sensor_evaluator import SensorEvaluator
 
 app = FastAPI()
 
@@ -19,49 +24,183 @@ class UniversalSensorData(BaseModel):
     zone: str
     value: float      # The raw number (e.g., 45.5)
     unit: str         # "ppm", "dB", "°C", "PM2.5"
-    status: str       # "NORMAL", "WARNING", "CRITICAL"
-    prediction: str   # "Stable", "Failure in 20m", "Explosion Risk"
+    # Computed server-side (sensor_evaluator.py); anything a client sends is replaced
+    status: Optional[str] = None      # "NORMAL", "WARNING", "CRITICAL"
+    prediction: Optional[str] = None  # "Stable", "Failure in 20m", "Explosion Risk"
+    timestamp: Optional[float] = None # epoch seconds at the sensor; arrival time if omitted
 
-active_connections = []
-
-async def broadcast(message: dict):
-    for connection in active_connections:
-        try:
-            await connection.send_json(message)
-        except:
-            pass
+# Each dashboard socket has its own sender task (concurrent sends, per-socket
+# timeout, dead sockets evicted). sensor_update is conflated per sensor_id
+# over SURAKSHA_WS_FLUSH_MS; environmental_alert never is.
+hub = BroadcastHub(
+    max_queue=int(os.environ.get("SURAKSHA_WS_QUEUE", "1024")),
+    send_timeout_s=float(os.environ.get("SURAKSHA_WS_SEND_TIMEOUT_S", "5"))
+)
+broadcaster = ConflatingBroadcaster(hub, flush_interval_s=float(os.environ.get("SURAKSHA_WS_FLUSH_MS", "50")) / 1000)
 
 @app.websocket("/ws/brain")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    active_connections.append(websocket)
+    conn = hub.connect(websocket)
     try:
         while True:
             await websocket.receive_text() # Keep-alive
-    except:
-        active_connections.remove(websocket)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.disconnect(conn)
 
-# --- UNIVERSAL INGESTION ENDPOINT ---
-@app.post("/telemetry/universal")
-async def receive_sensor_data(data: UniversalSensorData):
-    print(f"📡 {data.sensor_type} [{data.zone}]: {data.value}{data.unit} -> {data.prediction}")
-    
-    # 1. Forward to Dashboard (Digital Twin)
-    await broadcast({
+@app.get("/stats")
+def read_stats():
+    return broadcaster.stats()
+
+# Per-sensor limits, rolling slope and time-to-limit forecast
+evaluator = SensorEvaluator()
+
+# --- SHARED INGEST LOGIC ---
+def ingest(data: UniversalSensorData):
+    # 0. Status and prediction from the server-side evaluator
+    if data.timestamp is None:
+        data.timestamp = time.time()
+    evaluation = evaluator.evaluate(data.sensor_id, data.sensor_type, data.value, data.unit, data.timestamp)
+    data.status = evaluation.pop("status")
+    data.prediction = evaluation.pop("prediction")
+
+    # 1. Forward to Dashboard (Digital Twin), newest reading per sensor
+    broadcaster.update(data.sensor_id, {
         "type": "sensor_update",
-        "data": data.dict()
+        "data": {**data.dict(), **evaluation}
     })
 
     # 2. Handle CRITICAL Predictions (The "Smart" Part)
     if data.status == "CRITICAL":
-        await broadcast({
+        broadcaster.alert({
             "type": "environmental_alert",
             "title": f"🚨 {data.sensor_type} CRITICAL",
             "message": f"{data.prediction} in {data.zone}. Evacuate immediately.",
             "zone": data.zone
         })
-        
-    return {"status": "logged"}
+
+# Validates a whole batch in one pydantic-core call
+readings_adapter = TypeAdapter(List[UniversalSensorData])
+reading_adapter = TypeAdapter(UniversalSensorData)
+
+MAX_REPORTED_ERRORS = 10
+# Longest NDJSON line accepted; a stream can't grow the server's buffer past this
+MAX_LINE_BYTES = int(os.environ.get("SURAKSHA_MAX_LINE_BYTES", str(64 * 1024)))
+
+
+def reject(result: dict, msg: str):
+    result["rejected"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append(msg)
+
+
+def ingest_lines(lines: List[bytes], result: dict):
+    """
+    Validates NDJSON lines as one JSON array; if that fails, or the
+    array doesn't hold exactly one reading per line (a line like
+    `{...},{...}`), line by line so only the bad readings are rejected.
+    Updates result's accepted / rejected / errors counters.
+    """
+    lines = [line for line in lines if line.strip()]
+    oversize = [line for line in lines if len(line) > MAX_LINE_BYTES]
+    if oversize:
+        for _ in oversize:
+            reject(result, f"line longer than {MAX_LINE_BYTES} bytes")
+        lines = [line for line in lines if len(line) <= MAX_LINE_BYTES]
+    if not lines:
+        return
+    try:
+        readings = readings_adapter.validate_json(b"[" + b",".join(lines) + b"]")
+    except ValidationError:
+        readings = None
+    if readings is None or len(readings) != len(lines):
+        readings = []
+        for line in lines:
+            try:
+                readings.append(reading_adapter.validate_json(line))
+            except ValidationError as e:
+                reject(result, e.errors(include_url=False)[0]["msg"])
+
+    for data in readings:
+        ingest(data)
+    result["accepted"] += len(readings)
+
+
+def new_result() -> dict:
+    return {"status": "logged", "accepted": 0, "rejected": 0, "errors": []}
+
+
+# --- UNIVERSAL INGESTION ENDPOINTS ---
+@app.post("/telemetry/universal")
+async def receive_sensor_data(data: UniversalSensorData):
+    ingest(data)
+    print(f"📡 {data.sensor_type} [{data.zone}]: {data.value}{data.unit} -> {data.prediction}")
+    return {"status": "logged", "sensor_status": data.status, "prediction": data.prediction}
+
+@app.post("/telemetry/universal/batch")
+async def receive_sensor_batch(readings: List[UniversalSensorData]):
+    """Many readings per request: validated together, one log line per batch."""
+    for data in readings:
+        ingest(data)
+    print(f"📡 Batch: {len(readings)} readings")
+    return {"status": "logged", "accepted": len(readings)}
+
+@app.post("/telemetry/universal/stream")
+async def receive_sensor_stream(request: Request):
+    """
+    Newline-delimited JSON over one long-lived request body (chunked
+    upload). Readings are ingested as each chunk arrives; the response
+    summarizes the whole stream once the client finishes it.
+    """
+    result, tail, skipping = new_result(), b"", False
+    async for chunk in request.stream():
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        if skipping:
+            # Discarding an oversize line up to its newline
+            if not lines:
+                tail = b""
+                continue
+            lines.pop(0)
+            skipping = False
+        ingest_lines(lines, result)
+        if len(tail) > MAX_LINE_BYTES:
+            reject(result, f"line longer than {MAX_LINE_BYTES} bytes")
+            tail, skipping = b"", True
+    if not skipping:
+        ingest_lines([tail], result)
+    print(f"📡 Stream closed: {result['accepted']} readings, {result['rejected']} rejected")
+    return result
+
+@app.websocket("/ws/telemetry")
+async def telemetry_socket(websocket: WebSocket):
+    """
+    Streaming ingest over a WebSocket: each message is one or more
+    NDJSON lines (or a JSON array); each gets an ack with its counts.
+    """
+    await websocket.accept()
+    total = 0
+    try:
+        while True:
+            message = (await websocket.receive_text()).encode()
+            result = new_result()
+            if message.lstrip().startswith(b"["):
+                try:
+                    readings = readings_adapter.validate_json(message)
+                    for data in readings:
+                        ingest(data)
+                    result["accepted"] = len(readings)
+                except ValidationError as e:
+                    result["rejected"] = e.error_count()
+                    result["errors"] = [err["msg"] for err in e.errors(include_url=False)[:MAX_REPORTED_ERRORS]]
+            else:
+                ingest_lines(message.split(b"\n"), result)
+            total += result["accepted"]
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        print(f"📡 Telemetry socket closed after {total} readings")
 
 if __name__ == "__main__":
     print("🚀 Universal Brain v5.0 Online on Port 8002")
@@ -0,0 +1,184 @@
+"""
+SurakshaMesh WebSocket Hub - fan-out with bounded per-client queues
+
+A message is serialized once and the same text is queued for every
+connection. Each connection has its own sender task draining a bounded
+queue: when a slow client falls behind, its oldest queued messages are
+dropped (and counted) instead of stalling the broadcaster or the other
+clients. A send that takes longer than `send_timeout_s` marks the
+client dead and it is evicted.
+
+Messages can also carry a conflation key (a newer message with the
+same key replaces the queued one in place, e.g. per-sensor updates) or
+be marked non-droppable (alerts: kept in order but never dropped or
+conflated). ConflatingBroadcaster adds the same per-key
+conflation before serialization, over a short flush interval.
+"""
+import json
+import asyncio
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+
+class Connection:
+    """One client: a drop-oldest queue and the task that drains it."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, send_timeout_s: float, on_dead):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.queue = deque()    # (key, text, droppable); keyed entries keep their text in self.keyed
+        self.keyed: Dict[Any, str] = {}
+        self.send_timeout_s = send_timeout_s
+        self._ready = asyncio.Event()
+        self._on_dead = on_dead
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    def send(self, text: str, key: Any = None, droppable: bool = True):
+        if droppable and key is not None and key in self.keyed:
+            self.keyed[key] = text
+            self.conflated += 1
+        else:
+            if len(self.queue) >= self.max_queue:
+                self._drop_oldest()
+            if droppable and key is not None:
+                self.keyed[key] = text
+                self.queue.append((key, None, True))
+            else:
+                self.queue.append((None, text, droppable))
+        self._ready.set()
+
+    def _drop_oldest(self):
+        """Drops the oldest droppable message (the queue may overrun with alerts only)."""
+        for i, (key, _, droppable) in enumerate(self.queue):
+            if droppable:
+                del self.queue[i]
+                if key is not None:
+                    del self.keyed[key]
+                self.dropped += 1
+                return
+
+    def _next(self) -> str:
+        key, text, _ = self.queue.popleft()
+        return self.keyed.pop(key) if key is not None else text
+
+    @property
+    def queued(self) -> int:
+        return len(self.queue)
+
+    async def run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.queue:
+                    text = self._next()
+                    await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout_s)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Timed out or the socket is gone
+            self._on_dead(self)
+
+
+class BroadcastHub:
+    def __init__(self, max_queue: int = 32, send_timeout_s: float = 5.0):
+        self.max_queue = max_queue
+        self.send_timeout_s = send_timeout_s
+        self.connections: Set[Connection] = set()
+        self.evicted = 0
+
+    def connect(self, websocket: WebSocket) -> Connection:
+        conn = Connection(websocket, self.max_queue, self.send_timeout_s, self._evict)
+        conn.task = asyncio.get_running_loop().create_task(conn.run())
+        self.connections.add(conn)
+        return conn
+
+    def disconnect(self, conn: Connection):
+        if conn in self.connections:
+            self.connections.discard(conn)
+            if conn.task is not None and conn.task is not asyncio.current_task():
+                conn.task.cancel()
+
+    def _evict(self, conn: Connection):
+        if conn in self.connections:
+            self.evicted += 1
+            self.disconnect(conn)
+            asyncio.get_running_loop().create_task(self._close(conn.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def broadcast(self, text: str, where: Optional[Callable[[Connection], bool]] = None,
+                  key: Any = None, droppable: bool = True):
+        """Queues the same pre-serialized text for every (matching) connection."""
+        for conn in list(self.connections):
+            if where is None or where(conn):
+                conn.send(text, key, droppable)
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "queued": sum(c.queued for c in self.connections),
+            "sent": sum(c.sent for c in self.connections),
+            "dropped": sum(c.dropped for c in self.connections),
+            "conflated": sum(c.conflated for c in self.connections),
+            "evicted": self.evicted,
+        }
+
+
+class ConflatingBroadcaster:
+    """
+    Collects keyed updates for `flush_interval_s` and broadcasts only
+    the newest per key, each serialized once. Alerts flush the pending
+    updates first (so they never overtake the reading that caused
+    them) and then go out immediately, non-droppable.
+    """
+
+    def __init__(self, hub: BroadcastHub, flush_interval_s: float = 0.05):
+        self.hub = hub
+        self.flush_interval_s = flush_interval_s
+        self._pending: Dict[Any, dict] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.received = 0
+        self.flushed = 0
+
+    def update(self, key: Any, message: dict):
+        self.received += 1
+        self._pending.pop(key, None)   # re-insert so flush order follows the latest arrival
+        self._pending[key] = message
+        if self.flush_interval_s <= 0:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval_s, self.flush)
+
+    def alert(self, message: dict):
+        self.flush()
+        self.hub.broadcast(json.dumps(message), droppable=False)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if not self.hub.connections:
+            return
+        for key, message in pending.items():
+            self.hub.broadcast(json.dumps(message), key=key)
+            self.flushed += 1
+
+    def stats(self) -> dict:
+        return {"received": self.received, "flushed": self.flushed,
+                "pending": len(self._pending), **self.hub.stats()}